@@ -0,0 +1 @@
+python -m scripts.opt._batch "./data/altered/xmls/**/*.patch" "./data/altered/xmls/**/*.json" -o Biomass_Chlamy_auto -d ./results/fluxes -s
@@ -0,0 +1,2 @@
+# Screen the gap-filled model and every altered construct for energy generating cycles before running FBA
+python -m scripts.val.egc ./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml "./data/altered/xmls/**/*.patch" "./data/altered/xmls/**/*.json" -d ./results/egc
@@ -1 +1,4 @@
-python -m scripts.opt._fva ./data/raw/iCre1355/iCre1355_auto.xml -l -p -o Biomass_Chlamy_auto -r Biomass_Chlamy_auto,SS,CAS -d ./results/fva
\ No newline at end of file
+python -m scripts.opt._fva ./data/raw/iCre1355/iCre1355_auto.xml -l -p -o Biomass_Chlamy_auto -r Biomass_Chlamy_auto,SS,CAS -d ./results/fva
+# Full-model loopless FVA, checkpointed every 100 reactions (rerun to resume after an interrupt).
+# -x skips blocked reactions and solves one reaction per fully coupled class.
+python -m scripts.opt._fva ./data/raw/iCre1355/iCre1355_auto.xml -l -o Biomass_Chlamy_auto -x -c 100 -d ./results/fva
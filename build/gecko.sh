@@ -0,0 +1,3 @@
+# Enzyme-constrained models (iter1-4) for every SQS/SQE strain combination
+shopt -s nullglob # Either construct format may be absent
+python -m scripts.mod.gecko ./data/altered/xmls/MNL_iCre1355_auto_GAPFILL/*.patch ./data/altered/xmls/MNL_iCre1355_auto_GAPFILL/*.json -w ./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml -d ./data/gecko/xmls
@@ -0,0 +1,3 @@
+# Single and double gene knockout screens of the gap-filled model (growth, reporting sterol fluxes)
+python -m scripts.opt._knockout ./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml -g -o Biomass_Chlamy_auto -r SS,CAS -d ./results/knockout
+python -m scripts.opt._knockout ./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml -g -2 -o Biomass_Chlamy_auto -r SS,CAS -d ./results/knockout
@@ -0,0 +1,3 @@
+# FBA and pFBA straight on GLPK (same fluxes as _fba, without building cobra/optlang objects)
+python -m scripts.opt._lp ./data/raw/iCre1355/iCre1355_auto.xml -o Biomass_Chlamy_auto -d ./results/fluxes
+python -m scripts.opt._lp ./data/raw/iCre1355/iCre1355_auto.xml -p -o Biomass_Chlamy_auto -d ./results/pfba
@@ -0,0 +1,3 @@
+# Heatmap data: sterol fluxes of every construct for each objective set (FBA), and their flux ranges (FVA)
+python -m scripts.opt._matrix "./data/altered/xmls/**/*.patch" "./data/altered/xmls/**/*.json" -o Biomass_Chlamy_auto -o ALT_MVK -r ERG,Biomass_Chlamy_auto,SS,SMO,ALT_SQS2,ALT_SQE2,ALT_MVK -d ./results/bench/heatmap
+python -m scripts.opt._matrix "./data/altered/xmls/**/*.patch" "./data/altered/xmls/**/*.json" -m fva -f 0.9 -o Biomass_Chlamy_auto -r ERG,ALT_MVAS,ALT_MVAE,ALT_MVK,ALT_PMK,ALT_MVAD,ALT_IDLI -d ./results/bench/mva
@@ -0,0 +1 @@
+python -m scripts.opt._pareto "./data/altered/xmls/MNL_iCre1355_auto_GAPFILL/*.patch" "./data/altered/xmls/MNL_iCre1355_auto_GAPFILL/*.json" -w ./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml -c 10 -d ./results/variant_compare_eps
@@ -0,0 +1,3 @@
+# Store a timing baseline once (e.g. on main), then compare every later run with it (exits with 1 on a regression)
+python -m scripts.other.perf -s
+python -m scripts.other.perf
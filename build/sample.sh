@@ -0,0 +1,2 @@
+# Flux sampling of the gap-filled model near maximal growth (4 parallel chains, samples streamed to Parquet)
+python -m scripts.opt._sample ./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml -o Biomass_Chlamy_auto -f 0.9 -d ./results/sampling
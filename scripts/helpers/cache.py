@@ -0,0 +1,129 @@
+import os, pickle, hashlib, tempfile
+from cobra.util.solver import linear_reaction_coefficients
+
+# Cache root (repo-level .cache folder unless overridden)
+CACHE_DIR = os.environ.get(
+    'FBA_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '.cache')
+)
+CACHE_MAX_MB = float(os.environ.get('FBA_CACHE_MAX_MB', 1024))
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the sha256 digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def model_hash(model, objective: bool = True) -> str:
+    """
+    Fingerprint of a model's reactions, stoichiometry and bounds (and objective, unless `objective=False`).
+    Models that would solve identically get the same hash, however they were loaded or edited.
+    """
+    digest = hashlib.sha256()
+    for rxn in model.reactions:
+        mets = ",".join(f"{met.id}:{coef!r}" for met, coef in sorted(rxn.metabolites.items(), key=lambda x: x[0].id))
+        digest.update(f"{rxn.id}|{rxn.lower_bound!r}|{rxn.upper_bound!r}|{mets}\n".encode())
+    if objective:
+        coefs = sorted((rxn.id, coef) for rxn, coef in linear_reaction_coefficients(model).items())
+        digest.update(f"{model.objective.direction}|{coefs!r}".encode())
+    return digest.hexdigest()
+
+def solver_state(model) -> str:
+    """
+    Fingerprint of what a model's solver problem holds beyond the reactions: constraints other than the mass balances
+    (e.g. from `add_cons_vars`), variables other than the reaction fluxes, and the solver tolerances.
+    """
+    fluxes = {v.name for rxn in model.reactions for v in (rxn.forward_variable, rxn.reverse_variable)}
+    parts = []
+    for constraint in model.constraints:
+        if constraint.name in model.metabolites: continue
+        coefs = sorted((v.name, c) for v, c in constraint.get_linear_coefficients(constraint.variables).items())
+        parts.append(f"c|{constraint.name}|{constraint.lb!r}|{constraint.ub!r}|{coefs!r}")
+    for variable in model.variables:
+        if variable.name in fluxes: continue
+        parts.append(f"v|{variable.name}|{variable.lb!r}|{variable.ub!r}|{variable.type}")
+    tolerances = model.solver.configuration.tolerances
+    parts.append(repr(sorted(tolerances.to_dict().items())) if hasattr(tolerances, 'to_dict') else '')
+    return hashlib.sha256("\n".join(sorted(parts[:-1]) + parts[-1:]).encode()).hexdigest()
+
+def problem_hash(model, method: str, **params) -> str:
+    """
+    Fingerprint of an optimization problem: the model (without its objective, set from `params` by the solve functions),
+    its extra constraints and variables and the solver tolerances (`solver_state`), the solver, the method name and its
+    parameters (which must have stable reprs, e.g. lists of IDs and numbers).
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model_hash(model, objective=False)}|{solver_state(model)}|{model.solver.interface.__name__}|{method}|".encode())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
+
+class DiskCache:
+    """
+    Size-bounded on-disk pickle store with least-recently-used eviction.
+    Each entry is one file, and its modification time is bumped on every hit,
+    so eviction simply drops the oldest files once the store is over budget.
+
+    Args:
+        namespace (str): Sub-folder of the cache root holding this store's entries.
+        max_mb (float, optional): Size budget of the namespace in megabytes. Defaults to `FBA_CACHE_MAX_MB`.
+        root (str, optional): Cache root folder. Defaults to `FBA_CACHE_DIR` (or ./.cache).
+    """
+
+    def __init__(self, namespace: str, max_mb: float = None, root: str = None):
+        self.path = os.path.join(root or CACHE_DIR, namespace)
+        self.max_bytes = int((max_mb if max_mb is not None else CACHE_MAX_MB) * (1 << 20))
+        os.makedirs(self.path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.pkl")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._file(key))
+
+    def get(self, key: str, default=None):
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # Missing, half-written or written by an incompatible version
+            return default
+        os.utime(path) # Mark as recently used
+        return value
+
+    def set(self, key: str, value):
+        # Write to a temp file first so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+        self.evict()
+
+    def delete(self, key: str):
+        if key in self: os.remove(self._file(key))
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            os.remove(os.path.join(self.path, name))
+
+    def evict(self):
+        """Drop least recently used entries until the namespace fits its size budget."""
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.pkl'): continue
+            st = os.stat(os.path.join(self.path, name))
+            entries.append((st.st_mtime, st.st_size, name))
+
+        total = sum(e[1] for e in entries)
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        for _, size, name in sorted(entries)[:-1]:
+            if total <= self.max_bytes: break
+            try: os.remove(os.path.join(self.path, name))
+            except OSError: pass
+            total -= size
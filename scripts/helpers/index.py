@@ -0,0 +1,167 @@
+from cobra import Model, Reaction
+import argparse, sys
+import cobra
+
+from scripts.helpers.cache import DiskCache
+from scripts.helpers.loader import load_model, model_key
+
+# Indexes of a model, next to the parsed models and keyed the same way (by file content)
+_indexes = DiskCache('index')
+
+# Lookup kinds: key -> reaction IDs
+KINDS = ('metabolite', 'gene', 'subsystem', 'ec')
+
+def _base_id(met_id: str) -> str:
+    """Metabolite ID without its compartment suffix ("accoa_h" -> "accoa")."""
+    return met_id.rsplit('_', 1)[0] if '_' in met_id else met_id
+
+class ModelIndex:
+    """
+    Inverted index of a model's reactions: metabolite, gene, subsystem and EC number -> reaction IDs, plus the
+    compartment of each metabolite. It is built in one pass over the reactions and holds only IDs (plain sets and
+    dicts), so it pickles small and every lookup is a hash access; queries combine them as set operations.
+
+    Args:
+        maps (dict[str, dict[str, frozenset[str]]]): Reaction IDs per key, for each kind in `KINDS`.
+        compartments (dict[str, str]): Metabolite ID -> compartment.
+        order (dict[str, int]): Reaction ID -> position in the model, to return results in model order.
+
+    Example:
+        index = load_index('./data/fill/xmls/MNL_iCre1355_auto_GAPFILL.xml')
+        index.query(metabolites=['accoa', 'aacoa'], compartment='h')
+    """
+
+    def __init__(self, maps: dict[str, dict[str, frozenset[str]]], compartments: dict[str, str], order: dict[str, int]):
+        self.maps = maps
+        self.compartments = compartments
+        self.order = order
+        self.bases = {}
+        for met_id in compartments:
+            self.bases.setdefault(_base_id(met_id), set()).add(met_id)
+
+    @classmethod
+    def from_model(cls, model: Model, ec: dict[str, list[str]] = None) -> 'ModelIndex':
+        """
+        Index a model. Subsystems come from `reaction.subsystem` and the model's groups, EC numbers from the `ec-code`
+        annotations and the optional `ec` mapping (reaction ID -> EC numbers, e.g. from an alteration table).
+        """
+        maps = {kind: {} for kind in KINDS}
+        add = lambda kind, key, rid: maps[kind].setdefault(key, set()).add(rid)
+        for rxn in model.reactions:
+            for met in rxn.metabolites: add('metabolite', met.id, rxn.id)
+            for gene in rxn.genes: add('gene', gene.id, rxn.id)
+            if rxn.subsystem: add('subsystem', rxn.subsystem, rxn.id)
+            codes = rxn.annotation.get('ec-code', [])
+            for code in [codes] if isinstance(codes, str) else codes: add('ec', code, rxn.id)
+        for group in model.groups:
+            for member in group.members:
+                if isinstance(member, Reaction): add('subsystem', group.name, member.id)
+        for rid, codes in (ec or {}).items():
+            if rid not in model.reactions: continue
+            for code in [codes] if isinstance(codes, str) else codes: add('ec', code, rid)
+
+        return cls(
+            {kind: {key: frozenset(ids) for key, ids in keys.items()} for kind, keys in maps.items()},
+            {met.id: met.compartment for met in model.metabolites},
+            {rxn.id: pos for pos, rxn in enumerate(model.reactions)},
+        )
+
+    def keys(self, kind: str) -> list[str]:
+        """Indexed keys of a kind (e.g. every subsystem)."""
+        return list(self.maps[kind])
+
+    def reactions(self, kind: str, keys: list[str], every: bool = False) -> set[str]:
+        """Reactions with any (or, with `every`, all) of the keys. Unknown keys match nothing."""
+        hits = [self.maps[kind].get(key, frozenset()) for key in keys]
+        if not hits:
+            return set()
+        return set(frozenset.intersection(*hits) if every else frozenset.union(*hits))
+
+    def metabolites(self, ids: list[str], compartment: str = None) -> list[str]:
+        """
+        Resolve metabolite IDs: full IDs ("accoa_h") are kept and base IDs ("accoa") expand to every compartment
+        they exist in. With `compartment`, only metabolites in it are kept.
+        """
+        resolved = []
+        for met_id in ids:
+            resolved += [met_id] if met_id in self.compartments else sorted(self.bases.get(met_id, ()))
+        if compartment is not None:
+            resolved = [met_id for met_id in resolved if self.compartments[met_id] == compartment]
+        return list(dict.fromkeys(resolved))
+
+    def query(
+        self,
+        metabolites: list[str] = None,
+        genes: list[str] = None,
+        subsystems: list[str] = None,
+        ec: list[str] = None,
+        compartment: str = None,
+        every: bool = False
+    ) -> list[str]:
+        """
+        Reactions matching every given filter, in model order. Each filter matches reactions with any of its keys
+        (with `every`, reactions with all of the metabolites). `compartment` restricts the metabolites (see `metabolites`).
+
+        Example:
+            index.query(metabolites=['accoa'], compartment='h', subsystems=['Biosynthesis of steroids'])
+        """
+        found = None
+        narrow = lambda hits: hits if found is None else found & hits
+        if metabolites is not None:
+            found = narrow(self.reactions('metabolite', self.metabolites(metabolites, compartment), every))
+        if genes is not None:
+            found = narrow(self.reactions('gene', genes))
+        if subsystems is not None:
+            found = narrow(self.reactions('subsystem', subsystems))
+        if ec is not None:
+            found = narrow(self.reactions('ec', ec))
+        return sorted(found if found is not None else self.order, key=self.order.__getitem__)
+
+def load_index(path: str, cache: bool = True) -> ModelIndex:
+    """Index of a model file, from the on-disk cache when the file is unchanged (else loaded with `load_model` and indexed)."""
+    key = f"{model_key(path)}-{cobra.__version__}"
+    if cache:
+        hit = _indexes.get(key)
+        if hit is not None:
+            return hit
+    model, error = load_model(path, validate=False, cache=cache)
+    if model is None:
+        raise ValueError(f"Error loading model {path}: {error}")
+    index = ModelIndex.from_model(model)
+    if cache:
+        _indexes.set(key, index)
+    return index
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='index',
+        description='Find reactions by metabolite, gene, subsystem or EC number (filters are combined).'
+    )
+    parser.add_argument('sbmlpath')
+    parser.add_argument('-m', '--metabolites', help='Comma-separated metabolite IDs, with or without compartment suffix.')
+    parser.add_argument('-c', '--compartment', help='Only match metabolites in this compartment.')
+    parser.add_argument('-a', '--all', action='store_true', help='Reactions with all of the metabolites instead of any.')
+    parser.add_argument('-g', '--genes', help='Comma-separated gene IDs.')
+    parser.add_argument('-s', '--subsystems', help='Subsystems, separated by ";".')
+    parser.add_argument('-e', '--ec', help='Comma-separated EC numbers.')
+    args = parser.parse_args()
+
+    try:
+        index = load_index(args.sbmlpath)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    reactions = index.query(
+        metabolites=args.metabolites.split(',') if args.metabolites else None,
+        genes=args.genes.split(',') if args.genes else None,
+        subsystems=args.subsystems.split(';') if args.subsystems else None,
+        ec=args.ec.split(',') if args.ec else None,
+        compartment=args.compartment,
+        every=args.all,
+    )
+    print("\n".join(reactions))
+    print(f"{len(reactions)} reactions")
+    exit(0)
@@ -0,0 +1,73 @@
+from cobra.core import Metabolite
+import re
+import pandas as pd
+
+# Optional leading coefficient (integer or decimal) of an equation term, e.g. "12nadph_c" or "0.5 o2_c"
+TERM = re.compile(r"(\d+(?:\.\d+)?)?\s*(\S.*)")
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+def _number(text: str) -> int | float:
+    return int(text) if text.isdigit() else float(text)
+
+def parse_term(term: str, known: set[str] = None) -> tuple[int | float, str]:
+    """
+    Split an equation term of the repo .csv format (`<coefficient><metabolite ID>`, e.g. "2psqldp_c", "12nadph_c")
+    into its coefficient (1 if absent) and metabolite ID.
+
+    Args:
+        term (str): The term.
+        known (set[str], optional): Valid metabolite IDs. Many IDs start with digits ("10fthf_c", "13dpg_c"), so with
+            `known` the term is first matched as a whole, then with the longest coefficient leaving a known ID.
+            Without it, every leading digit is read as the coefficient.
+
+    Returns:
+        tuple[int | float, str]: The coefficient and the metabolite ID.
+
+    Raises:
+        ValueError: If the term is empty, or no split of it gives a known metabolite ID.
+    """
+    term = term.strip()
+    if known is None:
+        match = TERM.fullmatch(term)
+        if not match:
+            raise ValueError("Empty equation term")
+        coef, met_id = match.groups()
+        return (1 if coef is None else _number(coef)), met_id
+
+    if term in known:
+        return 1, term
+    digits = len(term) - len(term.lstrip('0123456789.'))
+    for k in range(digits, 0, -1):
+        coef, met_id = term[:k], term[k:].strip()
+        if met_id in known and NUMBER.fullmatch(coef):
+            return _number(coef), met_id
+    raise ValueError(f"No known metabolite in equation term '{term}'")
+
+def parse_equation(reactants: str, products: str, known: set[str] = None) -> list[tuple[int | float, str]]:
+    """
+    Stoichiometry of a table reaction as `(coefficient, metabolite ID)` pairs, reactants negated
+    (e.g. "2psqldp_c+nadph_c", "sql_c+2ppi_c"). See `parse_term` for `known`.
+    """
+    reactants = [(-coef, met_id) for coef, met_id in (parse_term(t, known) for t in reactants.split('+') if t.strip())]
+    products = [parse_term(t, known) for t in products.split('+') if t.strip()]
+    return [*reactants, *products]
+
+def table_equations(reactions_df: pd.DataFrame, known: set[str] = None) -> pd.Series:
+    """Parse the `REACTANTS`/`PRODUCTS` columns of a reactions table into one stoichiometry list per row."""
+    return pd.Series(
+        [parse_equation(r, p, known) for r, p in zip(reactions_df['REACTANTS'].tolist(), reactions_df['PRODUCTS'].tolist())],
+        index=reactions_df.index, dtype=object
+    )
+
+def table_metabolites(compounds_df: pd.DataFrame, name: str = 'NAME', compartment: str = 'c', charge: str = None) -> list[Metabolite]:
+    """
+    Build the metabolites of a compounds table (`ID`, `FORMULA` and the `name` column) in one pass over its columns.
+    Charges come from the `charge` column if given, else 0.
+    """
+    charges = compounds_df[charge].astype(int).tolist() if charge else [0] * len(compounds_df)
+    return [
+        Metabolite(id=met_id, name=met_name, formula=formula, charge=met_charge, compartment=compartment)
+        for met_id, met_name, formula, met_charge in zip(
+            compounds_df['ID'].tolist(), compounds_df[name].tolist(), compounds_df['FORMULA'].tolist(), charges
+        )
+    ]
@@ -0,0 +1,86 @@
+from cobra import io, Model
+import cobra, os
+
+from scripts.helpers.cache import DiskCache, file_hash
+from scripts.helpers.profiling import profile
+from scripts.helpers.patch import is_patch, read_patch, apply_patch
+
+# Parsed models, keyed by file content (a changed file never hits a stale entry)
+_models = DiskCache('models')
+
+def model_key(path: str) -> str:
+    """
+    Content key of a model file: its sha256, plus the current sha256 of the base model for a `.patch`,
+    so cached entries of a patch are never served once its base has changed.
+    """
+    if not is_patch(path):
+        return file_hash(path)
+    base = read_patch(path)['base']
+    return f"{file_hash(path)}-{file_hash(base) if os.path.exists(base) else 'missing'}"
+
+def load_model(path: str, validate: bool = True, cache: bool = True) -> tuple[Model, dict]:
+    """
+    Load a metabolic model, reusing the parsed model from the on-disk cache when the file is unchanged.
+    Parsing (and validation, for SBML) only runs on a cache miss. A `.patch` file (see `scripts.helpers.patch`) is applied
+    to a copy of its base model, itself loaded through the cache, so variants of one base cost a single parse.
+
+    Args:
+        path (str): Path to the model file (.xml/.sbml, .json or .patch).
+        validate (bool, optional): Run SBML validation on a cache miss. Defaults to True.
+        cache (bool, optional): Read from and write to the model cache. Defaults to True.
+
+    Returns:
+        tuple[Model, dict]: The model (None if it couldn't be loaded) and the validation errors, like `io.validate_sbml_model`.
+    """
+    with profile('load', path=path, validate=validate) as rec:
+        key = f"{model_key(path)}-{'v' if validate else 'r'}-{cobra.__version__}"
+        if cache:
+            hit = _models.get(key)
+            rec['cache'] = 'hit' if hit is not None else 'miss'
+            if hit is not None:
+                return hit
+
+        if is_patch(path):
+            model, errors = _load_patched(path, validate, cache)
+        elif os.path.splitext(path)[1].lower() == '.json':
+            model, errors = io.load_json_model(path), {}
+        elif validate:
+            model, errors = io.validate_sbml_model(path)
+        else:
+            model, errors = io.read_sbml_model(path), {}
+
+        if cache and model is not None:
+            _models.set(key, (model, errors))
+        return model, errors
+
+def read_model(path: str) -> Model:
+    """Cached counterpart of `io.read_sbml_model` (no validation)."""
+    return load_model(path, validate=False)[0]
+
+def _load_patched(path: str, validate: bool, cache: bool) -> tuple[Model, dict]:
+    patch = read_patch(path)
+    if not os.path.exists(patch['base']):
+        return None, {'COBRA_FATAL': [f"Base model {patch['base']} of patch {path} not found"]}
+    if file_hash(patch['base']) != patch['base_sha256']:
+        return None, {'COBRA_FATAL': [f"Base model {patch['base']} changed since patch {path} was made"]}
+    base, errors = load_model(patch['base'], validate, cache) # A fresh object (cache hits are unpickled), safe to patch
+    if base is None:
+        return None, errors
+    return apply_patch(base, patch), errors
+
+def load_patched(base_path: str, patch_paths: list[str], validate: bool = True):
+    """
+    Yield `(path, model)` for every patch of one base model, applying each patch inside `with base:` (rolled back
+    before the next one) instead of copying or loading a model per variant. Use each model before advancing the generator.
+    """
+    base, _ = load_model(base_path, validate)
+    if base is None:
+        return
+    digest = file_hash(base_path)
+    for path in patch_paths:
+        patch = read_patch(path)
+        if patch['base_sha256'] != digest:
+            print(f"Skipping {path}: made for another base model ({patch['base']})")
+            continue
+        with base:
+            yield path, apply_patch(base, patch)
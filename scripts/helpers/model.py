@@ -1,31 +1,105 @@
-from cobra.flux_analysis import flux_variability_analysis
-from cobra.util import create_stoichiometric_matrix
+from cobra.flux_analysis import pfba
+from cobra.util import get_context
 from cobra.core import Model, Gene, Metabolite, Reaction
+from concurrent.futures import ProcessPoolExecutor
+from scripts.helpers.profiling import profile
 
+import os
 import numpy as np
-from scipy.linalg import null_space
-import networkx as nx
+import pandas as pd
+from functools import partial
 
 def gene_in_model(model: Model, gene: str):
-    try:
-        model.genes.get_by_id(gene)
-        return True
-    except:
-        return False
+    return gene in model.genes
 
 def rxn_in_model(model: Model, rxn: str):
-    try:
-        model.reactions.get_by_id(rxn)
-        return True
-    except:
-        return False
+    return rxn in model.reactions
 
 def met_in_model(model: Model, met: str):
-    try:
-        model.metabolites.get_by_id(met)
-        return True
-    except:
-        return False
+    return met in model.metabolites
+
+class ModelEditor:
+    """
+    Editing session that keeps hash indexes of a model's genes, reactions, metabolites and groups,
+    so every check while adding reactions is O(1). New reactions are queued and added with a single
+    `model.add_reactions` call on `commit()` (or when leaving the `with` block).
+
+    Args:
+        model (Model): The model to edit. Edits made inside `with model:` are rolled back with it.
+
+    Example:
+        with ModelEditor(model) as editor:
+            for row in rows:
+                editor.add_gene_reaction_pair(...)
+    """
+
+    def __init__(self, model: Model):
+        self.model = model
+        self.genes = {gene.id: gene for gene in model.genes}
+        self.reactions = {rxn.id for rxn in model.reactions}
+        self.metabolites = {met.id: met for met in model.metabolites}
+        self.groups = {grp.name for grp in model.groups}
+        self._pending: list[tuple[Reaction, str]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+
+    def add_metabolites(self, metabolites: list[Metabolite]):
+        """Add metabolites to the model (immediately) and to the index."""
+        self.model.add_metabolites(metabolites)
+        self.metabolites.update({met.id: met for met in metabolites})
+
+    def add_gene_reaction_pair(
+        self,
+        gene_id: str,
+        reaction_id: str,
+        reaction_name: str,
+        reaction_subsystem: str,
+        metabolites: list[tuple[int, str]],
+        gene_name=None,
+        reversible=False
+    ) -> Reaction:
+        """Queue a gene-reaction pair (same checks and arguments as `add_single_gene_reaction_pair`)."""
+
+        # Avoid duplicates for reaction (also among queued ones)
+        assert reaction_id not in self.reactions
+        # Avoid metabolites not in model and subsystem exists
+        assert all(met_id in self.metabolites for _, met_id in metabolites)
+        assert reaction_subsystem in self.groups
+
+        rxn = Reaction(id=reaction_id, name=reaction_name)
+        rxn.bounds = (-1000, 1000) if reversible else (0, 1000)
+        rxn.add_metabolites({self.metabolites[met_id]: coeff for coeff, met_id in metabolites})
+        rxn.gene_reaction_rule = gene_id
+
+        self.reactions.add(reaction_id)
+        self._pending.append((rxn, gene_name if gene_name is not None else gene_id))
+        return rxn
+
+    def commit(self):
+        """Add all queued reactions (and their new genes) to the model at once."""
+        if not self._pending:
+            return
+
+        # Add new genes up front, so add_reactions links the reactions to them. Their removal is registered
+        # as a plain list operation: cobra's own gene rollback (remove_genes) leaks into enclosing contexts.
+        new_genes = []
+        for rxn, gene_name in self._pending:
+            for gene in rxn.genes:
+                if gene.id in self.genes: continue
+                self.genes[gene.id] = Gene(gene.id, name=gene_name)
+                new_genes.append(self.genes[gene.id])
+        self.model.genes += new_genes
+        context = get_context(self.model)
+        if context and new_genes:
+            context(partial(self.model.genes.__isub__, new_genes))
+
+        self.model.add_reactions([rxn for rxn, _ in self._pending])
+        self._pending = []
 
 def add_single_gene_reaction_pair(
     model: Model, 
@@ -37,78 +111,114 @@ def add_single_gene_reaction_pair(
     gene_name=None,
     reversible=False
 ):
-    """Add a gene-reaction pair to the model."""
-
-    # Avoid duplicates for gene and reaction
-    # assert not model.genes.query(lambda k: k == gene_id, attribute='id')
-    assert not model.reactions.query(lambda k: k == reaction_id, attribute='id')
-    # Avoid metabolites not in model and subsystem exists
-    assert all(list(map(lambda x: met_in_model(model, x[1]), metabolites)))
-    assert reaction_subsystem in [grp.name for grp in model.groups]
-
-    # Add gene and reaction to model
-    rxn = Reaction(id=reaction_id)
-
-    if gene_name is None:
-        gene_name = gene_id
-    
-    # Set gene
-    gene = None
-    if gene_id in [g.id for g in model.genes]:
-        gene = model.genes.get_by_id(gene_id)
+    """Add a gene-reaction pair to the model. To add many reactions, use one `ModelEditor` session instead."""
+    with ModelEditor(model) as editor:
+        editor.add_gene_reaction_pair(gene_id, reaction_id, reaction_name, reaction_subsystem, metabolites, gene_name, reversible)
+
+# Energy dissipation reactions (after Fritzemeier et al. 2017): metabolite base ID -> coefficient, added in every
+# compartment where all of the metabolites exist
+ENERGY_DISSIPATION = {
+    'ATP': {'atp': -1, 'h2o': -1, 'adp': 1, 'pi': 1, 'h': 1},
+    'CTP': {'ctp': -1, 'h2o': -1, 'cdp': 1, 'pi': 1, 'h': 1},
+    'GTP': {'gtp': -1, 'h2o': -1, 'gdp': 1, 'pi': 1, 'h': 1},
+    'UTP': {'utp': -1, 'h2o': -1, 'udp': 1, 'pi': 1, 'h': 1},
+    'ITP': {'itp': -1, 'h2o': -1, 'idp': 1, 'pi': 1, 'h': 1},
+    'NADH': {'nadh': -1, 'nad': 1, 'h': 1},
+    'NADPH': {'nadph': -1, 'nadp': 1, 'h': 1},
+    'FADH2': {'fadh2': -1, 'fad': 1, 'h': 2},
+    'FMNH2': {'fmnh2': -1, 'fmn': 1, 'h': 2},
+    'Q8H2': {'q8h2': -1, 'q8': 1, 'h': 2},
+    'PQH2': {'pqh2': -1, 'pq': 1, 'h': 2},
+    'MQL8': {'mql8': -1, 'mqn8': 1, 'h': 2},
+    'ACCOA': {'accoa': -1, 'h2o': -1, 'ac': 1, 'coa': 1, 'h': 1},
+}
+
+# Proton gradients dissipated as (from, to) compartments: plasma membrane, thylakoid membrane, inner mitochondrial membrane
+PROTON_GRADIENTS = [('e', 'c'), ('u', 'h'), ('i', 'm')]
+
+def dissipation_reactions(model: Model) -> list[Reaction]:
+    """Energy dissipation reactions (`EGC_<energy>_<compartment>`) for the energy metabolites present in the model, with bounds (0, 0)."""
+    reactions = []
+    templates = [(name, comp, {f"{base}_{comp}": coef for base, coef in template.items()})
+                 for name, template in ENERGY_DISSIPATION.items() for comp in model.compartments]
+    templates += [('PROTON', f"{src}{dst}", {f"h_{src}": -1, f"h_{dst}": 1}) for src, dst in PROTON_GRADIENTS]
+    for name, comp, stoichiometry in templates:
+        if not all(met_in_model(model, met_id) for met_id in stoichiometry): continue
+        rxn = Reaction(f"EGC_{name}_{comp}", name=f"{name} dissipation ({comp})", lower_bound=0.0, upper_bound=0.0)
+        rxn.add_metabolites({model.metabolites.get_by_id(met_id): coef for met_id, coef in stoichiometry.items()})
+        reactions.append(rxn)
+    return reactions
+
+def energy_cycle_model(model: Model) -> tuple[Model, list[str]]:
+    """
+    Copy of `model` for EGC detection: boundary reactions closed, other bounds reduced to their direction
+    (-1/0/1, so no reaction is forced to carry flux) and the dissipation reactions added (closed until probed).
+
+    Returns:
+        tuple[Model, list[str]]: The closed model and its dissipation reaction IDs.
+    """
+    with profile('egc.copy'):
+        closed = model.copy()
+    boundary = {rxn.id for rxn in closed.boundary}
+    for rxn in closed.reactions:
+        rxn.bounds = (0.0, 0.0) if rxn.id in boundary else (-1.0 if rxn.lower_bound < 0 else 0.0, 1.0 if rxn.upper_bound > 0 else 0.0)
+    dissipation = dissipation_reactions(closed)
+    closed.add_reactions(dissipation)
+    closed.objective = {}
+    return closed, [rxn.id for rxn in dissipation]
+
+# Per-process closed model for EGC probes (pickled once per worker, not once per probe)
+_egc_model: Model = None
+
+def _init_egc_worker(model: Model):
+    global _egc_model
+    _egc_model = model
+
+def _probe(rid: str, parsimonious: bool, tol: float, model: Model = None) -> tuple[str, float, dict[str, float]]:
+    """Maximize one dissipation reaction in the closed model. Returns its maximum flux and the other reactions carrying flux."""
+    model = model or _egc_model
+    with model:
+        rxn = model.reactions.get_by_id(rid)
+        rxn.bounds = (0.0, 1.0)
+        model.objective = rxn
+        with profile('egc.solve', model, reaction=rid):
+            value = model.slim_optimize(error_value=np.nan)
+        if not np.isfinite(value) or value <= tol:
+            return rid, 0.0 if np.isfinite(value) else np.nan, {}
+        if parsimonious: # Smallest flux distribution achieving it, so the reported cycle has no unrelated loops
+            fluxes = pfba(model).fluxes.to_dict()
+        else:
+            primals = model.solver.primal_values
+            fluxes = {r.id: primals[r.id] - primals[r.reverse_id] for r in model.reactions}
+    return rid, value, {k: v for k, v in fluxes.items() if abs(v) > tol and k != rid}
+
+def find_energy_cycles(model: Model, processes: int = None, parsimonious: bool = True, tol: float = 1e-6) -> pd.DataFrame:
+    """
+    Detect energy generating cycles (EGCs): with every exchange closed, no energy metabolite should be regenerable
+    for free. One dissipation reaction (e.g. ATP + H2O -> ADP + Pi + H) is added per energy metabolite and compartment,
+    and each one is maximized in its own small LP; a positive flux means the model can produce that energy from nothing.
+
+    Args:
+        model (Model): The metabolic model (left unchanged).
+        processes (int, optional): Number of worker processes for the probes. Defaults to the number of CPUs.
+        parsimonious (bool, optional): Report the minimal total flux cycle (pFBA) instead of the first optimal solution. Defaults to True.
+        tol (float, optional): Fluxes at or below this magnitude count as zero. Defaults to 1e-6.
+
+    Returns:
+        pd.DataFrame: One row per dissipation reaction with its `energy` metabolite, `compartment`, maximum `flux`
+            (0 if no cycle, NaN if the probe failed), and the `size` and reactions (`cycle`, largest fluxes first) of the cycle.
+    """
+    closed, probes = energy_cycle_model(model)
+    processes = min(processes or os.cpu_count(), len(probes))
+    if processes <= 1:
+        results = [_probe(rid, parsimonious, tol, closed) for rid in probes]
     else:
-        gene = Gene(gene_id, name=gene_name)
-        model.genes.add(gene)
-
-    # Set reaction
-    model.add_reactions([rxn])
-
-    rxn.name = reaction_name
-    rxn.bounds = (-1000, 1000) if reversible else (0, 1000)
-
-    # Find metabolite objects from id list
-    add_mets = {}
-    for coeff, met_id in metabolites:
-        met = model.metabolites.get_by_id(met_id)
-        add_mets[met] = coeff
-    # Add metabolites and gene to reaction data
-    rxn.add_metabolites(add_mets)
-    rxn.gene_reaction_rule = gene_id
-
-# BELOW IS DEPRECATED!!!
-
-# def energy_cycles_flux(model, threshold=1e-6):
-#     """Detect energy-generating cycles using FVA and directional graphs"""
-
-#     # Run FVA to get reversible reactions
-#     fva = flux_variability_analysis(model, fraction_of_optimum=0.9)
-#     reversible_rxns = fva[(fva['minimum'] < -threshold) & (fva['maximum'] > threshold)].index.to_list()
-
-#     # Build Directed Graph for Reactions
-#     G = nx.DiGraph()
-#     for rxn in model.reactions:
-#         if rxn.id in reversible_rxns:
-#             for met in rxn.metabolites:
-#                 G.add_edge(rxn.id, met.id)
-#                 G.add_edge(met.id, rxn.id)
-    
-#     # Find cycles in the graph
-#     cycles = list(nx.simple_cycles(G))
-#     egcs = [cycle for cycle in cycles if len(cycle) > 2]
-
-#     return egcs
-
-# def find_egcs_null_space(model: Model, threshold=1e-6):
-#     """Detect energy-generating cycles via nullspace of stoichiometric matrix"""
-
-#     S = create_stoichiometric_matrix(model)
-#     N = null_space(S)
-    
-#     loops = []
-
-#     for i in range(N.shape[1]):
-#         loop_rxns = [model.reactions[j].id for j in np.where(abs(N[:, i]) > threshold)[0]]
-#         if len(loop_rxns) > 1:
-#             loops.append(loop_rxns)
-    
-#     return loops
\ No newline at end of file
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_egc_worker, initargs=(closed,)) as pool:
+            results = list(pool.map(_probe, probes, [parsimonious] * len(probes), [tol] * len(probes)))
+
+    rows = []
+    for rid, value, cycle in results:
+        _, energy, comp = rid.split('_', 2)
+        ordered = sorted(cycle, key=lambda k: -abs(cycle[k]))
+        rows.append({'reaction': rid, 'energy': energy, 'compartment': comp, 'flux': value, 'size': len(ordered), 'cycle': ";".join(ordered)})
+    return pd.DataFrame(rows, columns=['reaction', 'energy', 'compartment', 'flux', 'size', 'cycle'])
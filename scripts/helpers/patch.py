@@ -0,0 +1,159 @@
+from cobra import Model
+from cobra.core import Gene
+from cobra.io.dict import _reaction_to_dict, _reaction_from_dict, _metabolite_to_dict, _metabolite_from_dict, _gene_to_dict
+from cobra.util import get_context
+from cobra.util.solver import linear_reaction_coefficients
+from functools import partial
+import argparse, os, sys, json
+
+from scripts.helpers.cache import file_hash
+
+# Patch files: JSON, named like the model they produce (e.g. SQS+SQE+MVA.patch)
+PATCH_EXT = '.patch'
+PATCH_FORMAT = 1
+
+def is_patch(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() == PATCH_EXT
+
+def _stoichiometry(rxn) -> dict[str, float]:
+    return {met.id: coef for met, coef in rxn.metabolites.items()}
+
+def diff_models(base: Model, model: Model) -> dict:
+    """
+    Changes turning `base` into `model`: added and removed metabolites, genes and reactions, bound changes of shared
+    reactions and the objective (if it differs). A shared reaction whose stoichiometry or GPR changed is stored as
+    removed and re-added. Annotations of shared objects and group memberships are not compared.
+
+    Returns:
+        dict: The patch, for `apply_patch` or `write_patch`.
+    """
+    base_rxns = {rxn.id: rxn for rxn in base.reactions}
+    base_mets = {met.id for met in base.metabolites}
+    base_genes = {gene.id for gene in base.genes}
+    model_rxns = {rxn.id for rxn in model.reactions}
+
+    added, bounds = [], {}
+    for rxn in model.reactions:
+        old = base_rxns.get(rxn.id)
+        if old is None or _stoichiometry(old) != _stoichiometry(rxn) or old.gene_reaction_rule != rxn.gene_reaction_rule:
+            added.append(rxn)
+        elif old.bounds != rxn.bounds:
+            bounds[rxn.id] = list(rxn.bounds)
+    replaced = {rxn.id for rxn in added} & base_rxns.keys()
+
+    patch = {
+        'format': PATCH_FORMAT,
+        'id': model.id,
+        'name': model.name,
+        'metabolites': {
+            'add': [_metabolite_to_dict(met) for met in model.metabolites if met.id not in base_mets],
+            'remove': [met.id for met in base.metabolites if met.id not in model.metabolites],
+        },
+        'genes': {
+            'add': [_gene_to_dict(gene) for gene in model.genes if gene.id not in base_genes],
+            'remove': [gene.id for gene in base.genes if gene.id not in model.genes],
+        },
+        'reactions': {
+            'add': [_reaction_to_dict(rxn) for rxn in added],
+            'remove': [rid for rid in base_rxns if rid not in model_rxns or rid in replaced],
+        },
+        'bounds': bounds,
+    }
+
+    objective = {rxn.id: coef for rxn, coef in linear_reaction_coefficients(model).items()}
+    if objective != {rxn.id: coef for rxn, coef in linear_reaction_coefficients(base).items()} or model.objective.direction != base.objective.direction:
+        patch['objective'] = {'direction': model.objective.direction, 'coefficients': objective}
+    return patch
+
+def apply_patch(model: Model, patch: dict) -> Model:
+    """
+    Apply a patch from `diff_models` to `model` in place (removals first, then additions, bounds and objective).
+    Inside `with model:` every change is rolled back with the block, so one base can serve many patches.
+
+    Returns:
+        Model: The patched model.
+    """
+    context = get_context(model)
+    if patch['reactions']['remove']:
+        model.remove_reactions(patch['reactions']['remove'])
+    if patch['metabolites']['remove']:
+        model.remove_metabolites([model.metabolites.get_by_id(mid) for mid in patch['metabolites']['remove']])
+    if patch['metabolites']['add']:
+        model.add_metabolites([_metabolite_from_dict(met) for met in patch['metabolites']['add']])
+
+    # Genes are changed as plain list operations (cobra's gene rollback leaks into enclosing contexts, see ModelEditor)
+    removed = [model.genes.get_by_id(gid) for gid in patch['genes']['remove']]
+    if removed:
+        model.genes -= removed
+        if context: context(partial(model.genes.__iadd__, removed))
+    added = [Gene(gene['id'], name=gene.get('name', '')) for gene in patch['genes']['add']]
+    if added:
+        model.genes += added
+        if context: context(partial(model.genes.__isub__, added))
+
+    if patch['reactions']['add']:
+        model.add_reactions([_reaction_from_dict(rxn, model) for rxn in patch['reactions']['add']])
+    for rid, (lb, ub) in patch['bounds'].items():
+        model.reactions.get_by_id(rid).bounds = (lb, ub)
+    if 'objective' in patch:
+        model.objective = {model.reactions.get_by_id(rid): coef for rid, coef in patch['objective']['coefficients'].items()}
+        model.objective.direction = patch['objective']['direction']
+
+    if patch.get('name') is not None:
+        model.name = patch['name']
+    return model
+
+def write_patch(patch: dict, path: str, base_path: str):
+    """Save a patch with the location of its base model (relative to the patch) and the base file's sha256."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    record = {
+        **patch,
+        'base': os.path.relpath(os.path.abspath(base_path), os.path.dirname(os.path.abspath(path))).replace(os.sep, '/'),
+        'base_sha256': file_hash(base_path),
+    }
+    with open(path, 'w') as f:
+        json.dump(record, f, indent=1)
+
+def read_patch(path: str) -> dict:
+    """Load a patch, with `base` resolved to a path usable from the working directory."""
+    with open(path, 'r') as f:
+        patch = json.load(f)
+    if patch.get('format') != PATCH_FORMAT:
+        raise ValueError(f"Unsupported patch format {patch.get('format')} in {path}")
+    patch['base'] = os.path.normpath(os.path.join(os.path.dirname(path), patch['base']))
+    return patch
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='patch',
+        description='Store a model as a patch (added/removed reactions, metabolites and genes, bound changes) over a base model.'
+    )
+    parser.add_argument('basepath', help='Base model the patch applies to.')
+    parser.add_argument('sbmlpath', nargs='+', help='Models to store as patches.')
+    parser.add_argument('-d', '--dest', help='Folder for the patches (defaults to next to each model).')
+    args = parser.parse_args()
+
+    from scripts.helpers.loader import load_model # The loader applies patches, so it imports this module
+
+    base, error = load_model(args.basepath, validate=False)
+    if not base:
+        print(f"Error loading base model: {error}")
+        sys.exit(1)
+
+    for path in args.sbmlpath:
+        model, error = load_model(path, validate=False)
+        if not model:
+            print(f"Error loading model {path}: {error}")
+            sys.exit(1)
+        patch = diff_models(base, model)
+        export_path = os.path.join(args.dest or os.path.dirname(path), os.path.splitext(os.path.basename(path))[0] + PATCH_EXT)
+        write_patch(patch, export_path, args.basepath)
+        print(
+            f"{export_path}: +{len(patch['reactions']['add'])}/-{len(patch['reactions']['remove'])} reactions, "
+            f"+{len(patch['metabolites']['add'])}/-{len(patch['metabolites']['remove'])} metabolites, "
+            f"+{len(patch['genes']['add'])}/-{len(patch['genes']['remove'])} genes, {len(patch['bounds'])} bound changes "
+            f"({os.path.getsize(export_path) / 1e3:.1f} kB vs {os.path.getsize(path) / 1e3:.1f} kB)"
+        )
+    exit(0)
@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+from functools import wraps
+import os, sys, json, time, glob, atexit, argparse, platform, uuid
+import pandas as pd
+import cobra
+
+# Profiling switch: with FBA_PROFILE=1, every instrumented stage is recorded and a report is written when the run exits
+ENABLED = os.environ.get('FBA_PROFILE', '').lower() not in ('', '0', 'false', 'no')
+
+# Report root (repo-level results/profile unless overridden), one folder per run
+PROFILE_DIR = os.environ.get(
+    'FBA_PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'results', 'profile')
+)
+
+# Run ID shared with worker processes through the environment (only when profiling), so all their records land in the same run folder
+_OWNER = 'FBA_PROFILE_RUN' not in os.environ
+RUN_ID = os.environ.get('FBA_PROFILE_RUN') or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+if ENABLED:
+    os.environ['FBA_PROFILE_RUN'] = RUN_ID
+
+_sink = {'pid': None, 'file': None}
+
+def _write(record: dict):
+    # One JSON line per record, appended right away: pool workers exit without running atexit hooks
+    if _sink['pid'] != os.getpid():
+        path = os.path.join(PROFILE_DIR, RUN_ID)
+        os.makedirs(path, exist_ok=True)
+        _sink['pid'], _sink['file'] = os.getpid(), open(os.path.join(path, f"{os.getpid()}.jsonl"), 'a', buffering=1)
+    _sink['file'].write(json.dumps(record, default=str) + "\n")
+
+def lp_size(model) -> dict:
+    """Rows, columns and (for GLPK) non-zeros of a model's LP."""
+    stats = {'rows': len(model.solver.constraints), 'columns': len(model.solver.variables), 'nonzeros': None}
+    if 'glpk' in model.solver.interface.__name__:
+        import swiglpk
+        stats['nonzeros'] = swiglpk.glp_get_num_nz(model.solver.problem)
+    return stats
+
+def solve_stats(model) -> dict:
+    """Status and simplex iterations of the model's last solve, plus the LP size (iterations are None for unsupported solvers)."""
+    problem, interface = model.solver.problem, model.solver.interface.__name__
+    iterations = None
+    try:
+        if 'glpk' in interface:
+            import swiglpk
+            iterations = swiglpk.glp_get_it_cnt(problem)
+        elif 'gurobi' in interface:
+            iterations = int(problem.IterCount)
+        elif 'cplex' in interface:
+            iterations = problem.solution.progress.get_num_iterations()
+    except Exception:
+        pass
+    return {'status': model.solver.status, 'iterations': iterations, 'solver': interface.rsplit('.', 1)[-1].replace('_interface', ''), **lp_size(model)}
+
+@contextmanager
+def profile(stage: str, model=None, **meta):
+    """
+    Time a block as one record of `stage`. With a `model`, the status, iterations and size of its last solve are added
+    (so wrap the solve itself). The yielded dict can be filled with extra fields (e.g. `rec['cache'] = 'hit'`).
+    Does nothing unless profiling is enabled.
+
+    Example:
+        with profile('fba.solve', model):
+            model.optimize()
+    """
+    if not ENABLED:
+        yield {}
+        return
+    record = {}
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        stats = solve_stats(model) if model is not None else {}
+        _write({
+            'stage': stage, 'wall': time.perf_counter() - wall, 'cpu': time.process_time() - cpu,
+            **stats, **meta, **record, 'pid': os.getpid(), 'time': time.time()
+        })
+
+def profiled(stage: str = None):
+    """Decorator recording every call of a function as a `stage` record (defaults to the function name). A no-op when profiling is off."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile(stage or func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def load_records(run: str = None) -> pd.DataFrame:
+    """All records of a run (defaults to the current one), from every process."""
+    path = run if run and os.path.isdir(run) else os.path.join(PROFILE_DIR, run or RUN_ID)
+    rows = [json.loads(line) for part in sorted(glob.glob(os.path.join(path, '*.jsonl'))) for line in open(part) if line.strip()]
+    return pd.DataFrame(rows)
+
+def summary(records: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per stage: number of calls, total/mean/p95/max wall time, share of the summed wall time, mean iterations,
+    largest LP and number of non-optimal solves. Nested stages (e.g. `load` inside a sweep) are counted in both.
+    """
+    if records.empty:
+        return pd.DataFrame()
+    records = records.reindex(columns=list(dict.fromkeys([*records.columns, 'status', 'iterations', 'rows', 'columns'])))
+    grouped = records.groupby('stage', sort=False)
+    table = pd.DataFrame({
+        'calls': grouped.size(),
+        'total_s': grouped['wall'].sum(),
+        'mean_ms': grouped['wall'].mean() * 1e3,
+        'p95_ms': grouped['wall'].quantile(0.95) * 1e3,
+        'max_ms': grouped['wall'].max() * 1e3,
+        'iterations': grouped['iterations'].mean(),
+        'rows': grouped['rows'].max(),
+        'columns': grouped['columns'].max(),
+        'not_optimal': grouped['status'].agg(lambda s: int((s.notna() & (s != 'optimal')).sum())),
+    })
+    table.insert(2, 'share', table['total_s'] / table['total_s'].sum())
+    return table.sort_values('total_s', ascending=False)
+
+def write_report(run: str = None, quiet: bool = False) -> str:
+    """Write `report.json` (environment, records and per-stage summary) into the run folder and print the summary table."""
+    path = run if run and os.path.isdir(run) else os.path.join(PROFILE_DIR, run or RUN_ID)
+    records = load_records(path)
+    if records.empty:
+        return None
+    table = summary(records)
+    report = {
+        'run': os.path.basename(os.path.normpath(path)),
+        'argv': sys.argv,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'cobra': cobra.__version__,
+        'summary': json.loads(table.reset_index().to_json(orient='records')),
+        'records': json.loads(records.to_json(orient='records')),
+    }
+    export_path = os.path.join(path, 'report.json')
+    with open(export_path, 'w') as f:
+        json.dump(report, f, indent=1)
+    if not quiet:
+        print(f"Profile ({len(records)} records) saved to {export_path}")
+        print(table.to_string(float_format=lambda x: f"{x:.3f}"))
+    return export_path
+
+if ENABLED and _OWNER:
+    atexit.register(write_report)
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='profiling',
+        description='Summarize a profiled run (FBA_PROFILE=1) into report.json and a per-stage table.'
+    )
+    parser.add_argument('run', nargs='?', help='Run folder or ID (defaults to the latest run).')
+    args = parser.parse_args()
+
+    run = args.run
+    if run is None:
+        runs = sorted(d for d in glob.glob(os.path.join(PROFILE_DIR, '*')) if os.path.isdir(d))
+        run = runs[-1] if runs else None
+    if run is None or write_report(run) is None:
+        print("No profile records found. Run a script with FBA_PROFILE=1 first.")
+        sys.exit(1)
+    exit(0)
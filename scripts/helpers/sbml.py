@@ -0,0 +1,301 @@
+from cobra import Model, Metabolite, Reaction, Configuration
+from cobra.core import Group
+from cobra.io.sbml import F_REPLACE
+from collections import Counter
+from typing import Iterator
+import xml.etree.ElementTree as ET
+import argparse, os, re, sys
+
+# SBML id -> cobra id, as in `io.read_sbml_model` (prefix clipped, __NUM__ escapes decoded)
+_f_specie, _f_reaction, _f_gene = F_REPLACE['F_SPECIE'], F_REPLACE['F_REACTION'], F_REPLACE['F_GENE']
+
+# Record element -> the list element it must sit in (kinetic law parameters, species references etc. aren't records)
+_CONTAINERS = {
+    'compartment': 'listOfCompartments',
+    'species': 'listOfSpecies',
+    'parameter': 'listOfParameters',
+    'reaction': 'listOfReactions',
+    'objective': 'listOfObjectives',
+    'geneProduct': 'listOfGeneProducts',
+    'group': 'listOfGroups',
+}
+
+_GPR_TOKENS = re.compile(r"[()\s]+")
+
+def _local(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+def _attr(elem: ET.Element, name: str, default=None):
+    """Attribute by local name, with or without a package namespace (e.g. `fbc:charge` or `charge`)."""
+    for key, value in elem.attrib.items():
+        if key == name or key.endswith('}' + name):
+            return value
+    return default
+
+def _notes(elem: ET.Element) -> dict[str, str]:
+    """COBRA-style `<p>KEY: value</p>` notes of an element."""
+    notes = {}
+    for child in elem:
+        if _local(child.tag) != 'notes': continue
+        for p in child.iter():
+            if _local(p.tag) != 'p': continue
+            key, sep, value = "".join(p.itertext()).partition(':')
+            if sep and value.strip():
+                notes[key.strip()] = value.strip()
+    return notes
+
+def _association(elem: ET.Element) -> str:
+    """GPR string of an `fbc:geneProductAssociation` subtree."""
+    tag = _local(elem.tag)
+    if tag == 'geneProductRef':
+        return _f_gene(_attr(elem, 'geneProduct'))
+    parts = [_association(child) for child in elem if _local(child.tag) in ('and', 'or', 'geneProductRef')]
+    if tag in ('and', 'or'):
+        return "(" + f" {tag} ".join(parts) + ")"
+    return parts[0] if parts else "" # geneProductAssociation wrapper
+
+class _Record:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            setattr(self, key, value)
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.id}>"
+
+class SBMLCompartment(_Record):
+    __slots__ = ('id', 'name')
+
+class SBMLMetabolite(_Record):
+    __slots__ = ('id', 'name', 'compartment', 'formula', 'charge', 'boundary', 'notes')
+
+class SBMLReaction(_Record):
+    __slots__ = ('id', 'name', 'metabolites', 'lower_bound', 'upper_bound', 'gene_reaction_rule', 'subsystem', 'objective_coefficient', 'notes')
+
+    @property
+    def genes(self) -> set[str]:
+        """Gene IDs of the GPR."""
+        return {t for t in _GPR_TOKENS.split(self.gene_reaction_rule) if t and t.lower() not in ('and', 'or')}
+
+class SBMLReader:
+    """
+    Streaming, read-only view of an SBML file for tools that only need IDs, counts, compartments or subsystems.
+    Each iterator makes its own `iterparse` pass, building light `__slots__` records and dropping the XML elements
+    as it goes, and stops as soon as the requested lists are read (e.g. compartments never touch the reactions).
+    Reads COBRA-style SBML: L2 notes (FORMULA, GENE_ASSOCIATION, SUBSYSTEM, kinetic law bounds) and L3 fbc/groups.
+    `to_model` promotes the whole file to a cobra `Model` when a tool does need one.
+
+    Args:
+        path (str): Path to the SBML file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.id = None
+
+    def _parse(self, kinds: set[str]) -> Iterator[tuple[str, object]]:
+        """Yield (kind, record) for the requested record kinds, in file order."""
+        config = Configuration()
+        wanted = {_CONTAINERS[kind] for kind in kinds}
+        parameters = {}
+        stack = []
+        for event, elem in ET.iterparse(self.path, events=('start', 'end')):
+            tag = _local(elem.tag)
+            if event == 'start':
+                if tag == 'model': self.id = elem.get('id')
+                stack.append(elem)
+                continue
+            stack.pop()
+            parent = stack[-1] if stack else None
+
+            if tag in wanted and _local(parent.tag) == 'model':
+                wanted.discard(tag)
+                if not wanted: return
+                continue
+            if tag not in _CONTAINERS or parent is None or _local(parent.tag) != _CONTAINERS[tag]:
+                continue
+            if tag == 'parameter' and _local(stack[-2].tag) != 'model':
+                continue
+
+            if tag == 'parameter':
+                parameters[elem.get('id')] = float(elem.get('value', 'nan'))
+            elif tag not in kinds:
+                pass
+            elif tag == 'compartment':
+                yield tag, SBMLCompartment(id=elem.get('id'), name=(elem.get('name') or '').strip())
+            elif tag == 'species':
+                notes = _notes(elem)
+                charge = _attr(elem, 'charge', notes.get('CHARGE'))
+                yield tag, SBMLMetabolite(
+                    id=_f_specie(elem.get('id')),
+                    name=(elem.get('name') or '').strip(),
+                    compartment=elem.get('compartment'),
+                    formula=_attr(elem, 'chemicalFormula', notes.get('FORMULA')) or None,
+                    charge=int(float(charge)) if charge not in (None, '') else None,
+                    boundary=elem.get('boundaryCondition') == 'true',
+                    notes=notes
+                )
+            elif tag == 'reaction':
+                yield tag, self._reaction(elem, parameters, config)
+            elif tag == 'objective':
+                refs = [ref for ref in elem.iter() if _local(ref.tag) == 'fluxObjective']
+                yield tag, (
+                    _attr(elem, 'type', 'maximize'),
+                    {_f_reaction(_attr(ref, 'reaction')): float(_attr(ref, 'coefficient', 1)) for ref in refs},
+                    _attr(parent, 'activeObjective') == _attr(elem, 'id')
+                )
+            elif tag == 'geneProduct':
+                yield tag, (_f_gene(_attr(elem, 'id')), _attr(elem, 'name') or _attr(elem, 'label'))
+            elif tag == 'group':
+                members = [_f_reaction(_attr(m, 'idRef')) for m in elem.iter() if _local(m.tag) == 'member' and _attr(m, 'idRef')]
+                yield tag, (_attr(elem, 'id'), _attr(elem, 'name') or _attr(elem, 'id'), members)
+
+            parent.remove(elem) # Processed: free the subtree
+
+    def _reaction(self, elem: ET.Element, parameters: dict[str, float], config: Configuration) -> SBMLReaction:
+        stoichiometry, local, rule = {}, {}, None
+        for child in elem:
+            tag = _local(child.tag)
+            if tag in ('listOfReactants', 'listOfProducts'):
+                sign = -1.0 if tag == 'listOfReactants' else 1.0
+                for ref in child:
+                    mid = _f_specie(ref.get('species'))
+                    stoichiometry[mid] = stoichiometry.get(mid, 0.0) + sign * float(ref.get('stoichiometry', 1))
+            elif tag == 'kineticLaw': # Legacy bounds and objective
+                local = {p.get('id'): float(p.get('value', 'nan')) for p in child.iter() if _local(p.tag) in ('parameter', 'localParameter')}
+            elif tag == 'geneProductAssociation':
+                rule = _association(child)
+
+        notes = _notes(elem)
+        if rule is None:
+            rule = notes.get('GENE ASSOCIATION', notes.get('GENE_ASSOCIATION', ''))
+            rule = " ".join(token.lower() if token in ('AND', 'OR') else _f_gene(token) for token in rule.split(" "))
+        lower, upper = _attr(elem, 'lowerFluxBound'), _attr(elem, 'upperFluxBound')
+        return SBMLReaction(
+            id=_f_reaction(elem.get('id')),
+            name=(elem.get('name') or '').strip(),
+            metabolites=stoichiometry,
+            lower_bound=parameters[lower] if lower in parameters else local.get('LOWER_BOUND', config.lower_bound),
+            upper_bound=parameters[upper] if upper in parameters else local.get('UPPER_BOUND', config.upper_bound),
+            gene_reaction_rule=rule,
+            subsystem=notes.get('SUBSYSTEM', ''),
+            objective_coefficient=local.get('OBJECTIVE_COEFFICIENT', 0.0),
+            notes=notes
+        )
+
+    def compartments(self) -> dict[str, str]:
+        """Compartment ID -> name (only reads up to the end of the compartment list)."""
+        return {rec.id: rec.name for _, rec in self._parse({'compartment'})}
+
+    def metabolites(self) -> Iterator[SBMLMetabolite]:
+        """Lazily yield the metabolites (species)."""
+        return (rec for _, rec in self._parse({'species'}))
+
+    def reactions(self) -> Iterator[SBMLReaction]:
+        """Lazily yield the reactions. `subsystem` comes from the notes, see `subsystems` for L3 groups."""
+        return (rec for _, rec in self._parse({'reaction'}))
+
+    def subsystems(self) -> dict[str, str]:
+        """Reaction ID -> subsystem, from the SBML groups if present, else the SUBSYSTEM notes."""
+        notes, groups = {}, {}
+        for kind, rec in self._parse({'reaction', 'group'}):
+            if kind == 'reaction':
+                if rec.subsystem: notes[rec.id] = rec.subsystem
+            else:
+                groups.update((rid, rec[1]) for rid in rec[2])
+        return groups or notes
+
+    def counts(self) -> dict[str, int]:
+        """Number of compartments, metabolites, reactions and genes, without building any cobra objects."""
+        counts, genes = Counter(), set()
+        for kind, rec in self._parse({'compartment', 'species', 'reaction'}):
+            counts[kind] += 1
+            if kind == 'reaction': genes |= rec.genes
+        return {'compartments': counts['compartment'], 'metabolites': counts['species'], 'reactions': counts['reaction'], 'genes': len(genes)}
+
+    def to_model(self) -> Model:
+        """
+        Promote the file to a cobra `Model` in one pass, without libsbml or validation.
+        Covers what `io.read_sbml_model` reads for COBRA-style files (bounds, GPRs, formulas, charges, notes, objective,
+        subsystems/groups, exchanges for boundary species) except annotations. Use `loader.load_model` for full fidelity.
+        """
+        records = {kind: [] for kind in _CONTAINERS}
+        for kind, rec in self._parse(set(_CONTAINERS) - {'parameter'}):
+            records[kind].append(rec)
+
+        model = Model(self.id)
+        model.compartments = {rec.id: rec.name for rec in records['compartment']}
+        metabolites = {}
+        for rec in records['species']:
+            met = Metabolite(rec.id, formula=rec.formula, name=rec.name, compartment=rec.compartment, charge=rec.charge)
+            met.notes = rec.notes
+            metabolites[rec.id] = met
+
+        config = Configuration()
+        reactions, objective, subsystems = [], {}, {}
+        for rec in records['species']:
+            if rec.boundary: # Same as cobra: boundary species get an exchange reaction
+                rxn = Reaction(f"EX_{rec.id}", name=f"EX_{rec.id}", lower_bound=config.lower_bound, upper_bound=config.upper_bound)
+                rxn.add_metabolites({metabolites[rec.id]: -1})
+                reactions.append(rxn)
+        for rec in records['reaction']:
+            rxn = Reaction(rec.id, name=rec.name, lower_bound=rec.lower_bound, upper_bound=rec.upper_bound)
+            rxn.add_metabolites({metabolites[mid]: coef for mid, coef in rec.metabolites.items()})
+            rxn.gene_reaction_rule = rec.gene_reaction_rule
+            rxn.subsystem, rxn.notes = rec.subsystem, rec.notes
+            if rec.objective_coefficient: objective[rxn] = rec.objective_coefficient
+            if rec.subsystem: subsystems.setdefault(rec.subsystem, []).append(rxn)
+            reactions.append(rxn)
+        # Metabolites join the model after the reactions reference them (cobra copies metabolites that already have a model)
+        model.add_metabolites(list(metabolites.values()))
+        model.add_reactions(reactions)
+
+        for gid, name in records['geneProduct']:
+            if gid in model.genes and name: model.genes.get_by_id(gid).name = name
+
+        direction = 'max'
+        objectives = records['objective']
+        if objectives: # fbc objectives replace legacy kinetic law coefficients
+            kind, coefficients, _ = next((obj for obj in objectives if obj[2]), objectives[0])
+            direction = 'min' if kind == 'minimize' else 'max'
+            objective = {model.reactions.get_by_id(rid): coef for rid, coef in coefficients.items()}
+        model.objective = objective
+        model.objective_direction = direction
+
+        groups = []
+        if records['group']:
+            for gid, name, members in records['group']:
+                group = Group(gid, name=name, kind='partonomy')
+                group.add_members([model.reactions.get_by_id(rid) for rid in members if rid in model.reactions])
+                groups.append(group)
+                for rxn in group.members: rxn.subsystem = name
+        else:
+            for name, members in subsystems.items():
+                group = Group(name, name=name, kind='partonomy')
+                group.add_members(members)
+                groups.append(group)
+        model.add_groups(groups)
+        return model
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='sbml',
+        description='Print the counts and compartments of an SBML model without loading it in cobra.'
+    )
+    parser.add_argument('sbmlpath')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.sbmlpath):
+        print(f"File not found: {args.sbmlpath}")
+        sys.exit(1)
+
+    reader = SBMLReader(args.sbmlpath)
+    names = reader.compartments()
+    per_compartment = Counter(met.compartment for met in reader.metabolites())
+    print(f"{reader.id}: " + ", ".join(f"{n} {kind}" for kind, n in reader.counts().items()))
+    for cid, n in per_compartment.most_common():
+        print(f"  {names.get(cid, cid)} ({cid}): {n} metabolites")
+    exit(0)
@@ -0,0 +1,246 @@
+from cobra import Model, Configuration
+from cobra.util import create_stoichiometric_matrix
+from multiprocessing import shared_memory
+from contextlib import contextmanager
+import argparse, os, sys, json
+import numpy as np
+import scipy.sparse as sp
+
+from scripts.helpers.loader import load_model
+
+# Arrays of a snapshot, in storage order
+FIELDS = ['data', 'indices', 'indptr', 'lb', 'ub', 'c', 'reactions', 'metabolites']
+
+# Header size prefix and array alignment (bytes) of the storage layout
+_PREFIX = 8
+_ALIGN = 64
+
+def _pack(arrays: dict[str, np.ndarray]) -> tuple[bytes, int]:
+    """Header of the storage layout (JSON: offset, dtype and shape per array) and the total size in bytes."""
+    align = lambda n: -(-n // _ALIGN) * _ALIGN
+    start = 0
+    while True: # The header holds the offsets, which depend on its own size
+        layout, offset = {}, start
+        for name in FIELDS:
+            layout[name] = [offset, arrays[name].dtype.str, list(arrays[name].shape)]
+            offset += align(arrays[name].nbytes)
+        header = json.dumps(layout).encode()
+        if align(_PREFIX + len(header)) <= start:
+            return header.ljust(start - _PREFIX), offset
+        start = align(_PREFIX + len(header))
+
+def _write(buffer: np.ndarray, header: bytes, arrays: dict[str, np.ndarray]):
+    """Copy the header and arrays into a uint8 buffer (shared memory block or memory-mapped file)."""
+    buffer[:_PREFIX] = np.frombuffer(len(header).to_bytes(_PREFIX, 'little'), dtype=np.uint8)
+    buffer[_PREFIX:_PREFIX + len(header)] = np.frombuffer(header, dtype=np.uint8)
+    for name, (offset, _, _) in json.loads(header).items():
+        raw = np.ascontiguousarray(arrays[name]).view(np.uint8).ravel()
+        buffer[offset:offset + raw.size] = raw
+
+def _read(buffer: np.ndarray) -> dict[str, np.ndarray]:
+    """Arrays viewing a uint8 buffer written by `_write` (no copy)."""
+    size = int.from_bytes(bytes(buffer[:_PREFIX]), 'little')
+    layout = json.loads(bytes(buffer[_PREFIX:_PREFIX + size]))
+    arrays = {}
+    for name, (offset, dtype, shape) in layout.items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        arrays[name] = buffer[offset:offset + count * dtype.itemsize].view(dtype).reshape(shape)
+    return arrays
+
+def unsupported(model: Model) -> list[str]:
+    """
+    Solver constraints and variables of a model that a snapshot doesn't hold (anything other than the mass balances
+    and reaction fluxes, e.g. from `add_cons_vars`). A model with any of them can't be solved from its snapshot.
+    """
+    fluxes = {v.name for rxn in model.reactions for v in (rxn.forward_variable, rxn.reverse_variable)}
+    return [c.name for c in model.constraints if c.name not in model.metabolites] + \
+        [v.name for v in model.variables if v.name not in fluxes]
+
+class ModelSnapshot:
+    """
+    Array-backed copy of a model's LP: the stoichiometric matrix S (metabolites x reactions, CSR), the flux bounds,
+    the objective vector (maximized, so minimizing objectives are negated) and the reaction/metabolite IDs.
+    Extra solver constraints and variables are not part of it (see `unsupported`).
+    A snapshot can be placed in shared memory (`share`/`attach`) or saved to a file (`save`/`open`), so worker processes
+    read the same arrays without a copy instead of each unpickling a cobra `Model`.
+
+    Args:
+        arrays (dict[str, np.ndarray]): One array per name in `FIELDS`.
+        buffer (optional): The shared memory block or memory map the arrays view, kept open with the snapshot.
+
+    Example:
+        snapshot = ModelSnapshot.from_model(model)
+        with snapshot.shared() as name:
+            pool.map(job, [name] * n) # Workers call ModelSnapshot.attach(name)
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], buffer=None):
+        self.arrays = arrays
+        self.buffer = buffer
+        self._shm = None
+        self._index = None
+
+    @classmethod
+    def from_model(cls, model: Model) -> 'ModelSnapshot':
+        """Snapshot a model's current stoichiometry, bounds and objective."""
+        S = sp.csr_matrix(create_stoichiometric_matrix(model, array_type='lil'))
+        bounds = np.array([rxn.bounds for rxn in model.reactions], dtype=float).reshape(-1, 2)
+        c = np.array([rxn.objective_coefficient for rxn in model.reactions], dtype=float)
+        if model.objective.direction == 'min':
+            c = -c
+        return cls({
+            'data': S.data.astype(float),
+            'indices': S.indices.astype(np.int32),
+            'indptr': S.indptr.astype(np.int64),
+            'lb': bounds[:, 0].copy(), 'ub': bounds[:, 1].copy(), 'c': c,
+            'reactions': np.array([rxn.id for rxn in model.reactions], dtype=str),
+            'metabolites': np.array([met.id for met in model.metabolites], dtype=str),
+        })
+
+    @property
+    def S(self) -> sp.csr_matrix:
+        """The stoichiometric matrix, viewing the snapshot's arrays."""
+        return sp.csr_matrix(
+            (self.arrays['data'], self.arrays['indices'], self.arrays['indptr']),
+            shape=(len(self.arrays['metabolites']), len(self.arrays['reactions'])), copy=False
+        )
+
+    @property
+    def lb(self) -> np.ndarray:
+        return self.arrays['lb']
+
+    @property
+    def ub(self) -> np.ndarray:
+        return self.arrays['ub']
+
+    @property
+    def c(self) -> np.ndarray:
+        return self.arrays['c']
+
+    @property
+    def reactions(self) -> np.ndarray:
+        return self.arrays['reactions']
+
+    @property
+    def metabolites(self) -> np.ndarray:
+        return self.arrays['metabolites']
+
+    @property
+    def index(self) -> dict[str, int]:
+        """Reaction ID -> column (built on first use, per process)."""
+        if self._index is None:
+            self._index = {rid: j for j, rid in enumerate(self.reactions.tolist())}
+        return self._index
+
+    def columns(self, ids: list[str]) -> np.ndarray:
+        """Columns of the given reaction IDs."""
+        return np.fromiter((self.index[rid] for rid in ids), dtype=np.int64, count=len(ids))
+
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def share(self) -> str:
+        """
+        Copy the snapshot into a new shared memory block and return its name, for `attach` in other processes.
+        The block lives until `unlink` (or the end of the `shared` block) is called in this process.
+        """
+        header, size = _pack(self.arrays)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        buffer = np.ndarray((size,), dtype=np.uint8, buffer=self._shm.buf)
+        _write(buffer, header, self.arrays)
+        return self._shm.name
+
+    @classmethod
+    def attach(cls, name: str) -> 'ModelSnapshot':
+        """Snapshot viewing a shared memory block created by `share` (no copy)."""
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(_read(np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)), buffer=shm)
+
+    def unlink(self):
+        """Free the shared memory block made by `share`."""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    @contextmanager
+    def shared(self):
+        """Share the snapshot for the duration of a `with` block, yielding the block name."""
+        name = self.share()
+        try:
+            yield name
+        finally:
+            self.unlink()
+
+    def save(self, path: str):
+        """Write the snapshot to a file, to be memory-mapped by `open`."""
+        header, size = _pack(self.arrays)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        buffer = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+        _write(buffer, header, self.arrays)
+        buffer.flush()
+        del buffer
+
+    @classmethod
+    def open(cls, path: str) -> 'ModelSnapshot':
+        """Snapshot memory-mapping a file written by `save` (read-only, pages are loaded on use and shared between processes)."""
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        return cls(_read(buffer), buffer=buffer)
+
+    def to_optlang(self, interface=None):
+        """
+        Build a solver problem from the arrays: one variable per reaction (net flux, named by reaction ID, within its bounds),
+        one mass balance constraint per metabolite (S v = 0) and the objective `max c v`. No cobra objects are created.
+
+        Args:
+            interface (module, optional): optlang interface, e.g. `optlang.glpk_interface`. Defaults to cobra's configured solver.
+
+        Returns:
+            tuple: The optlang `Model` and its variables, in reaction order.
+        """
+        interface = interface or Configuration().solver
+        problem = interface.Model()
+        variables = [interface.Variable(rid, lb=lb, ub=ub) for rid, lb, ub in zip(self.reactions.tolist(), self.lb.tolist(), self.ub.tolist())]
+        problem.add(variables)
+
+        constraints = [interface.Constraint(0, lb=0, ub=0, name=mid) for mid in self.metabolites.tolist()]
+        problem.add(constraints)
+        problem.update() # Coefficients can only be set once the constraints are in the solver
+        S = self.S
+        for i, constraint in enumerate(constraints):
+            start, stop = S.indptr[i], S.indptr[i + 1]
+            if start == stop: continue
+            constraint.set_linear_coefficients({variables[j]: v for j, v in zip(S.indices[start:stop].tolist(), S.data[start:stop].tolist())})
+
+        problem.objective = interface.Objective(0, direction='max')
+        problem.objective.set_linear_coefficients({variables[j]: self.c[j] for j in np.flatnonzero(self.c).tolist()})
+        problem.update()
+        return problem, variables
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='snapshot',
+        description='Export the LP arrays of a model (S, bounds, objective, IDs) to a memory-mappable snapshot file.'
+    )
+    parser.add_argument('sbmlpath')
+    parser.add_argument('-d', '--dest', help='Snapshot file (defaults to the model path with .snap).')
+    parser.add_argument('-o', '--objectives', help='Comma-separated objectives to store (defaults to the model objective).')
+    args = parser.parse_args()
+
+    model, error = load_model(args.sbmlpath)
+    if not model:
+        print(f"Error loading model: {error}")
+        sys.exit(1)
+
+    if args.objectives: # Equally weighted, as in `_fba.set_objectives`
+        objectives = args.objectives.split(',')
+        model.objective = {model.reactions.get_by_id(obj): 1.0 / len(objectives) for obj in objectives}
+
+    snapshot = ModelSnapshot.from_model(model)
+    export_path = args.dest or os.path.splitext(args.sbmlpath)[0] + '.snap'
+    snapshot.save(export_path)
+    print(f"Saved {len(snapshot.metabolites)} x {len(snapshot.reactions)} snapshot ({snapshot.nbytes() / 1e6:.1f} MB) to {export_path}")
+    exit(0)
@@ -0,0 +1,248 @@
+from cobra import Model
+import os, uuid, glob, tempfile, argparse, sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+from scripts.helpers.cache import model_hash
+
+# Store root (repo-level results/store unless overridden)
+STORE_DIR = os.environ.get(
+    'FBA_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'results', 'store')
+)
+
+# Columns identifying a run
+KEY = ['model_hash', 'construct', 'strain', 'objective', 'method']
+
+# Fixed schemas, so part files always line up (e.g. a run without status still has a string column)
+_key_fields = [pa.field(col, pa.string()) for col in KEY]
+SCHEMAS = {
+    'fluxes': pa.schema(_key_fields + [pa.field('reaction', pa.string()), pa.field('flux', pa.float64()), pa.field('run_id', pa.string())]),
+    'ranges': pa.schema(_key_fields + [
+        pa.field('reaction', pa.string()), pa.field('minimum', pa.float64()), pa.field('maximum', pa.float64()), pa.field('run_id', pa.string())
+    ]),
+    'runs': pa.schema(_key_fields + [
+        pa.field('run_id', pa.string()), pa.field('table', pa.string()), pa.field('objective_value', pa.float64()),
+        pa.field('status', pa.string()), pa.field('source', pa.string()), pa.field('timestamp', pa.timestamp('us', tz='UTC')),
+    ]),
+}
+
+def run_key(path: str) -> tuple[str, str]:
+    """
+    Construct and strain of a model file, from the repo layout `xmls/<strain>[/h]/<construct>.<ext>`.
+    The strain is the base-model folder right under `xmls/`, and sub-layouts stay in the construct name
+    (e.g. `xmls/MNL_iCre1355_auto_GAPFILL/h/SQS+MVA.patch` -> `('h/SQS+MVA', 'MNL_iCre1355_auto_GAPFILL')`).
+    A base model directly under `xmls/` is its own strain; outside an `xmls/` folder, the strain is the parent folder name.
+    """
+    parts = os.path.normpath(os.path.abspath(path)).split(os.sep)
+    name = os.path.splitext(parts[-1])[0]
+    if 'xmls' in parts[:-1]:
+        at = len(parts) - 1 - parts[::-1].index('xmls')
+        if at == len(parts) - 2:
+            return name, name
+        return "/".join(parts[at + 2:-1] + [name]), parts[at + 1]
+    return name, parts[-2]
+
+class ResultStore:
+    """
+    Append-only columnar store of solve results, one Parquet dataset per table:
+    - `fluxes`: FBA/pFBA fluxes (one row per reaction),
+    - `ranges`: FVA ranges (one row per reaction),
+    - `runs`: one row of metadata per run (objective value, status, source file, time).
+    Every append writes its own part file, so parallel writers never touch the same file and existing rows are never rewritten.
+    Rows are keyed by `KEY` plus a unique `run_id`; reads keep the latest run of each key by default.
+
+    Args:
+        root (str, optional): Store folder. Defaults to `FBA_STORE_DIR` (or ./results/store).
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or STORE_DIR
+
+    def _dir(self, table: str) -> str:
+        assert table in SCHEMAS, f"Unknown table '{table}', expected one of {list(SCHEMAS)}."
+        return os.path.join(self.root, table)
+
+    def _parts(self, table: str) -> list[str]:
+        return sorted(glob.glob(os.path.join(self._dir(table), '*.parquet')))
+
+    def _write(self, table: str, data: pd.DataFrame | pa.Table, name: str):
+        # Write to a temp file first so readers never see a partial part
+        if isinstance(data, pd.DataFrame):
+            data = pa.Table.from_pandas(data, schema=SCHEMAS[table], preserve_index=False)
+        path = self._dir(table)
+        os.makedirs(path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path, suffix='.tmp')
+        os.close(fd)
+        try:
+            pq.write_table(data, tmp)
+            os.replace(tmp, os.path.join(path, f"{name}.parquet"))
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+
+    def _append(
+        self,
+        table: str,
+        model: Model,
+        values: pd.DataFrame,
+        construct: str,
+        strain: str,
+        objectives: list[str],
+        method: str,
+        objective_value: float = None,
+        status: str = None,
+        source: str = None
+    ) -> str:
+        key = {
+            'model_hash': model_hash(model, objective=False),
+            'construct': construct,
+            'strain': strain,
+            'objective': "+".join(objectives),
+            'method': method,
+        }
+        run_id, timestamp = uuid.uuid4().hex, pd.Timestamp.now(tz='UTC')
+
+        rows = values.rename_axis('reaction').reset_index()
+        for col, val in reversed(key.items()):
+            rows.insert(0, col, val)
+        rows['run_id'] = run_id
+        self._write(table, rows, run_id)
+
+        run = {**key, 'run_id': run_id, 'table': table, 'objective_value': objective_value, 'status': status, 'source': source, 'timestamp': timestamp}
+        self._write('runs', pd.DataFrame([run]), run_id)
+        return run_id
+
+    def append_fluxes(self, model: Model, fluxes: pd.Series, construct: str, strain: str, objectives: list[str], method: str = 'fba', **meta) -> str:
+        """
+        Append the fluxes of one FBA/pFBA run.
+
+        Args:
+            model (Model): The solved model (hashed without its objective, the objective is part of the key).
+            fluxes (pd.Series): Fluxes indexed by reaction ID (e.g. `solution.fluxes`).
+            construct (str): Construct name (e.g. `SQS+MVA`, see `run_key`).
+            strain (str): Strain/base model name.
+            objectives (list[str]): Objective reactions of the run.
+            method (str, optional): Method name (`fba`, `pfba`, ...). Defaults to 'fba'.
+            **meta: `objective_value`, `status` and `source` for the `runs` table.
+
+        Returns:
+            str: The run ID.
+        """
+        return self._append('fluxes', model, fluxes.astype(float).rename('flux').to_frame(), construct, strain, objectives, method, **meta)
+
+    def append_ranges(self, model: Model, ranges: pd.DataFrame, construct: str, strain: str, objectives: list[str], method: str = 'fva', **meta) -> str:
+        """Append the `minimum`/`maximum` flux ranges of one FVA run (same arguments as `append_fluxes`)."""
+        return self._append('ranges', model, ranges[['minimum', 'maximum']].astype(float), construct, strain, objectives, method, **meta)
+
+    def read(self, table: str, reactions: list[str] = None, latest: bool = True, columns: list[str] = None, **filters) -> pd.DataFrame:
+        """
+        Filtered read of a table. Filters are pushed down to the Parquet scan, so only matching rows are loaded.
+
+        Args:
+            table (str): 'fluxes', 'ranges' or 'runs'.
+            reactions (list[str], optional): Only these reactions (ignored for 'runs').
+            latest (bool, optional): Keep only the most recent run of each key. Defaults to True.
+            columns (list[str], optional): Columns to load. Defaults to all.
+            **filters: Column filters, each a value or a list of accepted values (e.g. `method='pfba', construct=['SQS', 'SQE']`).
+
+        Returns:
+            pd.DataFrame: The matching rows (empty if the table doesn't exist yet).
+        """
+        parts = self._parts(table)
+        if not parts:
+            return pd.DataFrame(columns=columns or SCHEMAS[table].names)
+
+        if reactions is not None and table != 'runs':
+            filters['reaction'] = reactions
+        expr = None
+        for col, val in filters.items():
+            cond = ds.field(col).isin(list(val)) if isinstance(val, (list, tuple, set)) else ds.field(col) == val
+            expr = cond if expr is None else expr & cond
+
+        load = None if columns is None else list(dict.fromkeys(columns + ['run_id']))
+        frame = ds.dataset(parts, schema=SCHEMAS[table], format='parquet').to_table(columns=load, filter=expr).to_pandas()
+        if latest and not frame.empty:
+            frame = self._latest(frame)
+        return frame[columns] if columns else frame
+
+    def _latest(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Drop rows of runs superseded by a later run with the same key."""
+        runs = self.read('runs', latest=False)
+        newest = runs.sort_values('timestamp').drop_duplicates(KEY + ['table'], keep='last')['run_id']
+        return frame[frame['run_id'].isin(set(newest))].reset_index(drop=True)
+
+    def flux_matrix(self, reactions: list[str] = None, value: str = 'flux', index: str | list[str] = None, **filters) -> pd.DataFrame:
+        """
+        Runs x reactions table of the latest results, e.g. the FBA heatmap data, without re-solving anything.
+
+        Args:
+            reactions (list[str], optional): Reactions (columns) to include, in order. Defaults to all stored.
+            value (str, optional): 'flux' for FBA/pFBA, or 'minimum'/'maximum' for FVA ranges. Defaults to 'flux'.
+            index (str | list[str], optional): Key column(s) naming the rows. Defaults to the full `KEY`.
+            **filters: Key filters, as in `read` (e.g. `method='fba', objective='Biomass_Chlamy_auto'`).
+
+        Returns:
+            pd.DataFrame: One row per run, one column per reaction (NaN where a model lacks the reaction).
+
+        Raises:
+            ValueError: If `index` doesn't tell the matching runs apart (several values for one row and reaction).
+        """
+        table = 'fluxes' if value == 'flux' else 'ranges'
+        index = list(KEY) if index is None else [index] if isinstance(index, str) else list(index)
+        frame = self.read(table, reactions=reactions, columns=index + ['reaction', value], **filters)
+        if frame.empty:
+            return pd.DataFrame(columns=reactions)
+
+        clashes = frame[frame.duplicated(index + ['reaction'], keep=False)]
+        if not clashes.empty:
+            runs = clashes[index].drop_duplicates().to_dict('records')
+            raise ValueError(f"Index {index} doesn't identify a single run, add key columns or filters to split: {runs[:5]}")
+
+        matrix = frame.pivot(index=index, columns='reaction', values=value)
+        matrix.columns.name = None
+        return matrix.reindex(columns=reactions) if reactions else matrix
+
+    def compact(self, table: str):
+        """Merge a table's part files into one (same rows), to keep reads fast after many appends."""
+        parts = self._parts(table)
+        if len(parts) < 2:
+            return
+        merged = ds.dataset(parts, schema=SCHEMAS[table], format='parquet').to_table()
+        self._write(table, merged, f"compact-{uuid.uuid4().hex}")
+        for part in parts: os.remove(part)
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='store',
+        description='Export a runs x reactions table (e.g. heatmap data) from the result store.'
+    )
+    parser.add_argument('-s', '--store', default=None, help='Store folder (defaults to results/store).')
+    parser.add_argument('-m', '--method', default='fba')
+    parser.add_argument('-o', '--objectives', help='Comma-separated objective set, as passed to _fba/_fva.')
+    parser.add_argument('-r', '--reactions', help='Comma-separated reactions (columns).')
+    parser.add_argument('-v', '--value', default='flux', choices=['flux', 'minimum', 'maximum'])
+    parser.add_argument('-d', '--dest', help='CSV file to write (prints the table if omitted).')
+    args = parser.parse_args()
+
+    filters = {'method': args.method}
+    if args.objectives: filters['objective'] = "+".join(args.objectives.split(','))
+    matrix = ResultStore(args.store).flux_matrix(
+        reactions=args.reactions.split(',') if args.reactions else None,
+        value=args.value,
+        **filters
+    )
+    if matrix.empty:
+        print("No matching runs in the store.")
+        sys.exit(1)
+
+    if args.dest:
+        matrix.to_csv(args.dest)
+        print(f"Saved {matrix.shape[0]} runs x {matrix.shape[1]} reactions to {args.dest}")
+    else:
+        print(matrix)
+    exit(0)
@@ -1,31 +1,33 @@
 from cobra import Reaction, Model, Metabolite, io
 import numpy as np
 from builtins import map
+from difflib import SequenceMatcher
 
-def split_coef(inp: str) -> tuple[int, str]:
-    """Split coefficient from a product in equation (built for the repo .csv format)"""
+from scripts.helpers.ingest import parse_term
+from scripts.helpers.index import ModelIndex
+
+def split_coef(inp: str, known: set[str] = None) -> tuple[int, str]:
+    """Split coefficient from a product in equation (built for the repo .csv format, see `ingest.parse_term`)"""
     try:
-        coef, cpd = inp[:1], inp[1:]
-        coef = 1 if coef == "" else int(coef)
-        return coef, cpd
-    except:
-        return 1, inp
+        return parse_term(inp, known)
+    except ValueError:
+        return 1, inp.strip()
 
-def split_coef_reac(inp: str) -> tuple[int, str]:
+def split_coef_reac(inp: str, known: set[str] = None) -> tuple[int, str]:
     """Split coefficient from a reaction in equation (built for the repo .csv format)"""
-    res = split_coef(inp)
+    res = split_coef(inp, known)
     return -1 * res[0], res[1]
 
-def find_rxns_with_metabolites(model: Model, metabolites: list[str]):
+def sort_by_similarity(items: list[tuple[str, str]], query: str) -> list[tuple[str, str]]:
+    """Sort (id, name) pairs by how closely their id or name matches `query` (closest first)"""
+    query = query.lower()
+    score = lambda item: max(SequenceMatcher(None, query, str(field).lower()).ratio() for field in item)
+    return sorted(items, key=score, reverse=True)
 
-    rxns_with_mets = []
-    for rxn in model.reactions:
-        for met, coef in list(rxn.metabolites.items()):
-            print(f'Rxn: {rxn.id} --- Met: {met.id}')
-            if met.id in metabolites:
-                rxns_with_mets.append(rxn.id)
-                break
-    return rxns_with_mets
+def find_rxns_with_metabolites(model: Model, metabolites: list[str], index: ModelIndex = None) -> list[str]:
+    """Reactions involving any of the metabolites, in model order. Pass a `ModelIndex` (e.g. `load_index(path)`) to reuse it across queries."""
+    index = index or ModelIndex.from_model(model)
+    return index.query(metabolites=[met for met in metabolites if met in index.compartments])
 
 def get_rxn_metabolites(reaction_id: str, model: Model) -> tuple[list[Metabolite], list[int]]:
 
@@ -1,5 +1,5 @@
 # Cobra package
-from cobra import io
+from cobra import io, Model
 from cobra.core import Reaction, Metabolite
 # Other
 import os, sys, argparse
@@ -7,126 +7,151 @@ import pandas as pd
 from json import loads
 
 # Toolbox
-from scripts.helpers.tools import split_coef, split_coef_reac
-from scripts.helpers.model import add_single_gene_reaction_pair, met_in_model
+from scripts.helpers.ingest import table_equations, table_metabolites
+from scripts.helpers.model import ModelEditor
+from scripts.helpers.loader import load_model
+from scripts.helpers.index import ModelIndex, load_index
+from scripts.helpers.patch import diff_models, write_patch, PATCH_EXT
 
-def alter(argpath: str, chloroplast: bool):
+# Enzymes that stay in the cytosol for chloroplast constructs
+CYTOSOLIC_EC = ["2.5.1.21", "1.14.14.17"]
 
-    ref, _ = io.validate_sbml_model(argpath, validate=True)
-    if not ref:
-        print('No model recognized. Exiting...')
-        sys.exit(1)
+def load_tables() -> tuple[pd.DataFrame, pd.DataFrame, list[dict]]:
+    """Load the alteration tables for reactions and compounds, and the blueprint of alterations."""
 
-    # Extract model name
-    ref_name = os.path.split(args.sbmlpath)[-1].split('.')[0]
-
-    # Import alteration tables for reactions and compounds
     rxns_df = pd.read_csv("./data/altered/tables/stable/reactions.csv")
     cpds_df = pd.read_csv("./data/altered/tables/stable/compounds.csv")
 
-    # Load blueprint of alterations
     bp_path = "./data/altered/blueprint.json"
     if not os.path.exists(bp_path): # Will never happen in the current setup
         print(f"Blueprint file not found at {bp_path}. Exiting...")
         sys.exit(1)
-    
-    blueprint = []
+
     with open(bp_path, 'r') as f:
         blueprint = loads(f.read())
-    
-    # Add compounds to reference from cpds_df
-    for cpd in cpds_df['ID'].values:
-        # Get the fields of ID, Name, and Formula, and separate into variables
-        cpd_id = cpd
-        cpd_name = cpds_df[cpds_df['ID'] == cpd]['NAME'].values[0]
-        cpd_formula = cpds_df[cpds_df['ID'] == cpd]['FORMULA'].values[0]
-        cpd_comp = 'c'
-
-        if chloroplast:
-            cpd_comp = 'h'
-            cpd_id = cpd[:-2] + "_h"
-
-        # Make new metabolite and save to model
-        newMet = Metabolite(
-            id=cpd_id,
-            name=cpd_name,
-            formula=cpd_formula,
-            charge=0, # Default charge (could change later)
-            compartment=cpd_comp,
+
+    return rxns_df, cpds_df, blueprint
+
+def index_reactions(rxns_df: pd.DataFrame, chloroplast: bool, known: set[str] = None) -> dict[str, list[dict]]:
+    """
+    Group the alteration reactions by EC number, parsing all equations in one batch (`known` metabolite IDs resolve
+    terms like "10fthf_c", see `parse_term`). Rows keep their table position (`POS`) so constructs add reactions in table order.
+    """
+    equations = table_equations(rxns_df, known).tolist()
+    ec_index = {}
+    for pos, (row, mets) in enumerate(zip(rxns_df.to_dict('records'), equations)):
+        if chloroplast and row['EC'] not in CYTOSOLIC_EC:
+            mets = [(coef, met_id[:-2] + "_h") for coef, met_id in mets]
+        ec_index.setdefault(row['EC'], []).append({**row, 'POS': pos, 'METS': mets})
+    return ec_index
+
+def known_metabolites(index: ModelIndex, cpds_df: pd.DataFrame) -> set[str]:
+    """Metabolite IDs an alteration equation may use: the model's (from its `ModelIndex`) and the (cytosolic) table compounds."""
+    return set(index.compartments) | set(cpds_df['ID'].tolist())
+
+def add_compounds(ref: Model, cpds_df: pd.DataFrame, chloroplast: bool):
+    """Add compounds from the alteration table to the reference model, in a single call."""
+    new_mets = table_metabolites(cpds_df, name='NAME', compartment='h' if chloroplast else 'c')
+    if chloroplast:
+        for met in new_mets:
+            met.id = met.id[:-2] + "_h"
+    ref.add_metabolites(new_mets)
+
+def apply_construct(model: Model, item: dict, ec_index: dict[str, list[dict]], chloroplast: bool):
+    """
+    Add the reactions of one blueprint item to the model.
+    Run it inside `with model:` to roll the construct back afterwards instead of copying the model.
+    """
+    editor = ModelEditor(model)
+    if chloroplast:
+        # Add aacoa_h <--> aacoa_c reaction for safety
+        AACOAc = model.metabolites.get_by_id('aacoa_c')
+        AACOAh = Metabolite(
+            id='aacoa_h',
+            name='Acetoacetyl-CoA',
+            formula=AACOAc.formula,
+            charge=0,
+            compartment='h',
+        )
+        editor.add_metabolites([AACOAh])
+        # Add the transport reaction
+        editor.add_gene_reaction_pair(
+            gene_id='AACOAth',
+            reaction_id='AACOAth',
+            reaction_name='Acetoacetyl-CoA:CoA antiporter, Chloroplast',
+            reaction_subsystem='Transport, chloroplast',
+            metabolites=[(-1, AACOAc.id), (1, AACOAh.id)],
+            reversible=True
+        )
+
+    # Add reactions of the item's enzymes, in table order
+    rows = sorted((row for ec in set(item['ec']) for row in ec_index.get(ec, [])), key=lambda x: x['POS'])
+    for row in rows:
+        editor.add_gene_reaction_pair(
+            gene_id=row['GENE_ID'],
+            reaction_id=row['ID'],
+            reaction_name=row['NAME'],
+            reaction_subsystem=row['PATHWAY'],
+            metabolites=row['METS']
         )
-        ref.add_metabolites([newMet])
-    
-    # Build each blueprint iteration
+    editor.commit()
+
+def build_constructs(ref: Model, ref_name: str, blueprint: list[dict], ec_index: dict[str, list[dict]], chloroplast: bool):
+    """
+    Yield `(item, model)` for every blueprint item, where `model` is `ref` with the item's reactions applied.
+    The reactions are rolled back before the next item, so use (or export) each model before advancing the generator.
+    """
     for item in blueprint:
+        with ref:
+            apply_construct(ref, item, ec_index, chloroplast)
+            ref.name = ref_name + "_" + item['name']
+            yield item, ref
+        ref.name = ref_name
+
+def alter(argpath: str, chloroplast: bool, batch: bool = False, sbml: bool = False):
+    """
+    Build every blueprint construct of a model and save it to `./data/altered/xmls/<model>[/h]`, as a patch over the
+    model (`<item>.patch`, loadable with `load_model`) or, with `sbml`, as a full SBML copy (`<item>.xml`).
+    """
+
+    ref, _ = load_model(argpath, validate=True)
+    if not ref:
+        print('No model recognized. Exiting...')
+        sys.exit(1)
+    base = None if sbml else load_model(argpath, validate=True)[0] # Untouched copy to diff the constructs against
+
+    # Extract model name
+    ref_name = os.path.split(argpath)[-1].split('.')[0]
+    ref_count = len(ref.reactions)
+
+    rxns_df, cpds_df, blueprint = load_tables()
+    ec_index = index_reactions(rxns_df, chloroplast, known_metabolites(load_index(argpath), cpds_df))
+
+    save_path = f"./data/altered/xmls/{ref_name}" + ("/h" if chloroplast else "")
+    os.makedirs(save_path, exist_ok=True)
+
+    with ref:
+        # Add compounds to reference from cpds_df
+        add_compounds(ref, cpds_df, chloroplast)
+
+        # Build each blueprint iteration
+        for item, model in build_constructs(ref, ref_name, blueprint, ec_index, chloroplast):
+
+            print(f"\n\nProcessing item: {item['name']}")
+
+            # Print out results
+            print(f"New model {model.name} has {len(model.reactions)} reactions.")
+            print(f"Control model {ref_name} had {ref_count} reactions.")
+
+            # Save altered model to repo
+            if sbml:
+                io.write_sbml_model(model, os.path.join(save_path, f"{item['name']}.xml"))
+            else:
+                write_patch(diff_models(base, model), os.path.join(save_path, f"{item['name']}{PATCH_EXT}"), argpath)
 
-        print(f"\n\nProcessing item: {item['name']}")
-        model = ref.copy()
-        model.name = ref_name + "_" + item['name']
-
-        if chloroplast:
-            # Add aacoa_h <--> aacoa_c reaction for safety
-
-            # ACCOAh = model.metabolites.get_by_id('accoa_h')
-            # CoAh = model.metabolites.get_by_id('coa_h')
-
-            # Add Acetoacetyl-CoA for chloroplast
-            AACOAc = model.metabolites.get_by_id('aacoa_c')
-            AACOAh = Metabolite(
-                id='aacoa_h',
-                name='Acetoacetyl-CoA',
-                formula=AACOAc.formula,
-                charge=0,
-                compartment='h',
-            )
-            model.add_metabolites([AACOAh])
-            # Add the transport reaction
-            add_single_gene_reaction_pair(
-                model=model,
-                gene_id='AACOAth',
-                reaction_id='AACOAth',
-                reaction_name='Acetoacetyl-CoA:CoA antiporter, Chloroplast',
-                reaction_subsystem='Transport, chloroplast',
-                metabolites=[(-1, AACOAc.id), (1, AACOAh.id)],
-                reversible=True
-            )
-
-        # Add reactions in blueprint iteration
-        for _, row in rxns_df.iterrows():
-
-            # Ignore if blueprint item doesn't contain the enzyme ec
-            if not row['EC'] in item['ec']: continue
-
-            # Get list of metabolites involved in the reaction
-            reactants = list(map(split_coef_reac, row['REACTANTS'].split('+')))
-            products = list(map(split_coef, row['PRODUCTS'].split('+')))
-            mets = [*reactants, *products]
-
-            if chloroplast and row['EC'] not in ["2.5.1.21", "1.14.14.17"]:
-                mets = list(map(lambda x: (x[0], x[1][:-2] + "_h"), mets))
-
-            # print(mets)
-
-            # Add reaction to model copy
-            add_single_gene_reaction_pair(
-                model=model,
-                gene_id=row['GENE_ID'],
-                reaction_id=row['ID'],
-                reaction_name=row['NAME'],
-                reaction_subsystem=row['PATHWAY'],
-                metabolites=mets
-            )
-        
-        # Print out results
-        print(f"New model {model.name} has {len(model.reactions)} reactions.")
-        print(f"Control model {ref_name} had {len(ref.reactions)} reactions.")
-
-        # Save altered model to repo
-        save_path = f"./data/altered/xmls/{ref_name}" + ("/h" if chloroplast else "")
-        if not os.path.exists(save_path): os.makedirs(save_path)
-        io.write_sbml_model(model, os.path.join(save_path, f"{item['name']}.xml"))
-
-        _ = input("Model Saved. Press Enter to continue...")
-        os.system('cls') # Clear terminal to avoid clump
+            if not batch:
+                _ = input("Model Saved. Press Enter to continue...")
+                os.system('cls') # Clear terminal to avoid clump
 
 
 if __name__ == "__main__":
@@ -136,8 +161,15 @@ if __name__ == "__main__":
         prog='_load_model',
         description='Load and validate your fba metabolic model from the .sbml format.'
     )
-    parser.add_argument('sbmlpath')
+    parser.add_argument('sbmlpath', nargs='+')
     parser.add_argument('-ch', '--chloroplast', action='store_true')
+    parser.add_argument('-a', '--all', action='store_true', help='Build both cytosolic and chloroplast constructs.')
+    parser.add_argument('-b', '--batch', action='store_true', help='Export every construct without pausing.')
+    parser.add_argument('-x', '--sbml', action='store_true', help='Save full SBML models instead of patches over the input model.')
     args = parser.parse_args()
 
-    alter(args.sbmlpath, args.chloroplast)
\ No newline at end of file
+    layouts = [False, True] if args.all else [args.chloroplast]
+    batch = args.batch or args.all or len(args.sbmlpath) > 1
+    for path in args.sbmlpath:
+        for chloroplast in layouts:
+            alter(path, chloroplast, batch, args.sbml)
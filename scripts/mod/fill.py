@@ -1,10 +1,10 @@
 from cobra import io
-from cobra.core import Metabolite, Reaction, Model
 import os, argparse
 import pandas as pd
 
-from scripts.helpers.model import add_single_gene_reaction_pair
-from scripts.helpers.tools import split_coef, split_coef_reac
+from scripts.helpers.model import ModelEditor
+from scripts.helpers.ingest import table_equations, table_metabolites
+from scripts.helpers.loader import load_model
 
 if __name__ == "__main__":
 
@@ -16,7 +16,7 @@ if __name__ == "__main__":
     parser.add_argument('sbmlpath')
     args = parser.parse_args()
 
-    old, err = io.validate_sbml_model(args.sbmlpath)
+    old, err = load_model(args.sbmlpath)
     if not old:
         print(f"Error loading model: {err}")
         exit(1)
@@ -30,31 +30,23 @@ if __name__ == "__main__":
     compounds_df = pd.read_csv("./data/fill/tables/stable/compounds.csv")
 
     print("Adding compounds ...\n")
-    for index, row in compounds_df.iterrows():
-
-        newMet = Metabolite(
-            id=row['ID'],
-            name=row['NAME_SHORT'],
-            formula=row['FORMULA'],
-            charge=row['CHARGE'],  # Default charge (could change later)
-            compartment='c',
-        )
-        model.add_metabolites([newMet])
-
-    for index, row in reactions_df.iterrows():
-
-        # Get reactants x products
-        reactants = list(map(split_coef_reac, row['REACTANTS'].split('+')))
-        products = list(map(split_coef, row['PRODUCTS'].split('+')))
-        # Add reaction to list
-        add_single_gene_reaction_pair(
-            model=model,
+    editor = ModelEditor(model)
+    editor.add_metabolites(table_metabolites(compounds_df, name='NAME_SHORT', compartment='c', charge='CHARGE'))
+
+    # Parse every equation at once (model and table IDs resolve terms like "10fthf_c"), then queue the reactions:
+    # they are all added with a single call on commit
+    equations = table_equations(reactions_df, known=set(editor.metabolites))
+    reversible = reactions_df['REVERSIBLE'].astype(str).str.lower().eq('true').tolist()
+    for row, mets, rev in zip(reactions_df.to_dict('records'), equations.tolist(), reversible):
+        editor.add_gene_reaction_pair(
             gene_id=row['GENE_ID'],
             reaction_id=row['ID'],
             reaction_name=row['NAME'],
             reaction_subsystem=row['PATHWAY'],
-            metabolites=[*reactants, *products]
+            metabolites=mets,
+            reversible=rev
         )
+    editor.commit()
 
     print(f"\n\nFinal model has {len(model.metabolites)} metabolites and {len(model.reactions)} reactions.")
     print(f"Old model has {len(old.metabolites)} metabolites and {len(old.reactions)} reactions.")
@@ -0,0 +1,261 @@
+from cobra import io, Model
+from cobra.core import Reaction, Metabolite
+from cobra.manipulation import remove_genes
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os, sys, re, argparse, itertools
+import pandas as pd
+
+from scripts.helpers.model import add_single_gene_reaction_pair
+from scripts.helpers.loader import load_model
+
+# kcat values are per second, fluxes per hour
+SECONDS_PER_HOUR = 3600
+
+# Constraint levels of the emitted models
+ITERATIONS = {
+    1: dict(kcat=False, pool=False, availability=False), # UniProt gene IDs only
+    2: dict(kcat=True, pool=False, availability=True),   # kcat usage, each enzyme capped by its availability
+    3: dict(kcat=True, pool=True, availability=False),   # kcat usage, enzymes share one protein pool
+    4: dict(kcat=True, pool=True, availability=True),    # shared pool and individual availability caps
+}
+
+GPR_TOKEN = re.compile(r"[^\s()]+")
+
+def load_enzymes(path: str = "./data/gecko/tables/enzymes.csv") -> pd.DataFrame:
+    """
+    Load the enzyme table: one row per gene with its UniProt ID, kcat (1/s), molecular weight (kDa)
+    and measured availability (mmol/gDW). Rows sharing a `SLOT` are alternative strains of the same gene.
+    """
+    enzymes = pd.read_csv(path, dtype={'GENE': str, 'UNIPROT': str, 'SLOT': str, 'ORGANISM': str, 'NOTE': str})
+    enzymes[['SLOT', 'ORGANISM', 'NOTE']] = enzymes[['SLOT', 'ORGANISM', 'NOTE']].fillna('')
+    return enzymes
+
+def strain_combinations(enzymes: pd.DataFrame) -> list[tuple[dict[str, str], pd.DataFrame]]:
+    """
+    Every combination of strain alternatives, as `({slot: organism}, table)`.
+    `table` holds the fixed rows plus the chosen alternative of each slot.
+    """
+    fixed = enzymes[enzymes['SLOT'] == '']
+    slots = [(slot, rows) for slot, rows in enzymes[enzymes['SLOT'] != ''].groupby('SLOT', sort=False)]
+
+    combos = []
+    for choice in itertools.product(*[list(rows.iterrows()) for _, rows in slots]):
+        label = {slot: row['ORGANISM'] for (slot, _), (_, row) in zip(slots, choice)}
+        table = pd.concat([fixed, pd.DataFrame([row for _, row in choice])])
+        combos.append((label, table))
+    return combos
+
+def gene_reaction_index(model: Model) -> dict[str, list[Reaction]]:
+    """Map each gene ID to the reactions whose GPR mentions it, in a single pass over the reactions."""
+    index = {}
+    for rxn in model.reactions:
+        for gene in rxn.genes:
+            index.setdefault(gene.id, []).append(rxn)
+    return index
+
+def map_uniprot(model: Model, mapping: dict[str, str]) -> int:
+    """
+    Rewrite GPRs to use UniProt IDs (`mapping`: gene ID -> UniProt ID) and drop the replaced genes.
+    A rule whose genes all map to the same protein collapses to that protein. Returns the number of rewritten reactions.
+    """
+    index = gene_reaction_index(model)
+    touched = {rxn.id: rxn for gene_id in mapping if gene_id in index for rxn in index[gene_id]}
+
+    for rxn in touched.values():
+        rule = GPR_TOKEN.sub(lambda t: mapping.get(t.group(0), t.group(0)), rxn.gene_reaction_rule)
+        genes = set(GPR_TOKEN.findall(rule)) - {'and', 'or'}
+        rxn.gene_reaction_rule = genes.pop() if len(genes) == 1 else rule
+
+    # Old genes are now orphans (unless they are also a target ID), remove them all at once
+    orphans = [model.genes.get_by_id(g) for g in mapping if g in model.genes and g not in mapping.values() and not model.genes.get_by_id(g).reactions]
+    if orphans:
+        remove_genes(model, orphans, remove_reactions=False)
+    return len(touched)
+
+def add_exchanges(model: Model):
+    """Add the ergosterol and orthophosphate exchange reactions used by the GECKO runs, if not present."""
+    ERG, ERGEXCH = "ergosterol_c", "ERGOSTEROLEXCH"
+    if ERGEXCH not in model.reactions:
+        add_single_gene_reaction_pair(
+            model=model,
+            gene_id="EXCHERG_GENE",
+            reaction_id=ERGEXCH,
+            reaction_name="Ergosterol exchange (assumption)",
+            reaction_subsystem="Exchange",
+            metabolites=[(-1, ERG)],
+            reversible=True
+        )
+
+    ORTHOP, EXCHORTHOP = "orthop_c", "ORTHOPHOSPHATEEXCH"
+    if EXCHORTHOP not in model.reactions and ORTHOP in model.metabolites:
+        add_single_gene_reaction_pair(
+            model=model,
+            gene_id="EXCHORTHOP",
+            reaction_id=EXCHORTHOP,
+            reaction_name="Orthophosphate exchange (assumption)",
+            reaction_subsystem="Exchange",
+            metabolites=[(-1, ORTHOP)],
+            reversible=True
+        )
+
+def default_pool(enzymes: pd.DataFrame) -> float:
+    """Protein pool (g/gDW) holding the measured availability of every enzyme, so the pool only lets them reallocate it."""
+    kinetic = enzymes.dropna(subset=['KCAT', 'AVAILABILITY']).drop_duplicates('UNIPROT')
+    mw = kinetic['MW'].fillna(enzymes['MW'].mean())
+    return float((kinetic['AVAILABILITY'] * mw).sum())
+
+def add_enzyme_constraints(
+    model: Model,
+    enzymes: pd.DataFrame,
+    pool: float = None,
+    availability: bool = True
+) -> int:
+    """
+    Add GECKO-style enzyme usage to the model in one pass (run on a model whose genes are UniProt IDs).
+
+    Every reaction catalysed by an enzyme with a kcat consumes the enzyme pseudo-metabolite `prot_<UniProt>`
+    at 1 / (kcat * 3600) mmol per unit flux. Reversible reactions are split into `<id>` and `<id>_REV` first,
+    so both directions draw enzyme. Complexes (`and`) draw every subunit, isozymes (`or`) the slowest one.
+    Enzymes are supplied by `prot_<UniProt>_exchange` (capped by availability), or, with a pool, by
+    `draw_prot_<UniProt>` from `prot_pool` (weighted by molecular weight), itself capped by `prot_pool_exchange`.
+
+    Args:
+        model (Model): The metabolic model to constrain. Run inside `with model:` to roll the constraints back.
+        enzymes (pd.DataFrame): Enzyme table of one strain combination (see `load_enzymes`).
+        pool (float, optional): Protein pool size in g/gDW. Defaults to no pool (each enzyme supplied on its own).
+        availability (bool, optional): Cap each enzyme at its measured availability. Defaults to True.
+
+    Returns:
+        int: The number of enzyme-constrained reactions.
+    """
+    kinetic = enzymes.dropna(subset=['KCAT']).drop_duplicates('UNIPROT').set_index('UNIPROT')
+    mean_mw = enzymes['MW'].mean()
+    index = gene_reaction_index(model)
+
+    # Enzymes drawn by each reaction
+    usage: dict[str, list[str]] = {}
+    for uid in kinetic.index:
+        for rxn in index.get(uid, []):
+            usage.setdefault(rxn.id, []).append(uid)
+    for rid, uids in usage.items():
+        if " and " not in model.reactions.get_by_id(rid).gene_reaction_rule:
+            usage[rid] = [min(uids, key=lambda u: kinetic.loc[u, 'KCAT'])]
+
+    used = sorted({uid for uids in usage.values() for uid in uids})
+    if not used:
+        return 0
+    prots = {uid: Metabolite(f"prot_{uid}", name=f"Enzyme {uid}", compartment='c') for uid in used}
+    model.add_metabolites(list(prots.values()))
+
+    # Split reversible reactions, then attach enzyme usage to both directions
+    new_rxns, targets = [], []
+    for rid, uids in usage.items():
+        rxn = model.reactions.get_by_id(rid)
+        targets.append((rxn, uids))
+        if rxn.lower_bound < 0:
+            rev = Reaction(f"{rid}_REV", name=f"{rxn.name} (reverse)", subsystem=rxn.subsystem, lower_bound=0, upper_bound=-rxn.lower_bound)
+            rev.add_metabolites({met: -coef for met, coef in rxn.metabolites.items()})
+            rev.gene_reaction_rule = rxn.gene_reaction_rule
+            new_rxns.append(rev)
+            targets.append((rev, uids))
+            rxn.lower_bound = 0
+
+    # Enzyme supply
+    cap = lambda uid: float(kinetic.loc[uid, 'AVAILABILITY']) if availability and pd.notna(kinetic.loc[uid, 'AVAILABILITY']) else 1000.0
+    if pool is None:
+        for uid in used:
+            supply = Reaction(f"prot_{uid}_exchange", name=f"Enzyme {uid} supply", lower_bound=0, upper_bound=cap(uid))
+            supply.add_metabolites({prots[uid]: 1})
+            new_rxns.append(supply)
+    else:
+        pool_met = Metabolite("prot_pool", name="Protein pool", compartment='c')
+        pool_rxn = Reaction("prot_pool_exchange", name="Protein pool exchange", lower_bound=0, upper_bound=pool)
+        pool_rxn.add_metabolites({pool_met: 1})
+        new_rxns.append(pool_rxn)
+        for uid in used:
+            mw = kinetic.loc[uid, 'MW'] if pd.notna(kinetic.loc[uid, 'MW']) else mean_mw
+            draw = Reaction(f"draw_prot_{uid}", name=f"Draw enzyme {uid} from pool", lower_bound=0, upper_bound=cap(uid))
+            draw.add_metabolites({pool_met: -float(mw), prots[uid]: 1})
+            new_rxns.append(draw)
+    model.add_reactions(new_rxns)
+
+    for rxn, uids in targets:
+        rxn.add_metabolites({prots[uid]: -1.0 / (float(kinetic.loc[uid, 'KCAT']) * SECONDS_PER_HOUR) for uid in uids})
+    return len(usage)
+
+def build_iterations(model: Model, enzymes: pd.DataFrame, iterations: list[int], pool: float = None):
+    """
+    Yield `(iteration, model)` for each requested constraint level (see `ITERATIONS`).
+    `model` must already use UniProt IDs. Constraints are rolled back before the next level,
+    so use (or export) each model before advancing the generator.
+    """
+    pool = pool if pool is not None else default_pool(enzymes)
+    for it in iterations:
+        level = ITERATIONS[it]
+        with model:
+            if level['kcat']:
+                add_enzyme_constraints(model, enzymes, pool=pool if level['pool'] else None, availability=level['availability'])
+            yield it, model
+
+def _build_variant(
+    name: str,
+    path: str,
+    combos: list[tuple[dict[str, str], pd.DataFrame]],
+    iterations: list[int],
+    dest: str,
+    pool: float
+) -> list[str]:
+    """Worker job: load one model and export its GECKO iterations for every strain combination."""
+    base, error = load_model(path, validate=False)
+    if not base:
+        print(f"Error loading model {path}: {error}")
+        return []
+
+    saved = []
+    for label, enzymes in combos:
+        try:
+            model = base.copy()
+            map_uniprot(model, dict(zip(enzymes['GENE'], enzymes['UNIPROT'])))
+            add_exchanges(model)
+            for it, gecko in build_iterations(model, enzymes, iterations, pool=pool):
+                save_path = os.path.join(dest, f"iter{it}", *[f"{slot}={org}" for slot, org in label.items()])
+                os.makedirs(save_path, exist_ok=True)
+                io.write_sbml_model(gecko, os.path.join(save_path, f"{name}.xml"))
+                saved.append(os.path.join(save_path, f"{name}.xml"))
+        except Exception as e:
+            print(f"Error building {name} ({label}): {e!r}")
+    return saved
+
+
+if __name__ == "__main__":
+
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='gecko',
+        description='Build enzyme-constrained (GECKO-style) models for every strain combination and iteration.'
+    )
+    parser.add_argument('sbmlpath', nargs='*', help='Construct models (named by file name).')
+    parser.add_argument('-w', '--wildtype', help='Model file exported as "Wildtype".')
+    parser.add_argument('-t', '--table', default='./data/gecko/tables/enzymes.csv')
+    parser.add_argument('-d', '--dest', default='./data/gecko/xmls')
+    parser.add_argument('-i', '--iterations', type=int, nargs='+', default=sorted(ITERATIONS), choices=sorted(ITERATIONS))
+    parser.add_argument('--pool', type=float, default=None, help='Protein pool in g/gDW (defaults to the summed availability of the table).')
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    variants = {"Wildtype": args.wildtype} if args.wildtype else {}
+    variants.update({os.path.splitext(os.path.basename(p))[0]: p for p in args.sbmlpath})
+    if len(variants) == 0:
+        print("No models provided. Exiting...")
+        sys.exit(1)
+
+    combos = strain_combinations(load_enzymes(args.table))
+    print(f"Building {len(variants)} models x {len(combos)} strain combinations x {len(args.iterations)} iterations...")
+
+    processes = min(args.processes or os.cpu_count(), len(variants))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        jobs = [pool.submit(_build_variant, name, path, combos, args.iterations, args.dest, args.pool) for name, path in variants.items()]
+        saved = [path for job in as_completed(jobs) for path in job.result()]
+
+    print(f"Saved {len(saved)} models to {args.dest}")
+    exit(0)
@@ -0,0 +1,193 @@
+from cobra import Model
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse, os, sys, glob
+import pandas as pd
+
+from scripts.helpers.loader import load_model
+from scripts.opt._fba import flux_balance_analysis
+from scripts.opt._fva import run_flux_variability_analysis
+from scripts.helpers.store import ResultStore, run_key, STORE_DIR
+
+def model_names(paths: list[str]) -> list[str]:
+    """Name each model by its path relative to the common folder, without extension (e.g. `h/SQS+MVA`)."""
+    if len(paths) == 1:
+        return [os.path.splitext(os.path.basename(paths[0]))[0]]
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    return [os.path.splitext(os.path.relpath(os.path.abspath(p), root))[0].replace(os.sep, '/') for p in paths]
+
+# Per-process models kept by jobs with `keep=True`, so a worker parses each file once across its jobs
+_models: dict[str, Model] = {}
+
+def _get_model(path: str, keep: bool = False) -> Model:
+    if path in _models:
+        return _models[path]
+    model, error = load_model(path, validate=False)
+    if not model:
+        raise ValueError(f"Error loading model {path}: {error}")
+    if keep:
+        _models[path] = model
+    return model
+
+def _solve_model(
+    path: str,
+    name: str,
+    objective_sets: list[list[str]],
+    method: str = 'fba',
+    minimize: bool = False,
+    fraction_of_optimum: float = 1.0,
+    store: str = None,
+    targets: list[str] = None,
+    keep: bool = False
+) -> dict[tuple[str, str], pd.Series | pd.DataFrame]:
+    """
+    Worker job: load one model once and solve it for every objective set.
+
+    Args:
+        method (str, optional): 'fba', 'pfba' (fluxes, as a Series) or 'fva' (non-loopless `minimum`/`maximum` ranges,
+            as a DataFrame). Defaults to 'fba'.
+        store (str, optional): Result store folder each FBA/pFBA run is appended to. Defaults to None.
+        targets (list[str], optional): Only return these reactions (those in the model). Defaults to all.
+        keep (bool, optional): Keep the loaded model in the process for later jobs on the same file. Defaults to False.
+        (Other arguments as in `batch_flux_balance_analysis`.)
+
+    Returns:
+        dict: Results per `(name, "+".join(objectives))`. Failed and skipped objective sets are left out.
+    """
+    try:
+        model = _get_model(path, keep)
+    except ValueError as e:
+        print(e)
+        return {}
+    ids = [rid for rid in targets if rid in model.reactions] if targets else None
+
+    results = {}
+    for objectives in objective_sets:
+        key = (name, "+".join(objectives))
+        missing = [obj for obj in objectives if obj not in model.reactions]
+        if missing:
+            print(f"Skipping {key}: objectives not found in model ({', '.join(missing)}).")
+            continue
+        try:
+            with model:
+                if method == 'fva':
+                    ranges = run_flux_variability_analysis(
+                        model, loopless=False, fraction_of_optimum=fraction_of_optimum, objectives=objectives, reactions=ids
+                    )
+                    results[key] = ranges.loc[ids] if ids is not None else ranges
+                    continue
+                solution = flux_balance_analysis(
+                    model,
+                    objectives=objectives,
+                    is_pfba=method == 'pfba',
+                    minimize=minimize,
+                    fraction_of_optimum=fraction_of_optimum
+                )
+            results[key] = solution.fluxes[ids] if ids is not None else solution.fluxes
+            if store:
+                construct, strain = run_key(path)
+                ResultStore(store).append_fluxes(
+                    model, solution.fluxes, construct, strain, objectives,
+                    method=method,
+                    objective_value=solution.objective_value, status=solution.status, source=path
+                )
+        except Exception as e:
+            print(f"Error during {method.upper()} {key}: {e}")
+    return results
+
+def batch_flux_balance_analysis(
+    paths: list[str],
+    objective_sets: list[list[str]],
+    is_pfba: bool = False,
+    minimize: bool = False,
+    fraction_of_optimum: float = 1.0,
+    processes: int = None,
+    store: str = None
+) -> pd.DataFrame:
+    """
+    Run FBA (or pFBA) for every model x objective set combination over a process pool.
+    Each model file is handled by a single worker, so it is loaded once no matter how many objective sets there are.
+
+    Args:
+        paths (list[str]): Model files to analyze.
+        objective_sets (list[list[str]]): Objective sets, each solved like `flux_balance_analysis(objectives=...)`.
+        is_pfba (bool, optional): Whether to use parsimonious FBA. Defaults to False.
+        minimize (bool, optional): Minimize the objectives instead. Defaults to False.
+        fraction_of_optimum (float, optional): The fraction of the optimum to use for pFBA. Defaults to 1.0.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        store (str, optional): Result store folder to append every run to (see `helpers.store.ResultStore`). Defaults to None.
+
+    Returns:
+        pd.DataFrame: Fluxes with reactions as rows and (model, objectives) as columns. Reactions missing in a model are NaN.
+    """
+    assert len(paths) > 0, "No models provided."
+    assert len(objective_sets) > 0, "No objectives provided."
+
+    names = model_names(paths)
+    method = 'pfba' if is_pfba else 'fba'
+    processes = min(processes or os.cpu_count(), len(paths))
+
+    results = {}
+    if processes <= 1:
+        for path, name in zip(paths, names):
+            results.update(_solve_model(path, name, objective_sets, method, minimize, fraction_of_optimum, store))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            jobs = [
+                pool.submit(_solve_model, path, name, objective_sets, method, minimize, fraction_of_optimum, store)
+                for path, name in zip(paths, names)
+            ]
+            for job in as_completed(jobs):
+                results.update(job.result())
+
+    # Keep the input order of models and objective sets
+    order = [(name, "+".join(objs)) for name in names for objs in objective_sets]
+    columns = [key for key in order if key in results]
+    if not columns:
+        return pd.DataFrame()
+
+    table = pd.concat([results[key] for key in columns], axis=1, keys=columns, names=['model', 'objectives'])
+    table.index.name = 'reaction'
+    return table
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='_batch',
+        description='Run FBA/pFBA over many models and objective sets, into a single flux table.'
+    )
+    parser.add_argument('sbmlglob', nargs='+', help='Model files or glob patterns (quote patterns, ** is supported).')
+    parser.add_argument('-d', '--dest')
+    parser.add_argument('-p', '--pfba', action='store_true')
+    parser.add_argument('-o', '--objectives', action='append', help='Comma-separated objective set. Repeat for more sets.')
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    parser.add_argument('-s', '--store', nargs='?', const=STORE_DIR, default=None, help='Also append every run to the result store (defaults to results/store).')
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.sbmlglob for p in glob.glob(pattern, recursive=True)})
+    if len(paths) == 0:
+        print("No model files matched. Exiting...")
+        sys.exit(1)
+
+    objective_sets = [objs.split(',') for objs in (args.objectives or [])]
+    if len(objective_sets) == 0:
+        print("No objectives provided, aborting FBA...")
+        sys.exit(1)
+
+    print(f"Running {'pFBA' if args.pfba else 'FBA'} on {len(paths)} models x {len(objective_sets)} objective sets...")
+    table = batch_flux_balance_analysis(
+        paths,
+        objective_sets,
+        is_pfba=args.pfba,
+        processes=args.processes,
+        store=args.store
+    )
+    if table.empty:
+        print("No successful solves. Exiting...")
+        sys.exit(1)
+
+    os.makedirs(args.dest, exist_ok=True)
+    export_path = os.path.join(args.dest, f"{'pfba' if args.pfba else 'fba'}_fluxes.csv")
+    table.to_csv(export_path)
+    print(f"Saved {table.shape[1]} runs to {export_path}")
+    exit(0)
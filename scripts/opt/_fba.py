@@ -1,9 +1,24 @@
-from cobra import io, Model, Solution
+from cobra import Model, Solution
 from cobra.flux_analysis import pfba
 import escher
 import argparse, os, sys
 
 from cobra.util.solver import linear_reaction_coefficients
+from scripts.helpers.loader import load_model
+from scripts.helpers.cache import DiskCache, problem_hash
+from scripts.helpers.store import ResultStore, run_key, STORE_DIR
+from scripts.helpers.profiling import profile
+
+# Solved problems, keyed by model state + method + parameters
+_solutions = DiskCache('solutions')
+
+def set_objectives(model: Model, objectives: list[str], minimize: bool = False):
+    """
+    Set the model objective to the equally weighted sum of `objectives` (negated to minimize).
+    Uses a single objective assignment instead of resetting every reaction's coefficient.
+    """
+    coef = 1.0 / len(objectives) if not minimize else -1.0 / len(objectives)
+    model.objective = {model.reactions.get_by_id(obj): coef for obj in objectives}
 
 def flux_balance_analysis(
     model: Model,
@@ -11,7 +26,7 @@ def flux_balance_analysis(
     is_pfba: bool = False,
     minimize: bool = False,
     fraction_of_optimum: float = 1.0,
-
+    cache: bool = False
 ):
     """
     Run Flux-Balance Analysis on the model for the provided objectives.
@@ -25,32 +40,50 @@ def flux_balance_analysis(
         reactions (list[str], optional): The list of reactions to include in the analysis.
         pfba_factor (float, optional): The factor to use for pfba. Defaults to 1.1.
         fraction_of_optimum (float, optional): The fraction of the optimum to use. Defaults to 1.0.
+        cache (bool, optional): Return the stored solution if this exact problem (model state, method, parameters) was solved before,
+            and store new solutions. Defaults to False (enabled by the CLI).
 
     Returns:
         Solution: The optimized solution for the provided objectives. For more see `cobra.Solution`
     """
     assert len(objectives) > 0, "No objectives provided."
-    assert all([obj in [rxn.id for rxn in model.reactions] for obj in objectives]), "Some objectives not found in model."
+    assert all([obj in model.reactions for obj in objectives]), "Some objectives not found in model."
 
     set_obj_coef = lambda x: 1.0 / len(objectives) if not minimize else -1.0 / len(objectives)
 
+    method = 'pfba' if is_pfba else 'fba'
+    if cache:
+        with profile(f'{method}.cache') as rec:
+            key = problem_hash(
+                model, method,
+                objectives=list(objectives), minimize=minimize,
+                fraction_of_optimum=fraction_of_optimum if is_pfba else None
+            )
+            hit = _solutions.get(key)
+            rec['cache'] = 'hit' if hit is not None else 'miss'
+        if hit is not None:
+            if not is_pfba: set_objectives(model, objectives, minimize) # Same side effect as a real solve
+            return hit
+
     solution = None
     if is_pfba:
         objective_obj = {model.reactions.get_by_id(obj): set_obj_coef(obj) for obj in objectives}
-        solution = pfba(
-            model,
-            fraction_of_optimum=fraction_of_optimum,
-            objective=objective_obj,
-        )
+        with profile('pfba.solve', model): # Both stages (objective, then minimal total flux); stats are the second's
+            solution = pfba(
+                model,
+                fraction_of_optimum=fraction_of_optimum,
+                objective=objective_obj,
+            )
     else:
         # Set model objective
-        for rxn in model.reactions:
-            rxn.objective_coefficient = 0.0
+        with profile('fba.setup'):
+            set_objectives(model, objectives, minimize)
 
-        for obj in objectives:
-            model.reactions.get_by_id(obj).objective_coefficient = set_obj_coef(obj)
+        with profile('fba.solve', model):
+            solution = model.optimize(raise_error=True)
 
-        solution = model.optimize(raise_error=True)
+    if cache:
+        _solutions.set(key, solution)
     return solution
 
 
@@ -64,6 +97,8 @@ if __name__ == "__main__":
     parser.add_argument('-d', '--dest')
     parser.add_argument('-p', '--pfba', action='store_true')
     parser.add_argument('-o', '--objectives')
+    parser.add_argument('-n', '--no-cache', action='store_true', help='Solve even if the solution is cached.')
+    parser.add_argument('-s', '--store', nargs='?', const=STORE_DIR, default=None, help='Also append the fluxes to the result store (defaults to results/store).')
     args = parser.parse_args()
 
     # # Print arguments
@@ -71,7 +106,7 @@ if __name__ == "__main__":
     # print(f"Destination directory: {args.dest}")
 
     # Model Import
-    model, error = io.validate_sbml_model(args.sbmlpath)
+    model, error = load_model(args.sbmlpath)
 
     if not model:
         print(f'Error loading model: {error}')
@@ -83,7 +118,7 @@ if __name__ == "__main__":
         solution = None
         try:
             # Run flux-balance analysis
-            solution = flux_balance_analysis(model, loopless=False, is_pfba=args.pfba, objectives=objectives)
+            solution = flux_balance_analysis(model, is_pfba=args.pfba, objectives=objectives, cache=not args.no_cache)
         except Exception as e:
             print(f"Error during FBA: {e}")
             sys.exit(1)
@@ -96,6 +131,14 @@ if __name__ == "__main__":
         if not os.path.exists(dest_final): os.makedirs(dest_final)
         export_path = os.path.join(dest_final, f'{file_name}.csv')
         solution.fluxes.to_csv(export_path)
+
+        if args.store:
+            construct, strain = run_key(args.sbmlpath)
+            ResultStore(args.store).append_fluxes(
+                model, solution.fluxes, construct, strain, objectives,
+                method='pfba' if args.pfba else 'fba',
+                objective_value=solution.objective_value, status=solution.status, source=args.sbmlpath
+            )
         exit(0)
     
     print("No objectives provided, aborting FBA...")
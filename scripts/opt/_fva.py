@@ -2,12 +2,21 @@
     # Run FVA
     # List blocked reactions
     # Export flux ranges
-from cobra import io
-import argparse, os
+import argparse, os, json
 import warnings, sys
+import pandas as pd
 
 from cobra.core import Model, Reaction, Metabolite
 from cobra.flux_analysis import flux_variability_analysis
+from scripts.helpers.loader import load_model
+from scripts.opt._fba import set_objectives
+from scripts.opt._reduce import reduce_model
+from scripts.helpers.cache import DiskCache, problem_hash, model_hash, solver_state
+from scripts.helpers.store import ResultStore, run_key, STORE_DIR
+from scripts.helpers.profiling import profile, lp_size
+
+# Solved problems, keyed by model state + method + parameters
+_solutions = DiskCache('solutions')
 
 def run_flux_variability_analysis(
         model: Model,
@@ -15,7 +24,9 @@ def run_flux_variability_analysis(
         pfba_factor: float = 1.1,
         fraction_of_optimum: float = 1.0,
         objectives: list[str] = None,
-        reactions: list[str] = None
+        reactions: list[str] = None,
+        reduce: bool = False,
+        cache: bool = False
     ):
     """
     Perform flux variability analysis on the given model.
@@ -23,6 +34,10 @@ def run_flux_variability_analysis(
     Args:
         model (Model): The metabolic model to analyze.
         reactions (list[str], optional): A list of reaction IDs to include in the analysis.
+        reduce (bool, optional): Skip blocked reactions and solve one reaction per fully coupled class,
+            deriving the others from it (see `_reduce.reduce_model`). Defaults to False.
+        cache (bool, optional): Return the stored ranges if this exact problem (model state, method, parameters) was solved before,
+            and store new ranges. Defaults to False (enabled by the CLI).
 
     Returns:
         pd.DataFrame: A DataFrame containing the flux ranges for each reaction.
@@ -33,23 +48,135 @@ def run_flux_variability_analysis(
     assert not loopless or (reactions is not None and len(reactions) > 0), "No reactions provided for loopless FVA."
 
     # Set objective coefficients
-    for rxn in model.reactions:
-        rxn.objective_coefficient = 0.0
-    
-    for obj in objectives:
-        model.reactions.get_by_id(obj).objective_coefficient = 1.0 / len(objectives)
-
-    # cobra.flux_analysis.flux_variability_analysis
-    solution = flux_variability_analysis(
-        model,
-        loopless=loopless,
-        pfba_factor=pfba_factor,
-        fraction_of_optimum=fraction_of_optimum,
-        reaction_list=reactions,
-        processes=None
-    )
+    with profile('fva.setup'):
+        set_objectives(model, objectives)
+
+    if cache:
+        with profile('fva.cache') as rec:
+            # `reduce` only changes how the ranges are found, not the ranges, so it isn't part of the key
+            key = problem_hash(
+                model, 'fva',
+                objectives=list(objectives), loopless=loopless, pfba_factor=pfba_factor,
+                fraction_of_optimum=fraction_of_optimum, reactions=list(reactions) if reactions else None
+            )
+            hit = _solutions.get(key)
+            rec['cache'] = 'hit' if hit is not None else 'miss'
+        if hit is not None:
+            return hit.copy()
+
+    reduction = None
+    if reduce:
+        with profile('fva.reduce'):
+            reduction = reduce_model(model)
+            reactions = list(dict.fromkeys(reactions or [rxn.id for rxn in model.reactions]))
+            targets = reduction.representatives(reactions)
+        if len(targets) == 0: # Everything requested is blocked
+            return reduction.expand(pd.DataFrame(columns=['minimum', 'maximum']), reactions)
+
+    # cobra.flux_analysis.flux_variability_analysis (2 LPs per reaction, so only the LP size is recorded)
+    solve = targets if reduction else reactions
+    with profile('fva.solve', reactions=len(solve) if solve else len(model.reactions), loopless=loopless, **lp_size(model)):
+        solution = flux_variability_analysis(
+            model,
+            loopless=loopless,
+            pfba_factor=pfba_factor,
+            fraction_of_optimum=fraction_of_optimum,
+            reaction_list=solve,
+            processes=None
+        )
+    if reduction:
+        solution = reduction.expand(solution, reactions)
+
+    if cache:
+        _solutions.set(key, solution)
     return solution
 
+def run_chunked_flux_variability_analysis(
+        model: Model,
+        checkpoint: str,
+        chunk_size: int = 100,
+        loopless: bool = True,
+        pfba_factor: float = 1.1,
+        fraction_of_optimum: float = 1.0,
+        objectives: list[str] = None,
+        reactions: list[str] = None,
+        reduce: bool = False
+    ):
+    """
+    Perform flux variability analysis in chunks of reactions, checkpointing each finished chunk to disk.
+    Rerunning with the same checkpoint resumes where the previous run stopped (crash or interrupt),
+    so at most one chunk of work is lost.
+
+    Args:
+        model (Model): The metabolic model to analyze.
+        checkpoint (str): Path of the .csv file storing finished min/max values.
+        chunk_size (int, optional): Number of reactions per chunk. Defaults to 100.
+        reactions (list[str], optional): Reaction IDs to analyze. Defaults to all reactions in the model.
+        (Other arguments as in `run_flux_variability_analysis`.)
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the flux ranges for each reaction, in the requested order.
+    """
+    assert chunk_size > 0, "Chunk size must be positive."
+    reactions = list(dict.fromkeys(reactions or [rxn.id for rxn in model.reactions]))
+
+    # With reduction, only the representatives are solved and checkpointed
+    reduction = reduce_model(model) if reduce else None
+    solve = reduction.representatives(reactions) if reduction else reactions
+
+    # Refuse to mix ranges computed under different settings (or on an edited model, whatever its ID)
+    with model:
+        if objectives: set_objectives(model, objectives) # As solved, so the hash doesn't depend on the previous objective
+        fingerprint = model_hash(model), solver_state(model)
+    settings = {
+        'model': fingerprint[0],
+        'solver': fingerprint[1],
+        'objectives': objectives,
+        'loopless': loopless,
+        'pfba_factor': pfba_factor,
+        'fraction_of_optimum': fraction_of_optimum,
+    }
+    meta_path = checkpoint + '.json'
+    if os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            previous = json.load(f)
+        if previous != settings:
+            raise ValueError(f"Checkpoint {checkpoint} was written with different settings: {previous}")
+    else:
+        os.makedirs(os.path.dirname(checkpoint) or '.', exist_ok=True)
+        with open(meta_path, 'w') as f:
+            json.dump(settings, f, indent=4)
+
+    done = pd.DataFrame(columns=['minimum', 'maximum'])
+    if os.path.exists(checkpoint):
+        done = pd.read_csv(checkpoint, index_col=0)
+    todo = [rid for rid in solve if rid not in done.index]
+    if len(done) > 0:
+        print(f"Resuming from {checkpoint}: {len(done)} reactions done, {len(todo)} left.")
+
+    for start in range(0, len(todo), chunk_size):
+        chunk = todo[start:start + chunk_size]
+        ranges = run_flux_variability_analysis(
+            model,
+            loopless=loopless,
+            pfba_factor=pfba_factor,
+            fraction_of_optimum=fraction_of_optimum,
+            objectives=objectives,
+            reactions=chunk
+        )
+        # Append the finished chunk and make sure it reaches the disk
+        with open(checkpoint, 'a') as f:
+            ranges[['minimum', 'maximum']].to_csv(f, header=f.tell() == 0)
+            f.flush()
+            os.fsync(f.fileno())
+        print(f"FVA: {min(start + chunk_size, len(todo))}/{len(todo)} reactions", end='\r')
+    if todo: print()
+
+    ranges = pd.read_csv(checkpoint, index_col=0) if os.path.exists(checkpoint) else done
+    if reduction:
+        return reduction.expand(ranges, reactions)
+    return ranges.loc[reactions]
+
 if __name__ == "__main__":
 
     # Script Argument(s)
@@ -63,12 +190,17 @@ if __name__ == "__main__":
     parser.add_argument('-l', '--loopless', action='store_true')
     parser.add_argument('-o', '--objectives')
     parser.add_argument('-r', '--reactions')
+    parser.add_argument('-c', '--chunk', type=int, default=None, help='Checkpoint every N reactions (all reactions if -r is omitted).')
+    parser.add_argument('-x', '--reduce', action='store_true', help='Skip blocked reactions and solve one reaction per coupled class.')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file (defaults to the export path with .partial.csv).')
+    parser.add_argument('-n', '--no-cache', action='store_true', help='Solve even if the ranges are cached.')
+    parser.add_argument('-s', '--store', nargs='?', const=STORE_DIR, default=None, help='Also append the ranges to the result store (defaults to results/store).')
     args = parser.parse_args()
 
     print("Model import from SBML file... {}".format(args.sbmlpath))
 
     # Model Import
-    model, error = io.validate_sbml_model(args.sbmlpath)
+    model, error = load_model(args.sbmlpath)
 
     if not model:
         print('No model recognized. Exiting...')
@@ -84,22 +216,44 @@ if __name__ == "__main__":
         print("No objectives provided. Exiting...")
         sys.exit(1)
 
-    try:
-        flux_ranges = run_flux_variability_analysis(
-            model,
-            loopless=args.loopless,
-            pfba_factor=1.1 if args.pfba else None,
-            objectives=objectives,
-            reactions=reactions
-        )
-    except Exception as e:
-        print(f"Error during flux variability analysis: {e}")
-        sys.exit(1)
-
     file_name: str = os.path.split(args.sbmlpath)[-1].split('.')[0]
     output_dest: str = os.path.join(args.dest, file_name)
     if not os.path.exists(output_dest): os.makedirs(output_dest)
 
     export_path = os.path.join(output_dest, f"{'+'.join(objectives)}_fva.csv")
+
+    try:
+        if args.chunk:
+            flux_ranges = run_chunked_flux_variability_analysis(
+                model,
+                checkpoint=args.checkpoint or export_path.replace('.csv', '.partial.csv'),
+                chunk_size=args.chunk,
+                loopless=args.loopless,
+                pfba_factor=1.1 if args.pfba else None,
+                objectives=objectives,
+                reactions=reactions,
+                reduce=args.reduce
+            )
+        else:
+            flux_ranges = run_flux_variability_analysis(
+                model,
+                loopless=args.loopless,
+                pfba_factor=1.1 if args.pfba else None,
+                objectives=objectives,
+                reactions=reactions,
+                reduce=args.reduce,
+                cache=not args.no_cache
+            )
+    except Exception as e:
+        print(f"Error during flux variability analysis: {e}")
+        sys.exit(1)
+
     flux_ranges.to_csv(export_path)
+
+    if args.store:
+        construct, strain = run_key(args.sbmlpath)
+        ResultStore(args.store).append_ranges(
+            model, flux_ranges, construct, strain, objectives,
+            method='loopless_fva' if args.loopless else 'fva', source=args.sbmlpath
+        )
     exit(0)
@@ -0,0 +1,258 @@
+from cobra import Model
+from cobra.flux_analysis import pfba
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import combinations
+import argparse, ast, os, sys
+import numpy as np
+import pandas as pd
+
+from scripts.helpers.loader import load_model
+from scripts.helpers.snapshot import ModelSnapshot, unsupported
+from scripts.opt._fba import set_objectives
+
+class GeneIndex:
+    """
+    Gene -> reaction index and parsed GPRs of a model, to find the reactions deleted by many gene knockout sets at once.
+
+    Args:
+        model (Model): The metabolic model.
+    """
+
+    def __init__(self, model: Model):
+        self.gene_rxns = {gene.id: [rxn.id for rxn in gene.reactions] for gene in model.genes}
+        self.gpr = {rxn.id: rxn.gpr.body for rxn in model.reactions if rxn.gpr.body is not None}
+
+    def _eval(self, node, cols: dict[str, int], alive: np.ndarray):
+        """Evaluate a GPR for every knockout set at once (genes outside `cols` are present in every set)."""
+        if isinstance(node, ast.Name):
+            j = cols.get(node.id)
+            return True if j is None else alive[:, j]
+        values = [self._eval(value, cols, alive) for value in node.values]
+        return reduce(np.logical_and if isinstance(node.op, ast.And) else np.logical_or, values)
+
+    def deleted(self, gene_sets: list[tuple[str, ...]]) -> list[frozenset[str]]:
+        """
+        Reactions that lose their GPR for each set of knocked out genes.
+        GPRs are evaluated as boolean arrays over all sets together, and only for reactions of knocked out genes.
+        """
+        genes = list(dict.fromkeys(gid for genes in gene_sets for gid in genes))
+        cols = {gid: j for j, gid in enumerate(genes)}
+        alive = np.ones((len(gene_sets), len(genes)), dtype=bool)
+        for i, genes_ko in enumerate(gene_sets):
+            alive[i, [cols[gid] for gid in genes_ko]] = False
+
+        deleted = [set() for _ in gene_sets]
+        affected = dict.fromkeys(rid for gid in genes for rid in self.gene_rxns.get(gid, []))
+        for rid in affected:
+            active = np.broadcast_to(self._eval(self.gpr[rid], cols, alive), (len(gene_sets),))
+            for i in np.flatnonzero(~active):
+                deleted[i].add(rid)
+        return [frozenset(rxns) for rxns in deleted]
+
+# Per-process LP for knockout jobs, built once per worker from the shared model snapshot
+_worker = {}
+
+def _init_worker(name: str, report: list[str], minimize: bool):
+    snapshot = ModelSnapshot.attach(name)
+    problem, variables = snapshot.to_optlang()
+    _worker.update(
+        snapshot=snapshot, problem=problem, variables=variables, report=[variables[j] for j in snapshot.columns(report)],
+        sign=-1.0 if minimize else 1.0 # The snapshot maximizes negated minimizing objectives
+    )
+
+def _knockout(model: Model, rxn_ids: frozenset[str], report: list[str], support: bool = False, tol: float = 1e-9) -> tuple:
+    """
+    Objective value (NaN if infeasible), `report` fluxes and, with `support=True`, the reactions carrying flux
+    with `rxn_ids` knocked out. Bounds are reverted afterwards.
+    """
+    with model:
+        for rid in rxn_ids:
+            model.reactions.get_by_id(rid).knock_out()
+        value = model.slim_optimize(error_value=np.nan)
+        feasible = np.isfinite(value)
+        fluxes = [model.reactions.get_by_id(rid).flux if feasible else np.nan for rid in report]
+        active = None
+        if support and feasible:
+            primals = model.solver.primal_values
+            active = {rxn.id for rxn in model.reactions if abs(primals[rxn.id]) > tol or abs(primals[rxn.reverse_id]) > tol}
+    return value, fluxes, active
+
+def _knockout_lp(rxn_ids: frozenset[str], support: bool = False, tol: float = 1e-9) -> tuple:
+    """`_knockout` on the worker's snapshot LP (one net flux variable per reaction)."""
+    problem, variables, snapshot = _worker['problem'], _worker['variables'], _worker['snapshot']
+    columns = snapshot.columns(list(rxn_ids))
+    knocked = [variables[j] for j in columns]
+    for var in knocked:
+        var.set_bounds(0, 0)
+    feasible = problem.optimize() == 'optimal'
+    value = _worker['sign'] * problem.objective.value if feasible else np.nan
+    fluxes = [var.primal if feasible else np.nan for var in _worker['report']]
+    active = None
+    if support and feasible:
+        primals = np.fromiter((var.primal for var in variables), dtype=float, count=len(variables))
+        active = set(snapshot.reactions[np.abs(primals) > tol].tolist())
+    for var, j in zip(knocked, columns):
+        var.set_bounds(snapshot.lb[j], snapshot.ub[j])
+    return value, fluxes, active
+
+def _knockout_chunk(chunk: list[frozenset[str]], support: bool) -> list[tuple]:
+    """Worker job: solve a chunk of reaction knockout sets on the process LP."""
+    return [_knockout_lp(rxn_ids, support) for rxn_ids in chunk]
+
+def _solve_all(model: Model, todo: list[frozenset[str]], report: list[str], support: bool, processes: int, chunk_size: int) -> dict:
+    """Solve every knockout set in `todo`, serially or over a process pool."""
+    processes = max(1, min(processes or os.cpu_count(), -(-len(todo) // chunk_size)))
+    extra = unsupported(model)
+    if processes > 1 and extra:
+        print(f"Solving knockouts serially: the model has solver constraints a snapshot can't hold ({', '.join(extra[:5])})")
+        processes = 1
+    if processes <= 1:
+        solved = [_knockout(model, rxns, report, support) for rxns in todo]
+    else:
+        # Workers attach the model's arrays in shared memory and build their own LP, instead of each unpickling the model
+        chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+        with ModelSnapshot.from_model(model).shared() as name:
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(name, report, model.objective.direction == 'min')) as pool:
+                solved = [res for chunk in pool.map(_knockout_chunk, chunks, [support] * len(chunks)) for res in chunk]
+    return dict(zip(todo, solved))
+
+def knockout_screen(
+    model: Model,
+    targets: list[tuple[str, ...]],
+    genes: bool = False,
+    objectives: list[str] = None,
+    report: list[str] = None,
+    processes: int = None,
+    chunk_size: int = 100,
+    tol: float = 1e-9
+) -> pd.DataFrame:
+    """
+    Knock out each set of reactions (or genes) in `targets` and re-optimize, on one model with context-managed bounds.
+    A knockout can only lower the optimum, so a solution that stays feasible stays optimal. Only knockouts that
+    can change the result are solved:
+    - a set that only deletes reactions carrying no flux in the reference (pFBA) solution keeps the reference optimum,
+    - a set containing an infeasible single knockout is infeasible,
+    - a set whose extra deletions carry no flux in the solution of one of its single knockouts keeps that solution,
+    - gene sets deleting the same reactions (e.g. isozyme pairs) share a single solve.
+
+    Args:
+        model (Model): The metabolic model (left unchanged).
+        targets (list[tuple[str, ...]]): Knockout sets of reaction IDs (or gene IDs with `genes=True`).
+        genes (bool, optional): Targets are gene IDs, mapped to reactions through their GPRs. Defaults to False.
+        objectives (list[str], optional): Objective reactions (see `_fba.set_objectives`). Defaults to the model objective.
+        report (list[str], optional): Reactions whose flux is reported for each knockout. Defaults to None.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Knockout sets per worker job. Defaults to 100.
+        tol (float, optional): Fluxes at or below this magnitude count as zero. Defaults to 1e-9.
+
+    Returns:
+        pd.DataFrame: One row per target with `ids`, `objective` (NaN if infeasible), `status`
+            ('optimal', 'infeasible' or 'unchanged' when the reference optimum holds) and one column per `report` reaction.
+    """
+    report = list(report or [])
+    targets = [tuple(ids) for ids in targets]
+
+    with model:
+        if objectives: set_objectives(model, objectives)
+        reference = pfba(model) # Optimal solution with the fewest active reactions
+        ref_value = model.slim_optimize(error_value=np.nan)
+        assert np.isfinite(ref_value), "The reference model is infeasible."
+        active = set(reference.fluxes.index[reference.fluxes.abs() > tol])
+        unchanged = (ref_value, [reference.fluxes[rid] for rid in report], active)
+
+        # Reactions deleted by each target, and by each of its members alone
+        index = GeneIndex(model) if genes else None
+        deleted_by = lambda sets: [
+            rxns for start in range(0, len(sets), 10000) # Bounded memory for genome-wide pair screens
+            for rxns in index.deleted(sets[start:start + 10000])
+        ] if genes else [frozenset(ids) for ids in sets]
+        deleted = deleted_by(targets)
+        members = list(dict.fromkeys(x for ids in targets if len(ids) > 1 for x in ids))
+        single = dict(zip(members, deleted_by([(x,) for x in members])))
+
+        # Single knockouts first, keeping their flux support
+        todo = list(dict.fromkeys(rxns for rxns in single.values() if rxns & active))
+        results = _solve_all(model, todo, report, True, processes, chunk_size)
+
+        # Combinations either inherit a single knockout result or need their own solve
+        inherited = {}
+        for ids, rxns in zip(targets, deleted):
+            if rxns in results or rxns in inherited or not rxns & active: continue
+            for x in ids:
+                sub = single.get(x)
+                if sub is None: continue
+                value, fluxes, support = results.get(sub, unchanged)
+                if not np.isfinite(value) or not support & (rxns - sub):
+                    inherited[rxns] = (value, fluxes, support)
+                    break
+        todo = list(dict.fromkeys(rxns for rxns in deleted if rxns & active and rxns not in results and rxns not in inherited))
+        results.update(_solve_all(model, todo, report, False, processes, chunk_size))
+        results.update(inherited)
+
+    rows = []
+    for ids, rxns in zip(targets, deleted):
+        value, fluxes, _ = results.get(rxns, unchanged)
+        status = 'unchanged' if rxns not in results else 'optimal' if np.isfinite(value) else 'infeasible'
+        rows.append([ids, value, status] + list(fluxes))
+    return pd.DataFrame(rows, columns=['ids', 'objective', 'status'] + report)
+
+def single_knockouts(model: Model, ids: list[str] = None, genes: bool = False, **kwargs) -> pd.DataFrame:
+    """Knock out each reaction (or gene) in `ids` (defaults to all of them). See `knockout_screen` for the other arguments."""
+    ids = ids or [x.id for x in (model.genes if genes else model.reactions)]
+    return knockout_screen(model, [(x,) for x in ids], genes=genes, **kwargs)
+
+def double_knockouts(model: Model, ids: list[str] = None, genes: bool = False, **kwargs) -> pd.DataFrame:
+    """Knock out every pair of reactions (or genes) in `ids` (defaults to all of them). See `knockout_screen` for the other arguments."""
+    ids = ids or [x.id for x in (model.genes if genes else model.reactions)]
+    return knockout_screen(model, list(combinations(ids, 2)), genes=genes, **kwargs)
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='_knockout',
+        description='Screen single or double reaction/gene knockouts of a model.'
+    )
+    parser.add_argument('sbmlpath')
+    parser.add_argument('-d', '--dest')
+    parser.add_argument('-o', '--objectives')
+    parser.add_argument('-g', '--genes', action='store_true', help='Knock out genes instead of reactions.')
+    parser.add_argument('-2', '--double', action='store_true', help='Screen every pair instead of single knockouts.')
+    parser.add_argument('-i', '--ids', help='Comma-separated reactions/genes to screen (defaults to all).')
+    parser.add_argument('-r', '--report', help='Comma-separated reactions whose flux is reported for each knockout.')
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    model, error = load_model(args.sbmlpath, validate=False)
+    if not model:
+        print(f'Error loading model: {error}')
+        sys.exit(1)
+
+    objectives = args.objectives.split(',') if args.objectives else None
+    if not objectives:
+        print("No objectives provided, aborting knockout screen...")
+        sys.exit(1)
+
+    screen = double_knockouts if args.double else single_knockouts
+    try:
+        table = screen(
+            model,
+            ids=args.ids.split(',') if args.ids else None,
+            genes=args.genes,
+            objectives=objectives,
+            report=args.report.split(',') if args.report else None,
+            processes=args.processes
+        )
+    except Exception as e:
+        print(f"Error during knockout screen: {e}")
+        sys.exit(1)
+
+    table['ids'] = table['ids'].map("+".join)
+    file_name: str = os.path.split(args.sbmlpath)[-1].split('.')[0]
+    os.makedirs(args.dest, exist_ok=True)
+    export_path = os.path.join(args.dest, f"{file_name}_{'double' if args.double else 'single'}_{'gene' if args.genes else 'rxn'}_ko.csv")
+    table.to_csv(export_path, index=False)
+    counts = ", ".join(f"{n} {status}" for status, n in table['status'].value_counts().items())
+    print(f"Saved {len(table)} knockouts ({counts}) to {export_path}")
+    exit(0)
@@ -0,0 +1,244 @@
+from cobra import Model
+from typing import NamedTuple
+import argparse, os, sys
+import numpy as np
+import pandas as pd
+import swiglpk as glp
+
+from scripts.helpers.loader import load_model
+from scripts.helpers.snapshot import ModelSnapshot
+from scripts.helpers.profiling import profile
+
+# GLPK solution status -> cobra/optlang status names
+STATUS = {
+    glp.GLP_OPT: 'optimal',
+    glp.GLP_FEAS: 'feasible',
+    glp.GLP_INFEAS: 'infeasible',
+    glp.GLP_NOFEAS: 'infeasible',
+    glp.GLP_UNBND: 'unbounded',
+    glp.GLP_UNDEF: 'undefined',
+}
+
+class LPResult(NamedTuple):
+    """Result of one solve: `fluxes` is aligned with `FluxLP.reactions` (NaN unless optimal)."""
+    status: str
+    objective_value: float
+    fluxes: np.ndarray
+
+def _int_array(values: list) -> glp.intArray:
+    array = glp.intArray(len(values))
+    for k, value in enumerate(values):
+        array[k] = value
+    return array
+
+def _double_array(values: list) -> glp.doubleArray:
+    array = glp.doubleArray(len(values))
+    for k, value in enumerate(values):
+        array[k] = value
+    return array
+
+def _bound_type(lb: float, ub: float) -> int:
+    if lb == ub: return glp.GLP_FX
+    if np.isfinite(lb) and np.isfinite(ub): return glp.GLP_DB
+    if np.isfinite(lb): return glp.GLP_LO
+    if np.isfinite(ub): return glp.GLP_UP
+    return glp.GLP_FR
+
+class FluxLP:
+    """
+    FBA/pFBA engine working on GLPK directly, built from a `ModelSnapshot` with GLPK's matrix API (no optlang or cobra
+    objects). As in cobra, each reaction is split into a forward and a reverse column, `v = v+ - v-`, so the parsimonious
+    stage can minimize `sum(v+ + v-)`. Objectives and bounds are set from arrays and only changed entries reach the solver,
+    and solves warm start from the previous basis, so repeated solves on one `FluxLP` are cheap.
+
+    Args:
+        snapshot (ModelSnapshot): The model's LP arrays (see `ModelSnapshot.from_model`, `attach` or `open`).
+
+    Example:
+        lp = FluxLP.from_model(model)
+        growth = lp.fba(['Biomass_Chlamy_auto'])
+        fluxes = pd.Series(growth.fluxes, index=lp.reactions)
+    """
+
+    def __init__(self, snapshot: ModelSnapshot):
+        self.snapshot = snapshot
+        self.reactions = snapshot.reactions
+        S = snapshot.S.tocoo()
+        m, n = S.shape
+        self.n = n
+
+        self.problem = glp.glp_create_prob()
+        glp.glp_set_obj_dir(self.problem, glp.GLP_MAX)
+        glp.glp_add_rows(self.problem, m + 1) # Mass balances, then the pFBA objective row (free until used)
+        for i in range(1, m + 1):
+            glp.glp_set_row_bnds(self.problem, i, glp.GLP_FX, 0.0, 0.0)
+        glp.glp_set_row_bnds(self.problem, m + 1, glp.GLP_FR, 0.0, 0.0)
+        self.objective_row = m + 1
+        glp.glp_add_cols(self.problem, 2 * n)
+
+        # [S, -S] in 1-based coordinates (GLPK ignores element 0)
+        rows = np.concatenate([[0], S.row + 1, S.row + 1]).tolist()
+        cols = np.concatenate([[0], S.col + 1, S.col + 1 + n]).tolist()
+        vals = np.concatenate([[0.0], S.data, -S.data]).tolist()
+        glp.glp_load_matrix(self.problem, len(vals) - 1, _int_array(rows), _int_array(cols), _double_array(vals))
+
+        self.lb = np.full(n, np.nan)
+        self.ub = np.full(n, np.nan)
+        self.set_bounds(np.arange(n), snapshot.lb, snapshot.ub)
+        self.c = np.zeros(n)
+        self.set_objective(snapshot.c)
+
+        self.params = glp.glp_smcp()
+        glp.glp_init_smcp(self.params)
+        self.params.msg_lev = glp.GLP_MSG_OFF
+        self.params.presolve = glp.GLP_OFF # Keeps the basis between solves
+
+    @classmethod
+    def from_model(cls, model: Model) -> 'FluxLP':
+        return cls(ModelSnapshot.from_model(model))
+
+    def __del__(self):
+        if getattr(self, 'problem', None) is not None:
+            glp.glp_delete_prob(self.problem)
+            self.problem = None
+
+    def columns(self, ids: list[str]) -> np.ndarray:
+        """Columns (0-based) of the given reaction IDs."""
+        return self.snapshot.columns(ids)
+
+    def set_bounds(self, columns: np.ndarray, lb: np.ndarray, ub: np.ndarray):
+        """Set the flux bounds of reactions (columns or IDs). Bounds that don't change are not sent to the solver."""
+        columns = self.columns(columns) if len(columns) and isinstance(columns[0], str) else np.asarray(columns, dtype=np.int64)
+        lb = np.broadcast_to(np.asarray(lb, dtype=float), columns.shape)
+        ub = np.broadcast_to(np.asarray(ub, dtype=float), columns.shape)
+        changed = (self.lb[columns] != lb) | (self.ub[columns] != ub)
+        for j, lo, up in zip(columns[changed].tolist(), lb[changed].tolist(), ub[changed].tolist()):
+            # v+ in [max(lb, 0), max(ub, 0)] and v- in [max(-ub, 0), max(-lb, 0)]
+            fwd, rev = (max(lo, 0.0), max(up, 0.0)), (max(-up, 0.0), max(-lo, 0.0))
+            glp.glp_set_col_bnds(self.problem, j + 1, _bound_type(*fwd), *fwd)
+            glp.glp_set_col_bnds(self.problem, j + 1 + self.n, _bound_type(*rev), *rev)
+        self.lb[columns], self.ub[columns] = lb, ub
+
+    def reset_bounds(self, columns: np.ndarray = None):
+        """Restore the snapshot bounds (of all reactions, or of the given columns)."""
+        columns = np.arange(self.n) if columns is None else np.asarray(columns, dtype=np.int64)
+        self.set_bounds(columns, self.snapshot.lb[columns], self.snapshot.ub[columns])
+
+    def set_objective(self, c: np.ndarray):
+        """Maximize `c v`. Only the coefficients that differ from the current objective are updated."""
+        c = np.asarray(c, dtype=float)
+        for j in np.flatnonzero(c != self.c).tolist():
+            glp.glp_set_obj_coef(self.problem, j + 1, c[j])
+            glp.glp_set_obj_coef(self.problem, j + 1 + self.n, -c[j])
+        self.c = c.copy()
+
+    def set_objectives(self, objectives: list[str], minimize: bool = False):
+        """Equally weighted objective reactions (negated to minimize), as `_fba.set_objectives`."""
+        c = np.zeros(self.n)
+        c[self.columns(objectives)] = (-1.0 if minimize else 1.0) / len(objectives)
+        self.set_objective(c)
+
+    def _simplex(self) -> str:
+        if glp.glp_simplex(self.problem, self.params) != 0: # Bad basis: retry once from the standard basis
+            glp.glp_std_basis(self.problem)
+            if glp.glp_simplex(self.problem, self.params) != 0:
+                return 'failed'
+        return STATUS.get(glp.glp_get_status(self.problem), 'undefined')
+
+    def _fluxes(self) -> np.ndarray:
+        primals = np.array(glp.get_col_primals(self.problem))
+        return primals[:self.n] - primals[self.n:]
+
+    def fba(self, objectives: list[str] = None, minimize: bool = False) -> LPResult:
+        """
+        Maximize the objective (`objectives` if given, else the current one).
+
+        Returns:
+            LPResult: Status, objective value and fluxes (NaN unless optimal).
+        """
+        if objectives: self.set_objectives(objectives, minimize)
+        with profile('lp.fba') as rec:
+            status = self._simplex()
+            rec.update(status=status, iterations=glp.glp_get_it_cnt(self.problem), rows=self.objective_row, columns=2 * self.n)
+        if status != 'optimal':
+            return LPResult(status, np.nan, np.full(self.n, np.nan))
+        return LPResult(status, glp.glp_get_obj_val(self.problem), self._fluxes())
+
+    def pfba(self, objectives: list[str] = None, fraction_of_optimum: float = 1.0) -> LPResult:
+        """
+        Parsimonious FBA: maximize the objective, then minimize the total flux while keeping it at
+        `fraction_of_optimum` of its maximum (as `cobra.flux_analysis.pfba`).
+
+        Returns:
+            LPResult: Status, objective value (`c v` of the parsimonious solution) and fluxes (NaN unless optimal).
+        """
+        optimum = self.fba(objectives)
+        if optimum.status != 'optimal':
+            return optimum
+
+        # Objective row c v+ - c v- >= fraction * optimum, then min sum(v+ + v-)
+        nonzero = np.flatnonzero(self.c)
+        cols = np.concatenate([[0], nonzero + 1, nonzero + 1 + self.n]).tolist()
+        vals = np.concatenate([[0.0], self.c[nonzero], -self.c[nonzero]]).tolist()
+        glp.glp_set_mat_row(self.problem, self.objective_row, len(vals) - 1, _int_array(cols), _double_array(vals))
+        glp.glp_set_row_bnds(self.problem, self.objective_row, glp.GLP_LO, fraction_of_optimum * optimum.objective_value, 0.0)
+        glp.glp_set_obj_dir(self.problem, glp.GLP_MIN)
+        for j in range(1, 2 * self.n + 1):
+            glp.glp_set_obj_coef(self.problem, j, 1.0)
+
+        with profile('lp.pfba') as rec:
+            status = self._simplex()
+            rec.update(status=status, iterations=glp.glp_get_it_cnt(self.problem), rows=self.objective_row, columns=2 * self.n)
+        fluxes = self._fluxes() if status == 'optimal' else np.full(self.n, np.nan)
+
+        # Back to the FBA problem
+        glp.glp_set_row_bnds(self.problem, self.objective_row, glp.GLP_FR, 0.0, 0.0)
+        glp.glp_set_obj_dir(self.problem, glp.GLP_MAX)
+        c, self.c = self.c, np.full(self.n, np.nan) # Forces every coefficient to be written back
+        self.set_objective(c)
+        return LPResult(status, float(c @ fluxes) if status == 'optimal' else np.nan, fluxes)
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='_lp',
+        description='Run FBA or pFBA directly on GLPK, from the model arrays.'
+    )
+    parser.add_argument('sbmlpath')
+    parser.add_argument('-d', '--dest')
+    parser.add_argument('-p', '--pfba', action='store_true')
+    parser.add_argument('-o', '--objectives')
+    parser.add_argument('-f', '--fraction', type=float, default=1.0, help='Fraction of the optimum for pFBA.')
+    args = parser.parse_args()
+
+    objectives = args.objectives.split(',') if args.objectives else []
+    if len(objectives) == 0:
+        print("No objectives provided, aborting FBA...")
+        sys.exit(1)
+
+    model, error = load_model(args.sbmlpath, validate=False)
+    if not model:
+        print(f'Error loading model: {error}')
+        sys.exit(1)
+
+    missing = [obj for obj in objectives if obj not in model.reactions]
+    if missing:
+        print(f"Objectives not found in model: {', '.join(missing)}")
+        sys.exit(1)
+
+    lp = FluxLP.from_model(model)
+    result = lp.pfba(objectives, args.fraction) if args.pfba else lp.fba(objectives)
+    if result.status != 'optimal':
+        print(f"Error during FBA: solver status {result.status}")
+        sys.exit(1)
+    print(f"Objective value: {result.objective_value:.6g}")
+
+    if args.dest:
+        file_name: str = os.path.split(args.sbmlpath)[-1].split('.')[0]
+        dest_final: str = os.path.join(args.dest, "+".join(objectives))
+        os.makedirs(dest_final, exist_ok=True)
+        export_path = os.path.join(dest_final, f'{file_name}.csv')
+        pd.Series(result.fluxes, index=pd.Index(lp.reactions, name=''), name='fluxes').to_csv(export_path)
+        print(f"Saved the fluxes to {export_path}")
+    exit(0)
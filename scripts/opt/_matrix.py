@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse, os, sys, glob
+import numpy as np
+import pandas as pd
+
+from scripts.opt._batch import model_names, _solve_model
+
+# Values stored per method: one reactions x runs array each
+VALUES = {'fba': ['flux'], 'pfba': ['flux'], 'fva': ['minimum', 'maximum']}
+
+def flux_matrix(
+    paths: list[str],
+    objective_sets: list[list[str]],
+    targets: list[str] = None,
+    method: str = 'fba',
+    fraction_of_optimum: float = 1.0,
+    processes: int = None,
+    names: list[str] = None
+) -> dict:
+    """
+    Solve every construct x objective set combination and collect the target fluxes into dense reactions x runs arrays.
+    Runs are split into `_batch` jobs, one per construct (or a few, when there are more workers than constructs), and
+    each worker keeps the models it loaded, so a construct is parsed once per worker whatever the number of objective sets.
+    Only the target fluxes travel back from the workers.
+
+    Args:
+        paths (list[str]): Construct model files.
+        objective_sets (list[list[str]]): Objective sets, each solved like `flux_balance_analysis(objectives=...)`.
+        targets (list[str], optional): Reactions (rows) to keep, in order. Defaults to every reaction of every model.
+        method (str, optional): 'fba', 'pfba' or 'fva' (ranges of the targets). Defaults to 'fba'.
+        fraction_of_optimum (float, optional): The fraction of the optimum for pFBA/FVA. Defaults to 1.0.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        names (list[str], optional): Construct names. Defaults to `_batch.model_names(paths)`.
+
+    Returns:
+        dict: `reactions`, `constructs` and `objectives` label arrays (one construct/objective set label per run,
+            constructs outer) and one (reactions x runs) float array per value of `VALUES[method]`.
+            Reactions missing in a construct and failed runs are NaN.
+    """
+    assert len(paths) > 0, "No models provided."
+    assert len(objective_sets) > 0, "No objectives provided."
+    assert method in VALUES, f"Unknown method '{method}', expected one of {list(VALUES)}."
+
+    names = names or model_names(paths)
+    processes = processes or os.cpu_count()
+    # Split each construct's objective sets only as much as needed to keep every worker busy
+    n_chunks = min(len(objective_sets), max(1, -(-processes // len(paths))))
+    bounds = np.linspace(0, len(objective_sets), n_chunks + 1).astype(int)
+    jobs = [(i, start, stop) for i in range(len(paths)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    args = lambda i, start, stop: (paths[i], names[i], objective_sets[start:stop], method, False, fraction_of_optimum, None, targets, True)
+    results = {}
+    if min(processes, len(jobs)) <= 1:
+        for job in jobs:
+            results.update(_solve_model(*args(*job)))
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+            for future in as_completed([pool.submit(_solve_model, *args(*job)) for job in jobs]):
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    print(e)
+
+    # Rows: the targets, or every reaction in order of first appearance
+    reactions = pd.Index(targets if targets else list(dict.fromkeys(rid for run in results.values() for rid in run.index)))
+    n_obj = len(objective_sets)
+    matrix = {
+        'reactions': reactions.to_numpy(dtype=str),
+        'constructs': np.repeat(np.array(names, dtype=str), n_obj),
+        'objectives': np.tile(np.array(["+".join(objs) for objs in objective_sets], dtype=str), len(paths)),
+    }
+    for value in VALUES[method]:
+        matrix[value] = np.full((len(reactions), len(paths) * n_obj), np.nan)
+
+    for i, name in enumerate(names):
+        for k, objectives in enumerate(objective_sets):
+            run = results.get((name, "+".join(objectives)))
+            if run is None: continue
+            rows = reactions.get_indexer(run.index)
+            for value in VALUES[method]:
+                matrix[value][rows, i * n_obj + k] = (run[value] if method == 'fva' else run).to_numpy(dtype=float)
+    return matrix
+
+def save_matrix(matrix: dict, path: str):
+    """Write a `flux_matrix` result to `<path>.npz` and one `<path>_<value>.parquet` per value (reaction rows, `construct|objectives` columns)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    np.savez(f"{path}.npz", **matrix)
+    values = [key for key in matrix if key not in ('reactions', 'constructs', 'objectives')]
+    columns = [f"{c}|{o}" for c, o in zip(matrix['constructs'], matrix['objectives'])]
+    for value in values:
+        frame = pd.DataFrame(matrix[value], index=pd.Index(matrix['reactions'], name='reaction'), columns=columns)
+        frame.to_parquet(f"{path}_{value}.parquet")
+
+def load_matrix(path: str, value: str = 'flux') -> pd.DataFrame:
+    """
+    Load one value of a saved matrix as a reactions x runs DataFrame, with (construct, objectives) column levels.
+    E.g. the heatmap of one objective set: `load_matrix(path).xs('Biomass_Chlamy_auto', level='objectives', axis=1).T`.
+    """
+    with np.load(f"{path}.npz") as data:
+        columns = pd.MultiIndex.from_arrays([data['constructs'], data['objectives']], names=['construct', 'objectives'])
+        return pd.DataFrame(data[value], index=pd.Index(data['reactions'], name='reaction'), columns=columns)
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='_matrix',
+        description='Solve every construct x objective set and write the target fluxes as a dense reactions x runs matrix.'
+    )
+    parser.add_argument('sbmlglob', nargs='+', help='Construct files or glob patterns (quote patterns, ** is supported).')
+    parser.add_argument('-d', '--dest')
+    parser.add_argument('-m', '--method', default='fba', choices=list(VALUES))
+    parser.add_argument('-o', '--objectives', action='append', help='Comma-separated objective set. Repeat for more sets.')
+    parser.add_argument('-r', '--reactions', help='Comma-separated target reactions (rows). Defaults to all.')
+    parser.add_argument('-f', '--fraction', type=float, default=1.0, help='Fraction of the optimum for pFBA/FVA.')
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.sbmlglob for p in glob.glob(pattern, recursive=True)})
+    if len(paths) == 0:
+        print("No model files matched. Exiting...")
+        sys.exit(1)
+
+    objective_sets = [objs.split(',') for objs in (args.objectives or [])]
+    if len(objective_sets) == 0:
+        print("No objectives provided, aborting...")
+        sys.exit(1)
+
+    print(f"Running {args.method.upper()} on {len(paths)} constructs x {len(objective_sets)} objective sets...")
+    matrix = flux_matrix(
+        paths,
+        objective_sets,
+        targets=args.reactions.split(',') if args.reactions else None,
+        method=args.method,
+        fraction_of_optimum=args.fraction,
+        processes=args.processes
+    )
+    value = VALUES[args.method][0]
+    if np.isnan(matrix[value]).all():
+        print("No successful solves. Exiting...")
+        sys.exit(1)
+
+    export_path = os.path.join(args.dest, f"{args.method}_matrix")
+    save_matrix(matrix, export_path)
+    print(f"Saved {matrix[value].shape[0]} reactions x {matrix[value].shape[1]} runs to {export_path}.npz")
+    exit(0)
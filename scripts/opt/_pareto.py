@@ -0,0 +1,285 @@
+from cobra import Model
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque
+import argparse, os, sys, glob, math
+import numpy as np
+import pandas as pd
+
+from scripts.helpers.loader import load_model
+from scripts.helpers.model import add_single_gene_reaction_pair
+from scripts.opt._fba import set_objectives
+from scripts.opt._sweep import parsimonious_copy
+from scripts.opt._batch import model_names
+
+BIOMASS = "Biomass_Chlamy_auto"
+ERGEXCH = "ERGOSTEROLEXCH"
+CO2_EX  = "EX_co2_e"
+
+ERG = "ergosterol_c"
+
+# numpy < 2.0 only has `trapz`
+_trapezoid = getattr(np, "trapezoid", None) or np.trapz
+
+class EpsilonFront:
+    """
+    Epsilon-constraint front of two objectives on one model: maximize `secondary` while `primary` >= epsilon.
+    The solver is built once. Between points only the lower bound of `primary` changes, so every solve
+    starts from the previous basis. For pFBA, the parsimonious stage is a single private copy (see `parsimonious_copy`).
+
+    Args:
+        model (Model): The metabolic model. Its objective and the bounds of `primary` are changed in place (see `reset`).
+        primary (str): Reaction constrained by epsilon (e.g. biomass).
+        secondary (str): Reaction maximized at each point (e.g. ergosterol export).
+        is_pfba (bool, optional): Report parsimonious fluxes at each point. Defaults to True.
+        reactions (list[str], optional): Reactions whose flux is reported. Defaults to `primary` and `secondary`.
+    """
+
+    def __init__(self, model: Model, primary: str, secondary: str, is_pfba: bool = True, reactions: list[str] = None):
+        self.model = model
+        self.primary = model.reactions.get_by_id(primary)
+        self.secondary = secondary
+        self.reactions = list(dict.fromkeys(reactions or [primary, secondary]))
+        self._bounds = self.primary.bounds
+
+        # Upper end of the front: the best primary flux on its own
+        set_objectives(model, [primary])
+        self.max_primary = model.slim_optimize()
+
+        set_objectives(model, [secondary])
+        self.pmodel, self.fix = parsimonious_copy(model) if is_pfba else (None, None)
+        self._primaries = [self.primary] + ([self.pmodel.reactions.get_by_id(primary)] if is_pfba else [])
+
+        source = self.pmodel if is_pfba else model
+        self._vars = [
+            (rid, source.reactions.get_by_id(rid).forward_variable, source.reactions.get_by_id(rid).reverse_variable)
+            for rid in self.reactions
+        ]
+
+    def reset(self):
+        """Restore the original bounds of `primary`."""
+        for rxn in self._primaries:
+            rxn.bounds = self._bounds
+
+    def solve(self, epsilon: float) -> dict:
+        """Maximize `secondary` with `primary` >= epsilon. Returns status, objective value and reported fluxes."""
+        for rxn in self._primaries:
+            rxn.lower_bound = max(self._bounds[0], epsilon)
+
+        value = self.model.slim_optimize()
+        status = self.model.solver.status
+        if math.isnan(value):
+            return {'epsilon': epsilon, 'status': status, 'objective_value': np.nan, **{rid: np.nan for rid in self.reactions}}
+
+        if self.pmodel is not None:
+            self.fix.lb = value
+            if math.isnan(self.pmodel.slim_optimize()):
+                return {'epsilon': epsilon, 'status': self.pmodel.solver.status, 'objective_value': value, **{rid: np.nan for rid in self.reactions}}
+
+        fluxes = {rid: fv.primal - rv.primal for rid, fv, rv in self._vars}
+        return {'epsilon': epsilon, 'status': status, 'objective_value': value, **fluxes}
+
+    def front(self, points: int = 9, tol: float = 1e-3, max_points: int = 100, min_width: float = 1e-4) -> pd.DataFrame:
+        """
+        Solve a coarse grid of epsilon values over [0, max primary], then bisect every interval where the front bends.
+        An interval is split when the midpoint's objective strays from the chord between its ends by more than
+        `tol` (relative to the largest objective seen), so points gather around the kinks of the front.
+
+        Args:
+            points (int, optional): Points of the initial grid. Defaults to 9.
+            tol (float, optional): Relative chord deviation that triggers a split. Defaults to 1e-3.
+            max_points (int, optional): Hard limit on the number of solves. Defaults to 100.
+            min_width (float, optional): Smallest interval split, relative to the epsilon range. Defaults to 1e-4.
+
+        Returns:
+            pd.DataFrame: One row per solved point, sorted by epsilon.
+        """
+        if math.isnan(self.max_primary):
+            return pd.DataFrame(columns=['epsilon', 'status', 'objective_value', *self.reactions])
+
+        try:
+            grid = np.linspace(0.0, self.max_primary, max(points, 2))
+            solved = {eps: self.solve(eps) for eps in grid}
+
+            values = [row['objective_value'] for row in solved.values()]
+            scale = max(np.nanmax(np.abs(values)) if not np.all(np.isnan(values)) else 0.0, 1e-9)
+            queue = deque(zip(grid[:-1], grid[1:]))
+            while queue and len(solved) < max_points:
+                a, b = queue.popleft()
+                ya, yb = solved[a]['objective_value'], solved[b]['objective_value']
+                if b - a < min_width * self.max_primary or math.isnan(ya) or math.isnan(yb):
+                    continue
+                mid = (a + b) / 2
+                solved[mid] = self.solve(mid)
+                ym = solved[mid]['objective_value']
+                if math.isnan(ym) or abs(ym - (ya + yb) / 2) > tol * scale:
+                    queue.extend([(a, mid), (mid, b)])
+        finally:
+            self.reset()
+
+        return pd.DataFrame(solved.values()).sort_values('epsilon', ignore_index=True)
+
+def epsilon_front(
+    model: Model,
+    primary: str = BIOMASS,
+    secondary: str = ERGEXCH,
+    is_pfba: bool = True,
+    reactions: list[str] = None,
+    **kwargs
+) -> pd.DataFrame:
+    """
+    Adaptive epsilon-constraint front of `secondary` against `primary` (see `EpsilonFront.front` for `kwargs`).
+    The model is left unchanged.
+    """
+    with model:
+        return EpsilonFront(model, primary, secondary, is_pfba=is_pfba, reactions=reactions).front(**kwargs)
+
+def _variant_front(
+    name: str,
+    source,
+    co2_cap: float,
+    export_met: str,
+    front_kwargs: dict
+) -> tuple[str, pd.DataFrame]:
+    """Worker job: build the biomass vs ergosterol export front of one variant at the CO2 cap."""
+    if isinstance(source, str):
+        model, error = load_model(source, validate=False)
+        if not model:
+            print(f"Error loading model {source}: {error}")
+            return name, None
+    else:
+        model = source
+
+    try:
+        with model:
+            # Add export reaction (same assumption as the epsilon notebook)
+            if ERGEXCH not in model.reactions and export_met:
+                add_single_gene_reaction_pair(
+                    model=model,
+                    gene_id="EXCHERG_GENE",
+                    reaction_id=ERGEXCH,
+                    reaction_name="Ergosterol exchange (assumption)",
+                    reaction_subsystem="Exchange",
+                    metabolites=[(-1, export_met)],
+                    reversible=True
+                )
+            if CO2_EX in model.reactions:
+                model.reactions.get_by_id(CO2_EX).lower_bound = -float(co2_cap)
+
+            reactions = [BIOMASS, ERGEXCH] + ([CO2_EX] if CO2_EX in model.reactions else [])
+            pts = EpsilonFront(model, BIOMASS, ERGEXCH, reactions=reactions).front(**front_kwargs)
+    except Exception as e:
+        print(f"Error building front for {name}: {e!r}")
+        return name, None
+
+    df = pd.DataFrame({
+        "biomass": pts[BIOMASS],
+        "erg": pts[ERGEXCH],
+        "co2": pts[CO2_EX] if CO2_EX in pts else np.nan,
+    }).dropna(subset=["biomass", "erg"])
+    df["variant"] = name
+    df["CO2_cap"] = co2_cap
+    df["ERG_per_CO2"] = df["erg"] / (df["co2"].abs().replace(0, np.nan))
+    return name, df.reset_index(drop=True)
+
+def summarize_fronts(fronts: pd.DataFrame) -> pd.DataFrame:
+    """Per-variant metrics of the fronts: max biomass, ergosterol export and yield at zero biomass, and area under the front."""
+    rows = []
+    for name, df in fronts.groupby("variant", sort=False):
+        near_zero = df.iloc[df["biomass"].abs().argsort()[:1]].iloc[0]
+        ordered = df.sort_values("biomass")
+        rows.append({
+            "variant": name,
+            "bmax": df["biomass"].max(),
+            "erg_at_b0": float(near_zero["erg"]),
+            "yield_at_b0": float(near_zero["ERG_per_CO2"]),
+            "area": float(_trapezoid(ordered["erg"], ordered["biomass"])),
+            "points": len(df),
+        })
+    return pd.DataFrame(rows).sort_values(["erg_at_b0", "yield_at_b0", "bmax"], ascending=False)
+
+def variant_fronts(
+    variants: dict,
+    co2_cap: float = 10.0,
+    export_met: str = ERG,
+    processes: int = None,
+    **kwargs
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Biomass vs ergosterol export fronts of several variants at a CO2 uptake cap, one variant per worker process.
+
+    Args:
+        variants (dict): Variant name to model file path (loaded by the worker) or `Model`.
+        co2_cap (float, optional): Maximum CO2 uptake (`-lower_bound` of EX_co2_e). Defaults to 10.0.
+        export_met (str, optional): Metabolite exported by ERGOSTEROLEXCH, added when the model lacks it. Defaults to `ergosterol_c`.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        kwargs: Refinement settings passed to `EpsilonFront.front`.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The fronts of all variants and their summary metrics.
+    """
+    assert len(variants) > 0, "No variants provided."
+    processes = min(processes or os.cpu_count(), len(variants))
+
+    results = {}
+    if processes <= 1:
+        for name, source in variants.items():
+            results[name] = _variant_front(name, source, co2_cap, export_met, kwargs)[1]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            jobs = [pool.submit(_variant_front, name, source, co2_cap, export_met, kwargs) for name, source in variants.items()]
+            for job in as_completed(jobs):
+                name, df = job.result()
+                results[name] = df
+
+    frames = [results[name] for name in variants if results.get(name) is not None]
+    if not frames:
+        return pd.DataFrame(), pd.DataFrame()
+    fronts = pd.concat(frames, ignore_index=True)
+    return fronts, summarize_fronts(fronts)
+
+def save_fronts(fronts: pd.DataFrame, summary: pd.DataFrame, dest: str):
+    """Write `fronts_all_variants.csv` and `summary_metrics.csv` to `dest`."""
+    os.makedirs(dest, exist_ok=True)
+    fronts.to_csv(os.path.join(dest, "fronts_all_variants.csv"), index=False)
+    summary.to_csv(os.path.join(dest, "summary_metrics.csv"), index=False)
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='_pareto',
+        description='Biomass vs ergosterol export epsilon-constraint fronts for each model variant.'
+    )
+    parser.add_argument('sbmlglob', nargs='*', help='Variant model files or glob patterns (quote patterns, ** is supported).')
+    parser.add_argument('-w', '--wildtype', help='Model file reported as the "Wildtype" variant.')
+    parser.add_argument('-d', '--dest', default='./results/variant_compare_eps')
+    parser.add_argument('-c', '--co2-cap', type=float, default=10.0)
+    parser.add_argument('-k', '--points', type=int, default=9, help='Points of the initial epsilon grid.')
+    parser.add_argument('-t', '--tol', type=float, default=1e-3, help='Relative deviation from linear that refines an interval.')
+    parser.add_argument('-m', '--max-points', type=int, default=100)
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.sbmlglob for p in glob.glob(pattern, recursive=True)})
+    variants = {"Wildtype": args.wildtype} if args.wildtype else {}
+    variants.update(zip(model_names(paths), paths) if paths else [])
+    if len(variants) == 0:
+        print("No model files matched. Exiting...")
+        sys.exit(1)
+
+    print(f"Building fronts for {len(variants)} variants at CO2 cap {args.co2_cap}...")
+    fronts, summary = variant_fronts(
+        variants,
+        co2_cap=args.co2_cap,
+        processes=args.processes,
+        points=args.points,
+        tol=args.tol,
+        max_points=args.max_points
+    )
+    if fronts.empty:
+        print("No fronts computed. Exiting...")
+        sys.exit(1)
+
+    save_fronts(fronts, summary, args.dest)
+    print(f"Saved CSVs to: {args.dest}")
+    exit(0)
@@ -0,0 +1,154 @@
+from cobra import Model
+from cobra.flux_analysis import flux_variability_analysis
+from cobra.util import create_stoichiometric_matrix
+from optlang.symbolics import Zero
+import numpy as np
+import pandas as pd
+
+from scripts.helpers.cache import DiskCache, model_hash, solver_state
+
+# Reductions depend on stoichiometry, bounds and extra solver constraints only, so they are shared across objectives
+_reductions = DiskCache('reductions')
+
+# Flux span below which a reaction counts as blocked. Much tighter than the solver tolerance (1e-7), since
+# reactions feeding trace biomass components carry fluxes around 1e-8 that growth still depends on.
+BLOCKED_CUTOFF = 1e-10
+
+class Reduction:
+    """
+    Blocked reactions and fully coupled reaction classes of a model.
+    Two reactions are fully coupled when their fluxes keep a fixed ratio in every steady state,
+    so the flux range of one follows exactly from the range of the other, loopless or not.
+
+    Args:
+        blocked (list[str]): Reactions that can't carry flux under the model bounds.
+        coupling (dict[str, tuple[str, float]]): For each coupled reaction, its class representative and ratio (v = ratio * v_rep).
+    """
+
+    def __init__(self, blocked: list[str], coupling: dict[str, tuple[str, float]]):
+        self.blocked = set(blocked)
+        self.coupling = coupling
+
+    def _anchor(self, reactions: list[str]) -> dict[str, tuple[str, float]]:
+        """Map each non-blocked reaction to the reaction that will be solved for it, preferring requested ones."""
+        solved = {}
+        for rid in reactions:
+            if rid in self.blocked: continue
+            rep, _ = self.coupling.get(rid, (rid, 1.0))
+            solved.setdefault(rep, rid)
+
+        anchors = {}
+        for rid in reactions:
+            if rid in self.blocked: continue
+            rep, ratio = self.coupling.get(rid, (rid, 1.0))
+            target = solved[rep]
+            _, target_ratio = self.coupling.get(target, (target, 1.0))
+            anchors[rid] = (target, ratio / target_ratio)
+        return anchors
+
+    def representatives(self, reactions: list[str]) -> list[str]:
+        """Reactions that need solving to cover `reactions`: one per coupling class, none for blocked reactions."""
+        return list(dict.fromkeys(target for target, _ in self._anchor(reactions).values()))
+
+    def expand(self, ranges: pd.DataFrame, reactions: list[str]) -> pd.DataFrame:
+        """Rebuild the flux ranges of `reactions` from the ranges solved for their representatives."""
+        anchors = self._anchor(reactions)
+        rows = {}
+        for rid in reactions:
+            if rid in self.blocked:
+                rows[rid] = (0.0, 0.0)
+                continue
+            target, ratio = anchors[rid]
+            lo, hi = ranges.loc[target, 'minimum'] * ratio, ranges.loc[target, 'maximum'] * ratio
+            rows[rid] = (lo, hi) if ratio > 0 else (hi, lo)
+        return pd.DataFrame.from_dict(rows, orient='index', columns=['minimum', 'maximum'])
+
+def _blocked(model: Model, cutoff: float = BLOCKED_CUTOFF) -> set[str]:
+    """
+    Reactions whose flux range is within `cutoff` of zero (like `cobra.flux_analysis.find_blocked_reactions`,
+    which refuses cutoffs below the solver tolerance). Reactions carrying flux in a first solution are skipped.
+    Everything is solved without the model objective (the ranges with it cleared, as there, and the first solution
+    maximizing the total flux), but with any extra solver constraints (e.g. from `add_cons_vars`) in place, so the
+    result depends on the stoichiometry, the bounds and those constraints, like its cache key.
+    """
+    with model:
+        # Any feasible flux on a reaction proves it isn't blocked, and maximizing the total flux moves most of them
+        model.objective = model.problem.Objective(Zero, direction='max', sloppy=True)
+        model.objective.set_linear_coefficients({v: 1.0 for rxn in model.reactions for v in (rxn.forward_variable, rxn.reverse_variable)})
+        if np.isfinite(model.slim_optimize(error_value=np.nan)):
+            fluxes = model.solver.primal_values
+            candidates = [
+                rxn.id for rxn in model.reactions
+                if abs(fluxes[rxn.id]) <= cutoff and abs(fluxes[rxn.reverse_id]) <= cutoff
+            ]
+        else: # Unbounded total flux (infinite bounds): check every reaction
+            candidates = [rxn.id for rxn in model.reactions]
+        if not candidates:
+            return set()
+        model.objective = {} # Otherwise FVA keeps the objective at or above 0, which blocks reactions it couples to
+        span = flux_variability_analysis(model, fraction_of_optimum=0.0, reaction_list=candidates)
+    return set(span.index[span.abs().max(axis=1) < cutoff])
+
+def _coupling(model: Model, blocked: set[str], rank_tol: float = 1e-6, tol: float = 1e-9) -> dict[str, tuple[str, float]]:
+    """
+    Group unblocked reactions whose rows in the kernel of S are parallel (full coupling).
+    Singular values below `rank_tol` count as null: LP solvers accept steady-state violations of that order,
+    so directions the SVD would call "almost null" can still carry flux in FVA and must break coupling.
+    """
+    ids = [rxn.id for rxn in model.reactions]
+    keep = [i for i, rid in enumerate(ids) if rid not in blocked]
+    if not keep:
+        return {}
+
+    S = create_stoichiometric_matrix(model, array_type='dense')[:, keep]
+    S = S[np.any(S != 0, axis=1)]
+    _, sv, Vt = np.linalg.svd(S)
+    K = Vt[np.sum(sv > rank_tol):].T
+    if K.shape[1] == 0:
+        return {}
+
+    norms = np.linalg.norm(K, axis=1)
+    unit = K / np.where(norms > 0, norms, 1.0)[:, None]
+    # Orient each direction by its first significant entry, so k and -k land in the same bucket
+    first = np.argmax(np.abs(unit) > 1e-6, axis=1)
+    sign = np.sign(unit[np.arange(len(unit)), first])
+    unit *= np.where(sign == 0, 1.0, sign)[:, None]
+
+    buckets = {}
+    for i in np.where(norms > 1e-12)[0]:
+        buckets.setdefault(np.round(unit[i], 6).tobytes(), []).append(i)
+
+    coupling = {}
+    for members in buckets.values():
+        if len(members) < 2: continue
+        rep = members[0]
+        for j in members[1:]:
+            ratio = float(K[j] @ K[rep] / (K[rep] @ K[rep]))
+            # Only trust the bucket if the rows really are parallel
+            if np.linalg.norm(K[j] - ratio * K[rep]) > tol * norms[j]: continue
+            coupling[ids[keep[j]]] = (ids[keep[rep]], ratio)
+    return coupling
+
+def reduce_model(model: Model, cache: bool = True) -> Reduction:
+    """
+    Detect blocked reactions and fully coupled reaction classes once per model (cached by model hash and solver state).
+
+    Args:
+        model (Model): The metabolic model to reduce.
+        cache (bool, optional): Read from and write to the reduction cache. Defaults to True.
+
+    Returns:
+        Reduction: The blocked reactions and coupling classes of the model.
+    """
+    key = f"{model_hash(model, objective=False)}-{solver_state(model)}-{BLOCKED_CUTOFF}-free"
+    if cache:
+        hit = _reductions.get(key)
+        if hit is not None:
+            return hit
+
+    blocked = _blocked(model)
+    reduction = Reduction(sorted(blocked), _coupling(model, blocked))
+
+    if cache:
+        _reductions.set(key, reduction)
+    return reduction
@@ -0,0 +1,193 @@
+from cobra import Model
+from cobra.sampling import ACHRSampler
+from concurrent.futures import ProcessPoolExecutor
+import argparse, glob, os, sys
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scripts.helpers.loader import load_model
+from scripts.opt._fba import set_objectives
+from scripts.opt._reduce import reduce_model
+
+def _run_chain(sampler: ACHRSampler, chain: int, seed: int, n: int, chunk_size: int, reactions: list[str], blocked: list[str], path: str) -> np.ndarray:
+    """
+    Worker job: run one ACHR chain from its own warmup vertex, appending each chunk of samples to a Parquet file
+    (`blocked` reactions are stored as exact zeros).
+    Returns the count, sum and sum of squares of each half of the chain (shape (2, 3, len(reactions))) for split R-hat.
+    """
+    np.random.seed(seed) # ACHR draws from the global generator
+    sampler.center, sampler.n_samples = sampler.warmup.mean(axis=0), 0 # Fresh chain, even when the sampler object is reused
+    sampler.prev = sampler.warmup[np.random.randint(sampler.n_warmup)]
+
+    stats = np.zeros((2, 3, len(reactions)))
+    zeros = [i for i, rid in enumerate(reactions) if rid in set(blocked)]
+    schema = pa.schema([pa.field(rid, pa.float64()) for rid in reactions])
+    done = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        while done < n:
+            size = min(chunk_size, n - done)
+            samples = sampler.sample(size, fluxes=True)[reactions].to_numpy()
+            samples[:, zeros] = 0.0
+            writer.write_table(pa.Table.from_arrays([pa.array(col) for col in samples.T], schema=schema))
+            # Half of each sample (first or second half of the chain)
+            half = (np.arange(done, done + size) >= n // 2).astype(int)
+            for h in (0, 1):
+                rows = samples[half == h]
+                stats[h] += [np.full(len(reactions), len(rows)), rows.sum(axis=0), (rows ** 2).sum(axis=0)]
+            done += size
+    print(f"Chain {chain} done ({n} samples).")
+    return stats
+
+def split_rhat(stats: list[np.ndarray]) -> np.ndarray:
+    """Split R-hat per reaction from the half-chain sums of every chain (values close to 1 mean the chains agree)."""
+    halves = np.concatenate(stats) # (2 * chains, 3, reactions)
+    count, total, squares = halves[:, 0], halves[:, 1], halves[:, 2]
+    mean = total / count
+    var = (squares - count * mean ** 2) / (count - 1)
+    n = count.min(axis=0)
+    within = var.mean(axis=0)
+    between = mean.var(axis=0, ddof=1) # B / n
+    pooled = (n - 1) / n * within + between
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rhat = np.sqrt(pooled / within)
+    return np.where(within > 1e-12, rhat, 1.0) # Constant fluxes agree trivially
+
+def sample_fluxes(
+    model: Model,
+    dest: str,
+    n: int = 1000,
+    chains: int = 4,
+    thinning: int = 100,
+    chunk_size: int = 100,
+    reactions: list[str] = None,
+    objectives: list[str] = None,
+    fraction_of_optimum: float = None,
+    reduce: bool = True,
+    processes: int = None,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Sample the steady-state flux space with several ACHR chains in parallel, streaming samples to disk.
+    The warmup points (2 LPs per reaction) are generated once and shared by all chains, each starting from a different warmup vertex.
+    With `reduce`, blocked reactions (see `_reduce.reduce_model`) are fixed at zero before sampling: they drop out of
+    the warmup (no LPs for them) and out of the sampled polytope, and are stored and reported as constant zero.
+
+    Args:
+        model (Model): The metabolic model (left unchanged).
+        dest (str): Folder receiving one `chain_<k>.parquet` file per chain (see `read_samples`). Chain files of earlier runs are removed.
+        n (int, optional): Samples per chain. Defaults to 1000.
+        chains (int, optional): Number of independent chains. Defaults to 4.
+        thinning (int, optional): Hit-and-run steps between stored samples. Defaults to 100.
+        chunk_size (int, optional): Samples held in memory per chain before being written. Defaults to 100.
+        reactions (list[str], optional): Reactions to store and diagnose. Defaults to all.
+        objectives (list[str], optional): Objective reactions for `fraction_of_optimum`. Defaults to the model objective.
+        fraction_of_optimum (float, optional): Only sample fluxes reaching this fraction of the optimum. Defaults to None (no constraint).
+        reduce (bool, optional): Fix blocked reactions at zero before sampling. Defaults to True.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        seed (int, optional): Seed of the first chain (chain k uses seed + k). Defaults to 0.
+
+    Returns:
+        pd.DataFrame: Per reaction, the `mean` and `std` over all chains and the split `rhat` convergence diagnostic.
+    """
+    assert chains >= 1 and n >= 2, "Need at least one chain of two samples."
+    reactions = list(reactions or [rxn.id for rxn in model.reactions])
+
+    work = model.copy()
+    if objectives: set_objectives(work, objectives)
+    if fraction_of_optimum is not None:
+        optimum = work.slim_optimize(error_value=np.nan)
+        assert np.isfinite(optimum), "The model is infeasible."
+        bound = fraction_of_optimum * optimum
+        work.add_cons_vars(work.problem.Constraint(work.objective.expression, lb=bound, ub=None) if work.objective.direction == 'max'
+                           else work.problem.Constraint(work.objective.expression, lb=None, ub=bound))
+
+    blocked = set()
+    if reduce:
+        # Reduced on the input model, so the cached reduction is shared across objectives and fractions.
+        # Blocked reactions are fixed rather than removed: some carry trace fluxes below the solver tolerance
+        # that removing their columns would forbid outright.
+        blocked = reduce_model(model).blocked
+        for rid in blocked:
+            work.reactions.get_by_id(rid).bounds = (0.0, 0.0)
+
+    print(f"Generating warmup points ({len(work.reactions) - len(blocked)} reactions)...")
+    sampler = ACHRSampler(work, thinning=thinning, seed=seed)
+
+    os.makedirs(dest, exist_ok=True)
+    for stale in glob.glob(os.path.join(dest, 'chain_*.parquet')): os.remove(stale)
+    paths = [os.path.join(dest, f"chain_{k}.parquet") for k in range(chains)]
+    stored_blocked = [rid for rid in reactions if rid in blocked]
+    jobs = [(sampler, k, seed + k, n, chunk_size, reactions, stored_blocked, path) for k, path in enumerate(paths)]
+    processes = min(processes or os.cpu_count(), chains)
+    if processes <= 1:
+        stats = [_run_chain(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            stats = list(pool.map(_run_chain, *zip(*jobs)))
+
+    # Pooled moments and diagnostics from the streamed sums
+    totals = np.sum(stats, axis=(0, 1))
+    mean = totals[1] / totals[0]
+    std = np.sqrt(np.maximum(totals[2] / totals[0] - mean ** 2, 0.0) * totals[0] / (totals[0] - 1))
+    summary = pd.DataFrame({'mean': mean, 'std': std, 'rhat': split_rhat(stats)}, index=reactions)
+    summary.index.name = 'reaction'
+    return summary
+
+def read_samples(dest: str, reactions: list[str] = None) -> pd.DataFrame:
+    """Load the samples written by `sample_fluxes` (optionally only some reactions), with a `chain` column."""
+    frames = []
+    for path in sorted(glob.glob(os.path.join(dest, 'chain_*.parquet'))):
+        frame = pd.read_parquet(path, columns=reactions)
+        frame.insert(0, 'chain', int(os.path.splitext(os.path.basename(path))[0].split('_')[1]))
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='_sample',
+        description='Sample the flux space of a model with parallel ACHR chains, streaming samples to disk.'
+    )
+    parser.add_argument('sbmlpath')
+    parser.add_argument('-d', '--dest')
+    parser.add_argument('-o', '--objectives', help='Comma-separated objectives for --fraction.')
+    parser.add_argument('-f', '--fraction', type=float, default=None, help='Only sample fluxes reaching this fraction of the optimum.')
+    parser.add_argument('-r', '--reactions', help='Comma-separated reactions to store (defaults to all).')
+    parser.add_argument('-s', '--samples', type=int, default=1000, help='Samples per chain.')
+    parser.add_argument('-c', '--chains', type=int, default=4)
+    parser.add_argument('-t', '--thinning', type=int, default=100)
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    parser.add_argument('--no-reduce', action='store_true', help='Sample blocked reactions too.')
+    args = parser.parse_args()
+
+    model, error = load_model(args.sbmlpath, validate=False)
+    if not model:
+        print(f'Error loading model: {error}')
+        sys.exit(1)
+
+    file_name: str = os.path.split(args.sbmlpath)[-1].split('.')[0]
+    output_dest: str = os.path.join(args.dest, file_name)
+    try:
+        summary = sample_fluxes(
+            model,
+            output_dest,
+            n=args.samples,
+            chains=args.chains,
+            thinning=args.thinning,
+            reactions=args.reactions.split(',') if args.reactions else None,
+            objectives=args.objectives.split(',') if args.objectives else None,
+            fraction_of_optimum=args.fraction,
+            reduce=not args.no_reduce,
+            processes=args.processes
+        )
+    except Exception as e:
+        print(f"Error during sampling: {e}")
+        sys.exit(1)
+
+    summary.to_csv(os.path.join(output_dest, 'summary.csv'))
+    unconverged = summary[summary['rhat'] > 1.1]
+    print(f"Saved samples and summary to {output_dest} ({len(unconverged)} reactions with R-hat > 1.1).")
+    exit(0)
@@ -0,0 +1,233 @@
+from cobra import Model
+from concurrent.futures import ProcessPoolExecutor
+from optlang.symbolics import Zero
+import numpy as np
+import pandas as pd
+import math
+
+from scripts.opt._fba import set_objectives
+from scripts.helpers.profiling import profile
+
+def gradient(lower: float, upper: float, steps: int) -> list[float]:
+    """Evenly spaced sweep values from `lower` (inclusive) towards `upper`, as in the sensitivity notebook."""
+    return [lower + i * ((upper - lower) / steps) for i in range(steps)]
+
+def parsimonious_copy(model: Model) -> tuple[Model, object]:
+    """
+    Build the second pFBA stage once: a copy of `model` minimizing total flux, with the current objective
+    turned into a constraint. Set the returned constraint's `lb` to `fraction * optimum` before each solve.
+    """
+    with profile('sweep.copy'):
+        pmodel = model.copy()
+    objective = pmodel.solver.objective
+    coefs = objective.get_linear_coefficients(objective.variables)
+
+    parsimony = pmodel.problem.Objective(Zero, direction='min', sloppy=True)
+    pmodel.objective = parsimony
+    parsimony.set_linear_coefficients({
+        v: 1.0 for rxn in pmodel.reactions for v in (rxn.forward_variable, rxn.reverse_variable)
+    })
+
+    fix = pmodel.problem.Constraint(Zero, lb=None, name='_objective_fix', sloppy=True)
+    pmodel.add_cons_vars([fix])
+    pmodel.solver.update()
+    fix.set_linear_coefficients(coefs)
+    return pmodel, fix
+
+class Sweeper:
+    """
+    Re-solves one model while only reaction bounds change between points.
+    The LP is never rebuilt or copied per point, so the solver starts every solve from the previous optimal basis.
+    For pFBA, the parsimonious stage lives on a single private copy with the objective fixed as a constraint,
+    so both stages only ever see bound updates.
+
+    Args:
+        model (Model): The metabolic model to sweep. Its objective and bounds are changed in place (see `reset`).
+        objectives (list[str]): The list of objectives to optimize (see `flux_balance_analysis`).
+        is_pfba (bool, optional): Whether to use parsimonious FBA. Defaults to False.
+        minimize (bool, optional): Minimize the objectives instead. Defaults to False.
+        fraction_of_optimum (float, optional): The fraction of the optimum to use for pFBA. Defaults to 1.0.
+        reactions (list[str], optional): Reactions whose flux is reported at each point. Defaults to the objectives.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        objectives: list[str],
+        is_pfba: bool = False,
+        minimize: bool = False,
+        fraction_of_optimum: float = 1.0,
+        reactions: list[str] = None
+    ):
+        assert len(objectives) > 0, "No objectives provided."
+        self.model = model
+        self.is_pfba = is_pfba
+        self.fraction_of_optimum = fraction_of_optimum
+        self.reactions = list(reactions) if reactions else list(objectives)
+        self._original: dict[str, tuple[float, float]] = {}
+
+        set_objectives(model, objectives, minimize)
+
+        self.pmodel = None
+        if is_pfba:
+            self.pmodel, self.fix = parsimonious_copy(model)
+
+        # Flux variables of the reported reactions, on the model that produces the fluxes
+        source = self.pmodel if is_pfba else model
+        self._vars = [
+            (rid, source.reactions.get_by_id(rid).forward_variable, source.reactions.get_by_id(rid).reverse_variable)
+            for rid in self.reactions
+        ]
+
+    def _set(self, rid: str, value: float):
+        targets = [self.model] + ([self.pmodel] if self.pmodel is not None else [])
+        if rid not in self._original:
+            self._original[rid] = self.model.reactions.get_by_id(rid).bounds
+        for m in targets:
+            m.reactions.get_by_id(rid).bounds = (value, value)
+
+    def reset(self):
+        """Restore the original bounds of every swept reaction."""
+        for rid, bounds in self._original.items():
+            for m in [self.model] + ([self.pmodel] if self.pmodel is not None else []):
+                m.reactions.get_by_id(rid).bounds = bounds
+        self._original = {}
+
+    def solve(self, point: dict[str, float]) -> dict:
+        """Fix each reaction in `point` to its value and solve. Returns status, objective value and reported fluxes."""
+        for rid, value in point.items():
+            self._set(rid, value)
+
+        with profile('sweep.solve', self.model):
+            value = self.model.slim_optimize()
+        status = self.model.solver.status
+        if math.isnan(value):
+            return {'status': status, 'objective_value': np.nan, **{rid: np.nan for rid in self.reactions}}
+
+        if self.is_pfba:
+            self.fix.lb = self.fraction_of_optimum * value
+            with profile('sweep.pfba', self.pmodel):
+                parsimony = self.pmodel.slim_optimize()
+            if math.isnan(parsimony):
+                return {'status': self.pmodel.solver.status, 'objective_value': value, **{rid: np.nan for rid in self.reactions}}
+
+        fluxes = {rid: fv.primal - rv.primal for rid, fv, rv in self._vars}
+        return {'status': status, 'objective_value': value, **fluxes}
+
+    def run(self, points: list[dict[str, float]]) -> list[dict]:
+        """Solve a path of points in order (neighbouring points warm-start each other), then restore bounds."""
+        try:
+            return [self.solve(point) for point in points]
+        finally:
+            self.reset()
+
+# Worker state: one model and one Sweeper per process
+_worker = {}
+
+def _init_worker(model: Model, kwargs: dict):
+    _worker['sweeper'] = Sweeper(model, **kwargs)
+
+def _run_path(points: list[dict[str, float]]) -> list[dict]:
+    return _worker['sweeper'].run(points)
+
+def _run_paths(model: Model, paths: list[list[dict[str, float]]], processes: int, kwargs: dict) -> list[list[dict]]:
+    processes = min(processes or 1, len(paths))
+    if processes <= 1:
+        with model:
+            sweeper = Sweeper(model, **kwargs)
+            return [sweeper.run(path) for path in paths]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(model, kwargs)) as pool:
+        return list(pool.map(_run_path, paths))
+
+def scan(
+    model: Model,
+    objectives: list[str],
+    axes: dict[str, list[float]],
+    is_pfba: bool = False,
+    minimize: bool = False,
+    fraction_of_optimum: float = 1.0,
+    reactions: list[str] = None,
+    processes: int = None
+) -> pd.DataFrame:
+    """
+    One-dimensional sensitivity scans: fix each axis reaction to each of its values, one axis at a time.
+    Axes are independent, so they are spread over worker processes.
+
+    Args:
+        model (Model): The metabolic model to analyze. Left unchanged.
+        objectives (list[str]): The list of objectives to optimize.
+        axes (dict[str, list[float]]): Values to fix for each swept reaction.
+        is_pfba (bool, optional): Whether to use parsimonious FBA. Defaults to False.
+        minimize (bool, optional): Minimize the objectives instead. Defaults to False.
+        fraction_of_optimum (float, optional): The fraction of the optimum to use for pFBA. Defaults to 1.0.
+        reactions (list[str], optional): Reactions whose flux is reported. Defaults to the objectives and the swept reactions.
+        processes (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        pd.DataFrame: One row per point with `axis`, `value`, `status`, `objective_value` and a column per reported reaction.
+    """
+    assert len(axes) > 0, "No sweep axes provided."
+    reactions = reactions or list(dict.fromkeys([*objectives, *axes.keys()]))
+    kwargs = dict(objectives=objectives, is_pfba=is_pfba, minimize=minimize, fraction_of_optimum=fraction_of_optimum, reactions=reactions)
+
+    paths = [[{rid: float(v)} for v in values] for rid, values in axes.items()]
+    results = _run_paths(model, paths, processes, kwargs)
+
+    rows = [
+        {'axis': rid, 'value': value, **row}
+        for (rid, values), path in zip(axes.items(), results)
+        for value, row in zip(values, path)
+    ]
+    return pd.DataFrame(rows)
+
+def grid_scan(
+    model: Model,
+    objectives: list[str],
+    x: tuple[str, list[float]],
+    y: tuple[str, list[float]],
+    is_pfba: bool = False,
+    minimize: bool = False,
+    fraction_of_optimum: float = 1.0,
+    reactions: list[str] = None,
+    processes: int = None
+) -> pd.DataFrame:
+    """
+    Two-dimensional sensitivity scan over every (x, y) value pair.
+    Rows of the grid are split into contiguous blocks per worker, and each block is walked in a serpentine order
+    so that consecutive solves differ by a single step.
+
+    Args:
+        model (Model): The metabolic model to analyze. Left unchanged.
+        objectives (list[str]): The list of objectives to optimize.
+        x (tuple[str, list[float]]): First swept reaction and its values.
+        y (tuple[str, list[float]]): Second swept reaction and its values.
+        is_pfba (bool, optional): Whether to use parsimonious FBA. Defaults to False.
+        minimize (bool, optional): Minimize the objectives instead. Defaults to False.
+        fraction_of_optimum (float, optional): The fraction of the optimum to use for pFBA. Defaults to 1.0.
+        reactions (list[str], optional): Reactions whose flux is reported. Defaults to the objectives.
+        processes (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        pd.DataFrame: One row per grid point with the two swept reactions, `status`, `objective_value` and reported fluxes.
+    """
+    (xid, xs), (yid, ys) = x, y
+    reactions = reactions or list(objectives)
+    kwargs = dict(objectives=objectives, is_pfba=is_pfba, minimize=minimize, fraction_of_optimum=fraction_of_optimum, reactions=reactions)
+
+    blocks = [list(block) for block in np.array_split(np.asarray(xs, dtype=float), min(processes or 1, len(xs))) if len(block)]
+    paths = []
+    for block in blocks:
+        path = []
+        for i, xv in enumerate(block):
+            row = ys if i % 2 == 0 else ys[::-1]
+            path.extend({xid: float(xv), yid: float(yv)} for yv in row)
+        paths.append(path)
+
+    results = _run_paths(model, paths, processes, kwargs)
+    table = pd.DataFrame([
+        {**point, **{k: v for k, v in row.items() if k not in point}}
+        for points, path in zip(paths, results)
+        for point, row in zip(points, path)
+    ])
+    return table.sort_values([xid, yid], ignore_index=True)
@@ -1,16 +1,35 @@
 import plotly.express as px
-from cobra import io, Model, Reaction, Metabolite
-from cobra.manipulation.validate import check_mass_balance
-import os, sys
+from cobra import Model, Reaction, Metabolite, Configuration
+from cobra.manipulation.validate import _NOT_MASS_BALANCED_TERMS
+from cobra.util import create_stoichiometric_matrix
+import argparse, hashlib, os, sys
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from scripts.helpers.loader import load_model
+from scripts.helpers.sbml import SBMLReader
+from scripts.helpers.cache import DiskCache, model_hash
+
+# Mass balance tables, keyed by stoichiometry + formulas + charges
+_balances = DiskCache('balance')
+
+# Default subsystem sets of the pathway comparison: label -> subsystem name substrings
+PATHWAYS = {
+    'Sterol Biosynthesis': ['Biosynthesis of steroids'],
+    'Pyruvate Metabolism': ['Pyruvate metabolism'],
+    'Carotenoid Biosynthesis': ['Carotenoid biosynthesis'],
+}
 
 # Benchmark metabolites per compartment
-def pie_chart(m: Model, name: str, save_path: str):
+def pie_chart(m: Model | SBMLReader, name: str, save_path: str):
 
-    # Total number of reactions in model
-    rxn_count = len(m.reactions)
-    # Number of reactions in each subgroup
+    # A reader streams the metabolites instead of building the whole model
+    metabolites = m.metabolites() if isinstance(m, SBMLReader) else m.metabolites
+    compartments = m.compartments() if isinstance(m, SBMLReader) else m.compartments
+    # Number of metabolites in each compartment
     metabolite_groups = {}
-    for met in m.metabolites:
+    for met in metabolites:
         group = met.compartment if met.compartment else "Uncategorized"
         if group not in metabolite_groups:
             metabolite_groups[group] = 0
@@ -19,7 +38,7 @@ def pie_chart(m: Model, name: str, save_path: str):
     # Create pie chart using plotly express with vibrant colors
     fig = px.pie(
         values=list(metabolite_groups.values()),
-        names=list(map(lambda x: m.compartments[x], metabolite_groups.keys())),
+        names=list(map(lambda x: compartments.get(x, x), metabolite_groups.keys())),
         title=f"Distribution of Metabolites by Compartment ({name})",
         color_discrete_sequence=px.colors.qualitative.Vivid  # More vibrant colors
     )
@@ -62,53 +81,127 @@ def pie_chart(m: Model, name: str, save_path: str):
 
     return fig
 
+def _balance_hash(model: Model) -> str:
+    """Fingerprint of everything mass balance depends on: stoichiometry, formulas, charges and reaction SBO terms."""
+    digest = hashlib.sha256(model_hash(model, objective=False).encode())
+    for met in model.metabolites:
+        digest.update(f"{met.id}|{met.formula}|{met.charge}\n".encode())
+    for rxn in model.reactions:
+        if 'sbo' in rxn.annotation: digest.update(f"{rxn.id}|{rxn.annotation['sbo']}\n".encode())
+    return digest.hexdigest()
+
+def element_matrix(model: Model) -> tuple[list[str], sp.csr_matrix, np.ndarray]:
+    """
+    Element x metabolite composition matrix, with charge as the last row.
+    Formulas are parsed like `Metabolite.elements` (no formula = no elements, no charge = 0).
+
+    Returns:
+        tuple: The row labels (elements, then 'charge'), the (elements + 1) x metabolites matrix,
+            and a mask of metabolites whose formula can't be parsed (e.g. R groups in parentheses).
+    """
+    compositions = [met.elements for met in model.metabolites]
+    elements = sorted({el for comp in compositions if comp for el in comp})
+    index = {el: i for i, el in enumerate(elements)}
+
+    rows, cols, vals = [], [], []
+    for j, (met, comp) in enumerate(zip(model.metabolites, compositions)):
+        for el, count in (comp or {}).items():
+            rows.append(index[el]); cols.append(j); vals.append(count)
+        if met.charge is not None:
+            rows.append(len(elements)); cols.append(j); vals.append(met.charge)
+    E = sp.csr_matrix((vals, (rows, cols)), shape=(len(elements) + 1, len(model.metabolites)), dtype=float)
+    unknown = np.array([comp is None for comp in compositions], dtype=bool)
+    return elements + ['charge'], E, unknown
+
+def mass_balance(model: Model, cache: bool = True) -> pd.DataFrame:
+    """
+    Elemental and charge balance of every reaction at once, as the composition matrix times the stoichiometric matrix.
+    Matches `cobra.manipulation.check_mass_balance`, except that reactions with an unparsable formula
+    are reported as 'unknown' instead of raising.
+
+    Args:
+        model (Model): The metabolic model.
+        cache (bool, optional): Reuse the table computed for an identical model (see `_balance_hash`). Defaults to True.
+
+    Returns:
+        pd.DataFrame: Per reaction, its `subsystem`, a `status` ('balanced', 'unbalanced', 'unknown', or 'excluded'
+            for exchange/demand/sink/biomass SBO terms) and the net amount of each element (and charge) it creates.
+    """
+    key = _balance_hash(model) if cache else None
+    if cache:
+        hit = _balances.get(key)
+        if hit is not None:
+            return hit.copy()
+
+    labels, E, unknown_mets = element_matrix(model)
+    S = create_stoichiometric_matrix(model, array_type='lil').tocsr()
+    imbalance = (E @ S).toarray().T # reactions x (elements + charge)
+    imbalance[np.abs(imbalance) <= Configuration().tolerance] = 0.0
+
+    status = np.where(np.any(imbalance != 0.0, axis=1), 'unbalanced', 'balanced').astype(object)
+    status[S[unknown_mets].getnnz(axis=0) > 0] = 'unknown'
+    status[[rxn.annotation.get('sbo') in _NOT_MASS_BALANCED_TERMS for rxn in model.reactions]] = 'excluded'
+
+    table = pd.DataFrame(imbalance, columns=labels, index=pd.Index([rxn.id for rxn in model.reactions], name='reaction'))
+    table.insert(0, 'status', status)
+    table.insert(0, 'subsystem', [rxn.subsystem or '' for rxn in model.reactions])
+    if cache:
+        _balances.set(key, table)
+    return table
+
+def subsystem_balance(models: list[Model], model_names: list[str], subsystems: dict[str, list[str]] = None) -> pd.DataFrame:
+    """
+    Mass balance statistics per model and subsystem set.
+
+    Args:
+        models (list[Model]): The metabolic models.
+        model_names (list[str]): Name of each model.
+        subsystems (dict[str, list[str]], optional): Label -> subsystem name substrings; a reaction counts towards every
+            label with a matching substring. Defaults to one set per distinct subsystem (exact names, split on ';').
+
+    Returns:
+        pd.DataFrame: One row per model and label with the `reactions` count, the number of `balanced`, `unbalanced`,
+            `unknown` and `excluded` reactions, and the `balanced_fraction` of the checked (balanced + unbalanced) ones.
+    """
+    statuses = ['balanced', 'unbalanced', 'unknown', 'excluded']
+    rows = []
+    for model, name in zip(models, model_names):
+        table = mass_balance(model)
+        # Status counts per distinct subsystem, then summed per label (substring matching only runs on distinct names).
+        # Without sets, a reaction listed under several subsystems ("A;B") counts towards each of them.
+        names = table['subsystem'] if subsystems else table['subsystem'].str.split(';').explode().str.strip()
+        counts = pd.crosstab(names, table['status'].reindex(names.index)).reindex(columns=statuses, fill_value=0)
+        counts = counts[counts.index != '']
+        sets = subsystems or {sub: [sub] for sub in counts.index}
+        for label, patterns in sets.items():
+            matched = [sub for sub in counts.index if any(p in sub for p in patterns)] if subsystems else [label]
+            total = counts.loc[matched].sum()
+            rows.append({'model': name, 'subsystem': label, 'reactions': int(total.sum()), **{st: int(total[st]) for st in statuses}})
+
+    report = pd.DataFrame(rows, columns=['model', 'subsystem', 'reactions'] + statuses)
+    checked = report['balanced'] + report['unbalanced']
+    report['balanced_fraction'] = (report['balanced'] / checked.where(checked > 0)).astype(float)
+    return report
+
 # Benchmark important subsystems and their completeness
-def pathway_reaction_comparison(models: list, model_names: list, save_path: str):
+def pathway_reaction_comparison(models: list, model_names: list, save_path: str, subsystems: dict[str, list[str]] = None):
     """
-    Compare the number of reactions in Sterol Biosynthesis and Pyruvate Metabolism 
-    pathways across multiple models using a bar chart.
+    Compare the number of mass-balanced and unbalanced reactions in a few pathways
+    across multiple models using a bar chart.
     
     Args:
         models: List of COBRApy Model objects
         model_names: List of string names for each model
+        subsystems: Pathway label -> subsystem name substrings. Defaults to `PATHWAYS`.
     """
-    # Data for the bar chart
-    pathway_data = []
-
-
-    for model, name in zip(models, model_names):
+    report = subsystem_balance(models, model_names, subsystems or PATHWAYS)
 
-        # Get mass-unbalanced reactions
-        mass_unbalanced_reactions = [r.id for r in list(check_mass_balance(model=model).keys())]
-
-        sterol_count = { 'balanced': 0, 'unbalanced': 0 }
-        pyruvate_count = { 'balanced': 0, 'unbalanced': 0 }
-        carotenoid_count = { 'balanced': 0, 'unbalanced': 0 }
-        
-        # Count reactions in each pathway
-        for reaction in model.reactions:
-            # Check if reaction belongs to sterol biosynthesis
-            if hasattr(reaction, 'subsystem') and reaction.subsystem:
-                subsystem = reaction.subsystem
-                balance = 'balanced' if reaction.id not in mass_unbalanced_reactions else 'unbalanced'
-                if ('Biosynthesis of steroids' in subsystem):
-                    sterol_count[balance] += 1
-                elif ('Pyruvate metabolism' in subsystem):
-                    pyruvate_count[balance] += 1
-                elif ('Carotenoid biosynthesis' in subsystem):
-                    carotenoid_count[balance] += 1
-
-        # Add data for this model - separate balanced and unbalanced (unbalanced first for bottom layer)
+    # Data for the bar chart - unbalanced first (bottom layer), balanced second (top)
+    pathway_data = []
+    for _, row in report.iterrows():
         pathway_data.extend([
-            # Sterol Biosynthesis - unbalanced first (bottom), balanced second (top)
-            {"Model": name, "Pathway": "Sterol Biosynthesis", "Balance": "Mass-Unbalanced", "Reaction Count": sterol_count['unbalanced']},
-            {"Model": name, "Pathway": "Sterol Biosynthesis", "Balance": "Mass-Balanced", "Reaction Count": sterol_count['balanced']},
-            # Pyruvate Metabolism - unbalanced first (bottom), balanced second (top)
-            {"Model": name, "Pathway": "Pyruvate Metabolism", "Balance": "Mass-Unbalanced", "Reaction Count": pyruvate_count['unbalanced']},
-            {"Model": name, "Pathway": "Pyruvate Metabolism", "Balance": "Mass-Balanced", "Reaction Count": pyruvate_count['balanced']},
-            # Carotenoid Biosynthesis - unbalanced first (bottom), balanced second (top)
-            {"Model": name, "Pathway": "Carotenoid Biosynthesis", "Balance": "Mass-Unbalanced", "Reaction Count": carotenoid_count['unbalanced']},
-            {"Model": name, "Pathway": "Carotenoid Biosynthesis", "Balance": "Mass-Balanced", "Reaction Count": carotenoid_count['balanced']}
+            {"Model": row['model'], "Pathway": row['subsystem'], "Balance": "Mass-Unbalanced", "Reaction Count": row['unbalanced'] + row['unknown']},
+            {"Model": row['model'], "Pathway": row['subsystem'], "Balance": "Mass-Balanced", "Reaction Count": row['balanced']},
         ])
     
     # Create stacked bar chart
@@ -164,21 +257,46 @@ def pathway_reaction_comparison(models: list, model_names: list, save_path: str)
     return fig
 
 if __name__ == "__main__":
-    
-    # Load models
-    # iRC1080, e = io.validate_sbml_model('./data/raw/iRC1080.xml')
-    iBD1106, e = io.validate_sbml_model('./data/raw/iBD1106.xml')
-    iCre1355, e = io.validate_sbml_model('./data/raw/iCre1355/iCre1355_auto.xml')
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='benchmark',
+        description='Compartment pie charts and mass balance statistics per subsystem for a set of models.'
+    )
+    parser.add_argument('models', nargs='*', help='Model files, optionally as name=path. Defaults to iBD1106, iRC1080 and iCre1355.')
+    parser.add_argument('-d', '--dest', default='./results/bench')
+    parser.add_argument('-s', '--subsystems', action='append', help='Subsystem set as "Label=substring1;substring2". Repeat for more sets. Defaults to the sterol, pyruvate and carotenoid pathways.')
+    parser.add_argument('-a', '--all', action='store_true', help='Report every subsystem instead of subsystem sets.')
+    args = parser.parse_args()
+
+    entries = args.models or ['iBD1106=./data/raw/iBD1106.xml', 'iRC1080=./data/raw/iRC1080.xml', 'iCre1355=./data/raw/iCre1355/iCre1355_auto.xml']
+    entries = [entry.split('=', 1) if '=' in entry else (os.path.splitext(os.path.basename(entry))[0], entry) for entry in entries]
+    missing = [path for _, path in entries if not os.path.exists(path)]
+    if missing: print(f"Skipping missing models: {', '.join(missing)}")
+    entries = [(name, path) for name, path in entries if os.path.exists(path)]
+    if len(entries) == 0:
+        print("No models found. Exiting...")
+        sys.exit(1)
 
-    save_path = './results/bench'
+    save_path = args.dest
     if not os.path.exists(save_path):
         os.makedirs(save_path)
 
-    # # Generate pie charts
-    pie_chart(iBD1106, "iBD1106", save_path)
-    pie_chart(iCre1355, "iCre1355", save_path)
-    
+    # Generate pie charts (only metabolite compartments needed, no full model load)
+    for name, path in entries:
+        pie_chart(SBMLReader(path) if not path.endswith('.json') else load_model(path)[0], name, save_path)
+
+    # Load models
+    models = [load_model(path, validate=False)[0] for _, path in entries]
+    model_names = [name for name, _ in entries]
+
+    # Mass balance statistics for the subsystem sets, in one run over all models
+    subsystems = PATHWAYS
+    if args.subsystems:
+        subsystems = {label: patterns.split(';') for label, patterns in (spec.split('=', 1) for spec in args.subsystems)}
+    report = subsystem_balance(models, model_names, None if args.all else subsystems)
+    report.to_csv(os.path.join(save_path, 'mass_balance.csv'), index=False)
+    print(report.to_string(index=False))
+
     # Generate pathway comparison bar chart
-    models = [iBD1106, iCre1355]
-    model_names = ["iBD1106", "iCre1355"]
-    pathway_reaction_comparison(models, model_names, save_path)
+    if not args.all:
+        pathway_reaction_comparison(models, model_names, save_path, subsystems)
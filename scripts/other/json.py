@@ -1,14 +1,21 @@
 from cobra import io
 import os, sys, argparse
 
+from scripts.helpers.loader import load_model
+from scripts.helpers.sbml import SBMLReader
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog='_load_model',
         description='Load and validate your fba metabolic model from the .sbml format.'
     )
     parser.add_argument('sbmlpath')
+    parser.add_argument('-l', '--lazy', action='store_true', help='Skip validation and convert with the streaming reader (no annotations).')
     args = parser.parse_args()
 
-    model, err = io.validate_sbml_model(args.sbmlpath, validate=True)
+    if args.lazy:
+        model = SBMLReader(args.sbmlpath).to_model()
+    else:
+        model, err = load_model(args.sbmlpath, validate=True)
 
     io.save_json_model(model, args.sbmlpath.replace('.xml', '.json'))
\ No newline at end of file
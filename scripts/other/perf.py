@@ -0,0 +1,267 @@
+from cobra import Model
+from cobra.util.solver import linear_reaction_coefficients
+import argparse, os, sys, json, time, platform, subprocess
+import numpy as np
+import pandas as pd
+import cobra, optlang
+
+from scripts.helpers.loader import load_model
+from scripts.helpers.cache import file_hash
+from scripts.helpers.index import ModelIndex
+from scripts.mod.alter import load_tables, index_reactions, known_metabolites, add_compounds, build_constructs
+from scripts.opt._fba import flux_balance_analysis
+from scripts.opt._fva import run_flux_variability_analysis
+from scripts.opt._knockout import single_knockouts
+
+# Benchmark models: iCre1355, its gap-filled model and one altered construct
+MODELS = {
+    'iCre1355': './data/raw/iCre1355/iCre1355_auto.xml',
+    'gapfill': './data/fill/xmls/MNL_iCre1355_auto_GAPFILL.json',
+    'altered': './data/altered/xmls/MNL_iCre1355_auto_GAPFILL/SQS+SQE+MVA.json',
+}
+
+PERF_DIR = './results/perf'
+
+# A timing only counts as a regression above both limits (relative to the baseline median, and in absolute terms)
+TOLERANCE = 0.25
+MIN_DELTA_S = 0.05
+
+# Global NumPy seed set before every call (cobra's loopless FVA searches cyclic reactions with random weights)
+SEED = 0
+
+def _objectives(model: Model, args) -> list[str]:
+    """The requested objectives, or the model's own objective."""
+    return args.objectives or [rxn.id for rxn in linear_reaction_coefficients(model)]
+
+def _subset(model: Model, n: int) -> list[str]:
+    """The first `n` reactions in file order, so every run times the same problems."""
+    return [rxn.id for rxn in model.reactions[:n]]
+
+# Benchmark cases: name -> function(model, path, args), timed per call. Solver caches are bypassed (`cache=False`),
+# and every call gets a fresh copy of the model: a warm-started solver (left by earlier cases) can change both the
+# timing and, for loopless FVA, the result.
+def _load(model: Model, path: str, args):
+    load_model(path, validate=False, cache=False)
+
+def _load_cached(model: Model, path: str, args):
+    load_model(path, validate=False)
+
+def _copy(model: Model, path: str, args):
+    model.copy()
+
+def _alter(model: Model, path: str, args):
+    # Every blueprint construct in memory (see `alter.alter`, without the export)
+    rxns_df, cpds_df, blueprint = args.tables
+    ec_index = index_reactions(rxns_df, False, known_metabolites(ModelIndex.from_model(model), cpds_df))
+    add_compounds(model, cpds_df, False)
+    for _ in build_constructs(model, model.id, blueprint, ec_index, False):
+        pass
+
+def _fba(model: Model, path: str, args):
+    flux_balance_analysis(model, objectives=_objectives(model, args), cache=False)
+
+def _pfba(model: Model, path: str, args):
+    flux_balance_analysis(model, objectives=_objectives(model, args), is_pfba=True, cache=False)
+
+def _fva(model: Model, path: str, args):
+    run_flux_variability_analysis(model, loopless=False, objectives=_objectives(model, args), reactions=_subset(model, args.fva), cache=False)
+
+def _fva_loopless(model: Model, path: str, args):
+    run_flux_variability_analysis(model, loopless=True, objectives=_objectives(model, args), reactions=_subset(model, args.loopless), cache=False)
+
+def _knockouts(model: Model, path: str, args):
+    single_knockouts(model, ids=_subset(model, args.knockouts), objectives=_objectives(model, args), processes=1)
+
+CASES = {
+    'load': _load,
+    'load.cached': _load_cached,
+    'copy': _copy,
+    'alter': _alter,
+    'fba': _fba,
+    'pfba': _pfba,
+    'fva': _fva,
+    'fva.loopless': _fva_loopless,
+    'knockout': _knockouts,
+}
+
+def environment() -> dict:
+    """Metadata needed to tell whether two benchmark runs are comparable."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'cobra': cobra.__version__,
+        'optlang': optlang.__version__,
+        'solver': cobra.Configuration().solver.__name__.rsplit('.', 1)[-1].replace('_interface', ''),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'commit': commit,
+        'dirty': dirty,
+    }
+
+def run_benchmarks(models: dict[str, str], cases: list[str], repeats: int = 3, warmup: bool = True, args=None) -> pd.DataFrame:
+    """
+    Time every case on every model.
+
+    Args:
+        models (dict[str, str]): Model name -> file path.
+        cases (list[str]): Names of `CASES` to run.
+        repeats (int, optional): Timed calls per case and model. Defaults to 3.
+        warmup (bool, optional): Make one untimed call first (imports, solver setup). Defaults to True.
+        args (Namespace, optional): The `objectives`, case sizes (`fva`, `loopless`, `knockouts` reactions) and alteration `tables`.
+
+    Returns:
+        pd.DataFrame: One row per model and case with `median`, `min`, `mean` and `std` wall times in seconds
+            (NaN for cases that failed on a model, with the reason in `error`).
+    """
+    rows = []
+    for name, path in models.items():
+        model, error = load_model(path, validate=False)
+        if not model:
+            print(f"Error loading model {path}: {error}")
+            continue
+        for case in cases:
+            times, error = [], None
+            for i in range(repeats + int(warmup)):
+                work = model.copy()
+                np.random.seed(SEED)
+                start = time.perf_counter()
+                try:
+                    CASES[case](work, path, args)
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}".rstrip(': ')
+                    break
+                if i >= int(warmup): times.append(time.perf_counter() - start)
+            times = np.array(times if error is None else [np.nan])
+            rows.append({
+                'model': name, 'case': case, 'repeats': len(times) if error is None else 0,
+                'median': np.median(times), 'min': times.min(), 'mean': times.mean(), 'std': times.std(), 'error': error
+            })
+            status = f"{rows[-1]['median']:.3f}s (min {rows[-1]['min']:.3f}s)" if error is None else f"skipped ({error})"
+            print(f"{name:>12} {case:<14} {status}")
+    return pd.DataFrame(rows)
+
+def compare(results: pd.DataFrame, baseline: pd.DataFrame, tolerance: float = TOLERANCE, min_delta: float = MIN_DELTA_S) -> pd.DataFrame:
+    """
+    Compare the median timings of a run with a baseline run (cases not in `results` are ignored). A case regressed if it got slower than the baseline by more than
+    `tolerance` (relative) and `min_delta` seconds, and improved in the opposite case.
+
+    Returns:
+        pd.DataFrame: `model`, `case`, `baseline` and `median` times, their `ratio`, and `verdict`
+            ('regression', 'improvement', 'ok', 'new' if only timed now, 'failed' if only timed in the baseline, or 'skipped').
+    """
+    merged = results[['model', 'case', 'median']].merge(
+        baseline[['model', 'case', 'median']].rename(columns={'median': 'baseline'}), on=['model', 'case'], how='left'
+    )
+    merged['ratio'] = merged['median'] / merged['baseline']
+    delta = merged['median'] - merged['baseline']
+    merged['verdict'] = np.select(
+        [
+            merged['baseline'].isna() & merged['median'].isna(),
+            merged['baseline'].isna(),
+            merged['median'].isna(),
+            (merged['ratio'] > 1 + tolerance) & (delta > min_delta),
+            (merged['ratio'] < 1 / (1 + tolerance)) & (-delta > min_delta),
+        ],
+        ['skipped', 'new', 'failed', 'regression', 'improvement'],
+        default='ok'
+    )
+    return merged[['model', 'case', 'baseline', 'median', 'ratio', 'verdict']]
+
+def save_run(results: pd.DataFrame, env: dict, config: dict, path: str):
+    """Write a benchmark run (environment, configuration and timings) as JSON."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'environment': env, 'config': config, 'results': json.loads(results.to_json(orient='records'))}, f, indent=1)
+
+def load_run(path: str) -> tuple[pd.DataFrame, dict, dict]:
+    """Read a run written by `save_run`. Returns its timings, environment and configuration."""
+    with open(path) as f:
+        run = json.load(f)
+    return pd.DataFrame(run['results']), run['environment'], run['config']
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='perf',
+        description='Time model loading, copies, construct generation, FBA/pFBA/FVA and knockouts, and compare with a stored baseline.'
+    )
+    parser.add_argument('models', nargs='*', help='Model files as name=path. Defaults to iCre1355, its gap-filled model and an altered construct.')
+    parser.add_argument('-d', '--dest', default=PERF_DIR)
+    parser.add_argument('-c', '--cases', help=f"Comma-separated cases (defaults to all: {','.join(CASES)}).")
+    parser.add_argument('-o', '--objectives', default='Biomass_Chlamy_auto', help='Comma-separated objectives of the solves. Empty for the model objective.')
+    parser.add_argument('-r', '--repeats', type=int, default=3)
+    parser.add_argument('-b', '--baseline', help='Baseline run to compare with. Defaults to <dest>/baseline.json.')
+    parser.add_argument('-s', '--save-baseline', action='store_true', help='Store this run as the new baseline.')
+    parser.add_argument('-t', '--tolerance', type=float, default=TOLERANCE, help='Relative slowdown counted as a regression.')
+    parser.add_argument('--fva', type=int, default=200, help='Reactions per FVA.')
+    parser.add_argument('--loopless', type=int, default=5, help='Reactions per loopless FVA.')
+    parser.add_argument('--knockouts', type=int, default=200, help='Reactions per single knockout screen.')
+    args = parser.parse_args()
+
+    entries = [entry.split('=', 1) if '=' in entry else (os.path.splitext(os.path.basename(entry))[0], entry) for entry in args.models]
+    models = dict(entries) if entries else MODELS
+    missing = [path for path in models.values() if not os.path.exists(path)]
+    if missing: print(f"Skipping missing models: {', '.join(missing)}")
+    models = {name: path for name, path in models.items() if os.path.exists(path)}
+    if len(models) == 0:
+        print("No models found. Exiting...")
+        sys.exit(1)
+
+    cases = list(dict.fromkeys(args.cases.split(','))) if args.cases else list(CASES)
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        print(f"Unknown cases: {', '.join(unknown)}. Expected some of {', '.join(CASES)}.")
+        sys.exit(1)
+
+    args.objectives = [obj for obj in args.objectives.split(',') if obj]
+    args.tables = load_tables() if 'alter' in cases else None
+    config = {
+        'models': {name: {'path': path, 'sha256': file_hash(path)} for name, path in models.items()},
+        'cases': cases, 'objectives': args.objectives, 'repeats': args.repeats, 'fva': args.fva, 'loopless': args.loopless, 'knockouts': args.knockouts,
+    }
+    env = environment()
+    print(f"Benchmarking {len(cases)} cases on {len(models)} models ({args.repeats} repeats, {env['solver']}, commit {str(env['commit'])[:8]})...")
+    results = run_benchmarks(models, cases, repeats=args.repeats, args=args)
+
+    export_path = os.path.join(args.dest, f"perf_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    save_run(results, env, config, export_path)
+    print(f"Saved the timings to {export_path}")
+
+    baseline_path = args.baseline or os.path.join(args.dest, 'baseline.json')
+    if args.save_baseline:
+        save_run(results, env, config, baseline_path)
+        print(f"Saved as the baseline ({baseline_path})")
+        exit(0)
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}. Rerun with -s to store one.")
+        exit(0)
+
+    baseline, base_env, base_config = load_run(baseline_path)
+    # Timings only compare on the same inputs and a similar environment
+    changed = [name for name, model in config['models'].items() if name in base_config['models'] and model['sha256'] != base_config['models'][name]['sha256']]
+    if changed: print(f"Warning: model files changed since the baseline: {', '.join(changed)}")
+    sizes = [key for key in ('objectives', 'repeats', 'fva', 'loopless', 'knockouts') if config[key] != base_config.get(key)]
+    if sizes: print(f"Warning: case sizes differ from the baseline: {', '.join(sizes)}")
+    differs = [key for key in ('host', 'cpus', 'python', 'cobra', 'optlang', 'solver') if env[key] != base_env.get(key)]
+    if differs: print(f"Warning: environment differs from the baseline ({', '.join(f'{k}: {base_env.get(k)} -> {env[k]}' for k in differs)})")
+
+    report = compare(results, baseline, tolerance=args.tolerance)
+    print(f"\nCompared with the baseline from {base_env.get('time')} (commit {str(base_env.get('commit'))[:8]}):")
+    print(report.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    regressions = report[report['verdict'].isin(['regression', 'failed'])]
+    if len(regressions) > 0:
+        print(f"{len(regressions)} regressions (slower by over {args.tolerance:.0%}, or failing).")
+        sys.exit(1)
+    print("No regressions.")
+    exit(0)
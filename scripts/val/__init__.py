@@ -1,8 +1,9 @@
-import cobra.io as io, argparse, requests
+import argparse, requests
 from cobra.manipulation.validate import check_mass_balance, check_metabolite_compartment_formula
 from cobra.flux_analysis import add_loopless, find_blocked_reactions
-from scripts.helpers.model import energy_cycles_flux, find_egcs_null_space
+from scripts.helpers.model import find_energy_cycles
 from cobra.core import Model, Reaction, Metabolite
+from scripts.helpers.loader import load_model
 
 if __name__ == "__main__":
 
@@ -16,9 +17,16 @@ if __name__ == "__main__":
     args = parser.parse_args()
     
     # Model Import
-    model, error = io.validate_sbml_model(args.sbmlpath)
+    model, error = load_model(args.sbmlpath)
 
     # Basic Check
     assert len(model.reactions) > 0, "Not reactions found."
     assert len(model.metabolites) > 0, "No metabolites found."
-    assert len(model.genes) > 0, "No genes found."
\ No newline at end of file
+    assert len(model.genes) > 0, "No genes found."
+
+    # Energy generating cycles (should be none with all exchanges closed)
+    cycles = find_energy_cycles(model)
+    found = cycles[cycles['flux'] > 0]
+    for _, row in found.iterrows():
+        print(f"EGC {row['reaction']} ({row['size']} reactions): {row['cycle']}")
+    assert found.empty, f"{len(found)} energy generating cycles found."
\ No newline at end of file
@@ -1,166 +1,77 @@
-from cobra import io
 import os, argparse
-from enum import Enum
 from cobra.core import Model, Reaction, Metabolite
-from pyvis.network import Network
 
 from scripts.helpers.tools import sort_by_similarity
+from scripts.helpers.loader import load_model
+from scripts.val.graph import MetabolicGraph
 
-class NType(Enum):
-    COMPOUND = True
-    REACTION = False
-
-class Node:
-
-    def __init__(self, is_compound: bool, data: Metabolite | Reaction):
-        self.type: NType = is_compound
-        self.data = data
-
-class DiGraph:
-
-    # Initializer and readers
-
-    def __init__(self, rxns: list[Reaction]):
-
-        nodes_map: dict[str:Node] = {}
-        names: dict[str:str] = {}
-        edges: dict[str:str] = {}
-        weight: dict[tuple[str,str]:int] = {}
-
-        rxncount, metcount = 0, 0
-        for rxn in rxns:
-            # Create reaction node
-            rxn_node = Node(is_compound=False, data=rxn)
-            nodes_map[rxn.id] = rxn_node
-            names[rxn.id] = rxn.name
-            # Add metabolites to graph
-            for item in rxn.metabolites.items():
-                met, coef = item
-                # Create metabolite node if not in graph
-                if not (met.id in nodes_map.keys()):
-                    c_node = Node(is_compound=True, data=met)
-                    nodes_map[met.id] = c_node
-                    names[met.id] = met.name
-                
-                # Connect metabolite and reaction
-                src, dest = rxn.id, met.id
-                if coef < 0:
-                    # Node for met is source to rxn
-                    src, dest = met.id, rxn.id
-
-                if src not in edges.keys():
-                    edges[src] = [dest]
-                else:
-                    edges[src] = edges[src] + [dest]
-                # weight[(src,dest)] = abs(coef)
-                weight[(src, dest)] = 1
-                metcount += 1
-            rxncount += 1
-            
-        self.nodes, self.names, self.edges, self.weight, self.rxn_count, self.met_count = nodes_map, names, edges, weight, rxncount, metcount
-    
-    def get_node_count(self): return (self.rxn_count + self.met_count)
+class DiGraph(MetabolicGraph):
+    """
+    Reaction-metabolite graph of a list of reactions (see `MetabolicGraph` for the sparse engine).
+
+    Args:
+        rxns (list[Reaction]): Reactions of a single model to include in the graph.
+        currency (bool | list[str], optional): Currency metabolites to leave out (see `MetabolicGraph`). Defaults to False.
+    """
+
+    def __init__(self, rxns: list[Reaction], currency: bool | list[str] = False):
+        assert len(rxns) > 0, "No reactions provided."
+        self.model: Model = rxns[0].model
+        super().__init__(self.model, reactions=rxns, currency=currency)
+
+    def get_node_count(self): return len(self.ids)
         
-    def get_rxn_count(self): return self.rxn_count
+    def get_rxn_count(self): return len(self.rxn_ids)
 
-    def get_met_count(self): return self.met_count
+    def get_met_count(self): return len(self.met_ids)
 
     # Debug
 
-    def get_names(self): return self.names
+    def get_names(self):
+        nodes = self.get_nodes()
+        return {nid: nodes[nid].name for nid in self.ids}
 
-    def get_edges(self): return self.edges
+    def get_edges(self): return self.edges()
 
-    def get_weights(self): return self.weight
+    def get_weights(self):
+        A = self.adjacency.tocoo()
+        return {(self.ids[i], self.ids[j]): w for i, j, w in zip(A.row, A.col, A.data)}
 
-    def get_nodes(self): return self.nodes
+    def get_nodes(self) -> dict[str, Reaction | Metabolite]:
+        return {
+            **{rid: self.model.reactions.get_by_id(rid) for rid in self.rxn_ids},
+            **{mid: self.model.metabolites.get_by_id(mid) for mid in self.met_ids},
+        }
         
     # Pathfinding
 
-    def _get_dest(self, nid: str):
-        if nid not in self.edges.keys(): return []
-        return self.edges[nid]
-    
     def find_sp(self, src: str):
-        
-        queue = [src]
-        visits: list[str] = []
-
-        count = 0
-        while len(queue) > 0:
-
-            n = queue[0]
-            queue = queue[1:]
-            visits.append(n)
-
-            d = self._get_dest(n)
-            for m in d:
-                if m not in visits:
-                    queue.append(m)
-            
-            count += 1
-            print(count, end='\r')
-        
-        return visits
+        """Every node reachable from `src`, in breadth-first order."""
+        return self.reachable(src)
     
     def dijkstra_sp(self, src: str):
-        
-        dist, prev, queue = {}, {}, []
-
-        for n in self.nodes.keys():
-            dist[n] = float('inf')
-            prev[n] = None
-            queue.append(n)
-        
-        dist[src] = 0
-
-        while len(queue) > 0:
-            u = min(queue, key=lambda x: dist[x])
-            queue.remove(u)
-
-            if not self.get_edges()[u]: 
-                dist[u] = float('inf')
-                continue
-
-            for v in self.get_edges()[u]:
-                alt = dist[u] + self.weight.get((u, v), 1)
-
-                if alt < dist[v]:
-                    dist[v] = alt
-                    prev[v] = u
-
-        # Return the shortest path and its distance
-        return dist, prev
+        """Distances and predecessors of the nodes reachable from `src`."""
+        return self.distances(src)
 
     def dijkstra_search(self, src: str, dest: str):
-        dist, prev = self.dijkstra_sp(src)
-
-        # Reconstruct the shortest path
-        path = []
-        current = dest
-        while current is not None:
-            path.append(current)
-            current = prev.get(current)
-
-        path.reverse()
-        return path, dist.get(dest)
+        """Shortest path from `src` to `dest` and its length."""
+        return self.shortest_path(src, dest)
 
     # Convert pyvis
 
     def convert_pyvis(self, filename: str, src: str, finds: list[str], include = None):
+        from pyvis.network import Network # Optional, only needed for plotting
+
         network = Network(directed=True)
         # Default behaviour:
-        if include == None:
-            include = list(self.nodes.keys()) 
+        include = set(self.ids if include is None else include)
         # Add nodes to pyvis graph with name label and cobra id
-        for item in self.names.items():
-            id, name = item
+        for id, name in self.get_names().items():
             if id not in include: continue
-            is_rxn = self.nodes[id].type == NType.REACTION
+            is_rxn = self.is_reaction(id)
             network.add_node(id, label=name, color=("#ee5533" if id == src else "#33ee88" if id in finds else "#3388ee"), size=(60 if is_rxn else 20))
         # Build edges in pyvis graph
-        for edge in self.edges.items():
-            n, ms = edge
+        for n, ms in self.edges().items():
             if n not in include: continue
             for m in ms:
                 if m not in include: continue
@@ -178,18 +89,20 @@ if __name__ == "__main__":
     )
     parser.add_argument('sbmlpath')
     parser.add_argument('-d', '--dest')
+    parser.add_argument('-f', '--full', action='store_true', help='Search the whole network instead of the sterol subsystem.')
+    parser.add_argument('-c', '--currency', action='store_true', help='Leave currency metabolites (atp, nadph, h2o, ...) out of the graph.')
     args = parser.parse_args()
 
-    model, err = io.validate_sbml_model(args.sbmlpath)
+    model, err = load_model(args.sbmlpath)
 
     if model:
 
         target_subsystem = ["Biosynthesis of steroids"]
         find_list = ["CAS", "sql_c", "psqldp_c", "chsterol_c", "mergtrol_c", "ALTERED_R02874", "ALTERED_R06223"]
-        rxns = [rxn for rxn in model.reactions if rxn.subsystem in target_subsystem or rxn.id in find_list] # if rxn.subsystem in target_subsystem]
+        rxns = [rxn for rxn in model.reactions if args.full or rxn.subsystem in target_subsystem or rxn.id in find_list] # if rxn.subsystem in target_subsystem]
         src_met = "SS"
         
-        graph = DiGraph(rxns)
+        graph = DiGraph(rxns, currency=args.currency)
         res = graph.find_sp(src_met)
 
         met_list = [(met.id, met.name) for met in model.metabolites]
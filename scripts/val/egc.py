@@ -0,0 +1,82 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse, os, sys, glob
+import pandas as pd
+
+from scripts.helpers.loader import load_model
+from scripts.helpers.model import find_energy_cycles
+from scripts.opt._batch import model_names
+
+def _screen_model(path: str, name: str, parsimonious: bool) -> pd.DataFrame:
+    """Worker job: load one construct and probe all of its dissipation reactions."""
+    model, error = load_model(path, validate=False)
+    if not model:
+        print(f"Error loading model {path}: {error}")
+        return pd.DataFrame()
+    cycles = find_energy_cycles(model, processes=1, parsimonious=parsimonious)
+    cycles.insert(0, 'model', name)
+    return cycles
+
+def screen_energy_cycles(paths: list[str], processes: int = None, parsimonious: bool = True) -> pd.DataFrame:
+    """
+    Run `helpers.model.find_energy_cycles` on every model file, one construct per worker.
+
+    Args:
+        paths (list[str]): Model files to screen.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        parsimonious (bool, optional): Report minimal cycles (see `find_energy_cycles`). Defaults to True.
+
+    Returns:
+        pd.DataFrame: The `find_energy_cycles` rows of every model, with a leading `model` column (see `_batch.model_names`).
+    """
+    assert len(paths) > 0, "No models provided."
+    names = model_names(paths)
+    processes = min(processes or os.cpu_count(), len(paths))
+
+    results = {}
+    if processes <= 1:
+        for path, name in zip(paths, names):
+            results[name] = _screen_model(path, name, parsimonious)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            jobs = {pool.submit(_screen_model, path, name, parsimonious): name for path, name in zip(paths, names)}
+            for job in as_completed(jobs):
+                results[jobs[job]] = job.result()
+
+    frames = [results[name] for name in names if not results[name].empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+if __name__ == "__main__":
+    # Script Argument(s)
+    parser = argparse.ArgumentParser(
+        prog='egc',
+        description='Screen models for energy generating cycles (closed exchanges, one LP per energy dissipation reaction).'
+    )
+    parser.add_argument('sbmlglob', nargs='+', help='Model files or glob patterns (quote patterns, ** is supported).')
+    parser.add_argument('-d', '--dest')
+    parser.add_argument('-n', '--processes', type=int, default=None)
+    parser.add_argument('--fast', action='store_true', help='Report the first optimal cycle instead of the minimal one.')
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.sbmlglob for p in glob.glob(pattern, recursive=True)})
+    if len(paths) == 0:
+        print("No model files matched. Exiting...")
+        sys.exit(1)
+
+    print(f"Screening {len(paths)} models for energy generating cycles...")
+    table = screen_energy_cycles(paths, processes=args.processes, parsimonious=not args.fast)
+    if table.empty:
+        print("No models could be screened. Exiting...")
+        sys.exit(1)
+
+    found = table[table['flux'] > 0]
+    for name, rows in found.groupby('model', sort=False):
+        print(f"{name}: {len(rows)} EGCs ({', '.join(rows['reaction'])})")
+    print(f"{found['model'].nunique()} of {table['model'].nunique()} models have energy generating cycles.")
+
+    if args.dest:
+        os.makedirs(args.dest, exist_ok=True)
+        export_path = os.path.join(args.dest, "egc.csv")
+        table.to_csv(export_path, index=False)
+        print(f"Saved the screen to {export_path}")
+    exit(0)
@@ -0,0 +1,128 @@
+from cobra.core import Model
+from cobra.util import create_stoichiometric_matrix
+from scipy.sparse import csgraph
+import scipy.sparse as sp
+import numpy as np
+
+# Cofactors and small molecules that connect almost every pathway (base IDs, any compartment)
+CURRENCY_METABOLITES = [
+    "h", "h2o", "o2", "co2", "pi", "ppi", "nh4",
+    "atp", "adp", "amp", "gtp", "gdp", "ctp", "utp",
+    "nad", "nadh", "nadp", "nadph", "fad", "fadh2", "coa",
+]
+
+def currency_ids(model: Model, bases: list[str] = CURRENCY_METABOLITES) -> list[str]:
+    """IDs of the model metabolites whose base ID (without the `_<compartment>` suffix) is a currency metabolite."""
+    bases = set(bases)
+    return [met.id for met in model.metabolites if met.id.rsplit('_', 1)[0] in bases]
+
+class MetabolicGraph:
+    """
+    Bipartite reaction-metabolite graph stored as one CSR adjacency matrix, built straight from the stoichiometric matrix.
+    Substrates point to their reactions and reactions point to their products (both ways for reversible reactions
+    when `reversible=True`). Node IDs are reaction and metabolite IDs, so searches can start from either.
+
+    Args:
+        model (Model): The metabolic model.
+        reactions (list[str | Reaction], optional): Restrict the graph to these reactions (and their metabolites). Defaults to all.
+        currency (bool | list[str], optional): Metabolites to leave out. True drops `CURRENCY_METABOLITES`. Defaults to False.
+        reversible (bool, optional): Add reverse edges for reactions with a negative lower bound. Defaults to False.
+        weighted (bool, optional): Weight edges by |stoichiometric coefficient| instead of 1. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        reactions: list = None,
+        currency: bool | list[str] = False,
+        reversible: bool = False,
+        weighted: bool = False
+    ):
+        S = create_stoichiometric_matrix(model, array_type='lil').tocsc()
+        rxn_ids = [rxn.id for rxn in model.reactions]
+        met_ids = [met.id for met in model.metabolites]
+
+        if reactions is not None:
+            wanted = {getattr(rxn, 'id', rxn) for rxn in reactions}
+            cols = [j for j, rid in enumerate(rxn_ids) if rid in wanted]
+            S, rxn_ids = S[:, cols], [rxn_ids[j] for j in cols]
+
+        if currency:
+            dropped = set(currency_ids(model) if currency is True else currency)
+            rows = [i for i, mid in enumerate(met_ids) if mid not in dropped]
+            S, met_ids = S[rows, :], [met_ids[i] for i in rows]
+
+        # Keep only metabolites touched by the remaining reactions
+        S = S.tocsr()
+        used = np.flatnonzero(S.getnnz(axis=1))
+        S, met_ids = S[used, :], [met_ids[i] for i in used]
+
+        if not weighted:
+            S = S.sign()
+        produced = S.multiply(S > 0).T.tocsr()  # reaction -> metabolite
+        consumed = -S.multiply(S < 0).tocsr()   # metabolite -> reaction
+        if reversible:
+            # Reversible reactions also consume their products and produce their substrates
+            bounds = {rxn.id: rxn.lower_bound for rxn in model.reactions}
+            rev = sp.diags([1.0 if bounds[rid] < 0 else 0.0 for rid in rxn_ids])
+            produced, consumed = (produced + rev @ consumed.T).tocsr(), (consumed + produced.T @ rev).tocsr()
+
+        self.rxn_ids, self.met_ids = rxn_ids, met_ids
+        self.ids = rxn_ids + met_ids
+        self.index = {nid: i for i, nid in enumerate(self.ids)}
+        self.adjacency = sp.bmat([[None, produced], [consumed, None]], format='csr')
+        self.adjacency.eliminate_zeros()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, nid: str) -> bool:
+        return nid in self.index
+
+    def is_reaction(self, nid: str) -> bool:
+        return self.index[nid] < len(self.rxn_ids)
+
+    def successors(self, nid: str) -> list[str]:
+        """Nodes directly reachable from `nid`."""
+        i = self.index[nid]
+        row = self.adjacency.indices[self.adjacency.indptr[i]:self.adjacency.indptr[i + 1]]
+        return [self.ids[j] for j in row]
+
+    def reachable(self, src: str) -> list[str]:
+        """Breadth-first order of every node reachable from `src` (reaction or metabolite), starting with `src` (just `[src]` if it isn't in the graph)."""
+        if src not in self.index:
+            return [src]
+        order = csgraph.breadth_first_order(self.adjacency, self.index[src], directed=True, return_predecessors=False)
+        return [self.ids[i] for i in order]
+
+    def distances(self, src: str, limit: float = np.inf) -> tuple[dict[str, float], dict[str, str]]:
+        """
+        Dijkstra from `src` (scipy's Fibonacci-heap implementation over the CSR matrix). Returns the distance to, and predecessor of, every reachable node
+        (nodes further than `limit` are left out).
+        """
+        dist, pred = csgraph.dijkstra(self.adjacency, directed=True, indices=self.index[src], return_predecessors=True, limit=limit)
+        reached = np.flatnonzero(np.isfinite(dist))
+        return (
+            {self.ids[i]: float(dist[i]) for i in reached},
+            {self.ids[i]: (self.ids[pred[i]] if pred[i] >= 0 else None) for i in reached},
+        )
+
+    def shortest_path(self, src: str, dest: str) -> tuple[list[str], float]:
+        """Shortest path from `src` to `dest` and its length (`([], inf)` when `dest` can't be reached)."""
+        dist, pred = self.distances(src)
+        if dest not in dist:
+            return [], float('inf')
+
+        path, current = [], dest
+        while current is not None:
+            path.append(current)
+            current = pred[current]
+        return path[::-1], dist[dest]
+
+    def edges(self) -> dict[str, list[str]]:
+        """Adjacency as a dict of lists (e.g. for plotting)."""
+        A = self.adjacency
+        return {
+            self.ids[i]: [self.ids[j] for j in A.indices[A.indptr[i]:A.indptr[i + 1]]]
+            for i in range(len(self.ids)) if A.indptr[i + 1] > A.indptr[i]
+        }